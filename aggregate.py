@@ -0,0 +1,178 @@
+import json
+import numpy as np
+
+
+STAT_FIELDS = ("kills", "deaths", "adr", "kast", "rating", "swing")
+KEY_FIELDS = ("match", "player", "team", "map")
+TOTAL_MAP = "total"
+
+
+def parse_stat(value):
+    """ '83.3%' -> 83.3, '+7.30%' -> 7.3, '-' / None -> nan """
+    if value is None:
+        return np.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    value = value.strip().rstrip("%")
+    try:
+        return float(value)
+    except ValueError:
+        return np.nan
+
+
+class Categories():
+    """ Incremental string <-> integer code mapping """
+    def __init__(self):
+        self.codes = {}
+        self.labels = []
+
+    def code(self, label):
+        code = self.codes.get(label)
+        if code is None:
+            code = len(self.labels)
+            self.codes[label] = code
+            self.labels.append(label)
+        return code
+
+    def __len__(self):
+        return len(self.labels)
+
+
+class StatsAggregator():
+    """ Columnar per-player stat rows, one per (match, player, team, map) with map "total" for the whole match """
+    def __init__(self, capacity=1024):
+        self.categories = {key: Categories() for key in KEY_FIELDS}
+        self.size = 0
+        self.keys = np.empty((len(KEY_FIELDS), capacity), dtype=np.int32)
+        self.values = np.empty((len(STAT_FIELDS), capacity), dtype=np.float64)
+
+    # ------------------ Loading ------------------ #
+    def _reserve(self, n):
+        needed = self.size + n
+        capacity = self.keys.shape[1]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        keys = np.empty((len(KEY_FIELDS), capacity), dtype=np.int32)
+        values = np.empty((len(STAT_FIELDS), capacity), dtype=np.float64)
+        keys[:, :self.size] = self.keys[:, :self.size]
+        values[:, :self.size] = self.values[:, :self.size]
+        self.keys, self.values = keys, values
+
+    def add_match(self, match_json):
+        """ Appends one Match.to_json() record; returns False if it was already loaded """
+        match_id = match_json.get("match_id") or match_json.get("url")
+        if match_id in self.categories["match"].codes:
+            return False
+        match_code = self.categories["match"].code(match_id)
+
+        stats = match_json.get("stats") or {}
+        blocks = [(TOTAL_MAP, stats.get("total") or {})]
+        blocks.extend((map_name, teams) for map_name, teams in (stats.get("maps") or {}).items())
+
+        keys, values = [], []
+        for map_name, teams in blocks:
+            map_code = self.categories["map"].code(map_name)
+            for team_name, players in teams.items():
+                team_code = self.categories["team"].code(team_name)
+                for ps in players:
+                    keys.append((match_code, self.categories["player"].code(ps.get("nickname")), team_code, map_code))
+                    values.append([parse_stat(ps.get(field)) for field in STAT_FIELDS])
+
+        n = len(keys)
+        if n:
+            self._reserve(n)
+            self.keys[:, self.size:self.size + n] = np.array(keys, dtype=np.int32).T
+            self.values[:, self.size:self.size + n] = np.array(values, dtype=np.float64).T
+            self.size += n
+        return True
+
+    def add_matches(self, matches_json):
+        return sum(1 for m in matches_json if self.add_match(m))
+
+    def load_json(self, path):
+        with open(path, "r", encoding="utf-8") as fp:
+            return self.add_matches(json.load(fp))
+
+    # ------------------ Grouping ------------------ #
+    def _column(self, name):
+        if name in KEY_FIELDS:
+            return self.keys[KEY_FIELDS.index(name), :self.size]
+        return self.values[STAT_FIELDS.index(name), :self.size]
+
+    def _rows(self, maps):
+        """ Row mask: "total" keeps the match totals, None every per-map row, or a list of map names """
+        map_col = self._column("map")
+        total_code = self.categories["map"].codes.get(TOTAL_MAP, -1)
+        if maps is None:
+            return map_col != total_code
+        if isinstance(maps, str):
+            maps = [maps]
+        codes = [self.categories["map"].codes[m] for m in maps if m in self.categories["map"].codes]
+        return np.isin(map_col, codes)
+
+    def _groups(self, by, mask):
+        """ Returns (unique key rows, group index per selected row) """
+        key_rows = np.stack([self._column(k)[mask] for k in by])
+        if key_rows.shape[1] == 0:
+            return np.empty((len(by), 0), dtype=np.int32), np.empty(0, dtype=np.intp)
+        uniq, inverse = np.unique(key_rows, axis=1, return_inverse=True)
+        return uniq, inverse.ravel()
+
+    def _labels(self, by, uniq):
+        labels = [[self.categories[k].labels[c] for c in uniq[i]] for i, k in enumerate(by)]
+        if len(by) == 1:
+            return labels[0]
+        return list(zip(*labels))
+
+    def _reduce(self, field, by, maps):
+        if isinstance(by, str):
+            by = (by,)
+        mask = self._rows(maps)
+        uniq, group = self._groups(by, mask)
+        values = self._column(field)[mask]
+        valid = ~np.isnan(values)
+        n = uniq.shape[1]
+        sums = np.bincount(group[valid], weights=values[valid], minlength=n)
+        counts = np.bincount(group[valid], minlength=n)
+        return by, uniq, group, values, valid, sums, counts
+
+    def sum(self, field, by=("player",), maps=TOTAL_MAP):
+        by, uniq, _, _, _, sums, _ = self._reduce(field, by, maps)
+        return dict(zip(self._labels(by, uniq), sums.tolist()))
+
+    def count(self, field, by=("player",), maps=TOTAL_MAP):
+        by, uniq, _, _, _, _, counts = self._reduce(field, by, maps)
+        return dict(zip(self._labels(by, uniq), counts.tolist()))
+
+    def mean(self, field, by=("player",), maps=TOTAL_MAP):
+        by, uniq, _, _, _, sums, counts = self._reduce(field, by, maps)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = sums / counts
+        return dict(zip(self._labels(by, uniq), means.tolist()))
+
+    def percentile(self, field, q, by=("player",), maps=TOTAL_MAP):
+        """ Linear-interpolated q-th percentile per group, computed with one sort for all groups """
+        by, uniq, group, values, valid, _, counts = self._reduce(field, by, maps)
+        group, values = group[valid], values[valid]
+        order = np.lexsort((values, group))
+        values = values[order]
+
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        pos = (q / 100.0) * np.maximum(counts - 1, 0)
+        lo = np.floor(pos).astype(np.intp)
+        hi = np.ceil(pos).astype(np.intp)
+        result = np.full(len(counts), np.nan)
+        has = counts > 0
+        lo_v = values[starts[has] + lo[has]]
+        hi_v = values[starts[has] + hi[has]]
+        result[has] = lo_v + (hi_v - lo_v) * (pos[has] - lo[has])
+        return dict(zip(self._labels(by, uniq), result.tolist()))
+
+    def kd_ratio(self, by=("player", "map"), maps=None):
+        kills = self._reduce("kills", by, maps)[5]
+        by, uniq, _, _, _, deaths, _ = self._reduce("deaths", by, maps)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ratio = kills / deaths
+        return dict(zip(self._labels(by, uniq), ratio.tolist()))
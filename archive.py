@@ -0,0 +1,139 @@
+import os
+import re
+import json
+import time
+import zlib
+import hashlib
+import threading
+
+from metrics import CACHE_REQUESTS
+from configs import ARCHIVE_DIR, ARCHIVE_COMPRESSION_LEVEL
+
+
+MATCH_ID_RE_PATTERN = r"https:\/\/www\.hltv\.org\/matches\/(\d+)\/.+"
+
+
+class PageArchive():
+    """ Content-addressed raw pages: zlib bodies under objects/<sha256[:2]>/<sha256>.z, every fetch in index.jsonl """
+    def __init__(self, root=ARCHIVE_DIR, level=ARCHIVE_COMPRESSION_LEVEL):
+        self.root = root
+        self.level = level
+        self.objects_dir = os.path.join(root, "objects")
+        self.index_path = os.path.join(root, "index.jsonl")
+        self.lock = threading.Lock()
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+        self.entries = []
+        self.by_url = {}
+        self.by_match = {}
+        self.load_index()
+
+    def load_index(self):
+        if not os.path.exists(self.index_path):
+            return
+        complete = 0    # bytes up to the last full line
+        with open(self.index_path, "rb") as fp:
+            for line in fp:
+                if not line.endswith(b"\n"):
+                    break   # cut short by a crash mid-append
+                complete += len(line)
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if os.path.exists(self.object_path(entry["sha256"])):
+                    self._add_entry(entry)
+        if complete < os.path.getsize(self.index_path):
+            # the next put must start on a line of its own
+            with open(self.index_path, "r+b") as fp:
+                fp.truncate(complete)
+
+    def _add_entry(self, entry):
+        self.entries.append(entry)
+        self.by_url.setdefault(entry["url"], []).append(entry)
+        if entry.get("match_id"):
+            self.by_match.setdefault(entry["match_id"], []).append(entry)
+
+    def object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest + ".z")
+
+    # ------------------ Writing ------------------ #
+    def put(self, url, raw, match_id=None, fetched_at=None):
+        """ Stores raw response bytes, returns their sha256 """
+        if isinstance(raw, str):
+            raw = raw.encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()
+        if match_id is None:
+            match = re.search(MATCH_ID_RE_PATTERN, url)
+            match_id = match.group(1) if match else None
+
+        path = self.object_path(digest)
+        if os.path.exists(path):
+            CACHE_REQUESTS.inc("archive", "hit")
+        else:
+            CACHE_REQUESTS.inc("archive", "miss")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as fp:
+                fp.write(zlib.compress(raw, self.level))
+            os.replace(tmp, path)
+
+        entry = {
+            "sha256": digest,
+            "url": url,
+            "match_id": match_id,
+            "fetched_at": fetched_at if fetched_at is not None else time.time(),
+            "size": len(raw),
+        }
+        with self.lock:
+            with open(self.index_path, "a", encoding="utf-8") as fp:
+                fp.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._add_entry(entry)
+        return digest
+
+    # ------------------ Reading ------------------ #
+    def get(self, digest):
+        with open(self.object_path(digest), "rb") as fp:
+            return zlib.decompress(fp.read())
+
+    def get_text(self, digest):
+        return self.get(digest).decode("utf-8")
+
+    def history(self, url=None, match_id=None, since=None, until=None):
+        """ Index entries for a URL / match id, optionally within [since, until) fetch times """
+        if url is not None:
+            entries = self.by_url.get(url, [])
+        elif match_id is not None:
+            entries = self.by_match.get(str(match_id), [])
+        else:
+            entries = self.entries
+        return [e for e in entries
+                if (since is None or e["fetched_at"] >= since) and (until is None or e["fetched_at"] < until)]
+
+    def latest(self, url=None, match_id=None):
+        entries = self.history(url=url, match_id=match_id)
+        return max(entries, key=lambda e: e["fetched_at"]) if entries else None
+
+    def latest_html(self, url=None, match_id=None):
+        entry = self.latest(url=url, match_id=match_id)
+        return self.get_text(entry["sha256"]) if entry else None
+
+    def iter_latest(self, matches_only=False):
+        """ (url, html) of the newest fetch of every archived URL (only match pages if matches_only) """
+        for url, entries in self.by_url.items():
+            if matches_only and not entries[0].get("match_id"):
+                continue    # player profiles and other pages share the archive
+            entry = max(entries, key=lambda e: e["fetched_at"])
+            yield url, self.get_text(entry["sha256"])
+
+
+_default_archive = None
+_default_archive_lock = threading.Lock()
+
+
+def get_default_archive():
+    global _default_archive
+    with _default_archive_lock:
+        if _default_archive is None:
+            _default_archive = PageArchive()
+        return _default_archive
@@ -0,0 +1,90 @@
+"""
+Timing checks for the hot paths. Run with `python benchmark.py`.
+"""
+import sys
+import time
+import logging
+import statistics
+import subprocess
+
+
+RUNS = 7
+SAMPLE_PAGES = {
+    "past": ("https://www.hltv.org/matches/2388113/furia-vs-g2-starladder-budapest-major-2025", "single_match_past.html"),
+    "live": ("https://www.hltv.org/matches/2388596/ground-zero-vs-rooster-dfrag-open-series-2", "single_match_live.html"),
+    "future": ("https://www.hltv.org/matches/2388121/b8-vs-natus-vincere-starladder-budapest-major-2025", "single_match_future.html"),
+}
+
+
+def median_ms(fn, runs=RUNS):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def bench_cli_startup():
+    """ Wall time of fresh interpreters: bare python vs CLI startup vs importing the heavy modules """
+    cases = {
+        "python -c pass": [sys.executable, "-c", "pass"],
+        "cli.py --help": [sys.executable, "cli.py", "--help"],
+        "import match": [sys.executable, "-c", "import match"],
+        "import live_match": [sys.executable, "-c", "import live_match"],
+    }
+    for name, cmd in cases.items():
+        ms = median_ms(lambda: subprocess.run(cmd, stdout=subprocess.DEVNULL, check=True))
+        print(f"startup  {name:<24} {ms:8.1f} ms")
+
+
+def bench_match_parse():
+    """ Full page -> to_json() with each extraction engine; both must agree """
+    from match import MatchFactory
+    logger = logging.getLogger("benchmark")
+    for mode, (url, file_name) in SAMPLE_PAGES.items():
+        with open(file_name, "r", encoding="utf-8") as fp:
+            html = fp.read()
+        results = {}
+        for engine in ("soup", "stream"):
+            results[engine] = MatchFactory(url, html, logger, engine=engine).get_match().to_json()
+            ms = median_ms(lambda: MatchFactory(url, html, logger, engine=engine).get_match().to_json(), runs=3)
+            print(f"parse    {mode + ' (' + engine + ')':<24} {ms:8.1f} ms")
+        if results["soup"] != results["stream"]:
+            print(f"parse    {mode}: engines disagree!")
+
+
+def bench_scorebot_decode():
+    """ socket_json_full.log re-encoded as polling bodies: full decode vs lazy decode by subscription """
+    import json
+    from live_match import extract_json_arrays_from_socketio
+    from socketio_frames import FrameDecoder
+    bodies = []
+    with open("socket_json_full.log", "r", encoding="utf-8") as fp:
+        for line in fp:
+            messages = ["42" + json.dumps([name, data if isinstance(data, str) else json.dumps(data)])
+                        for name, data in json.loads(line)]
+            bodies.append("".join(f"{len(m)}:{m}" for m in messages))
+
+    def full():
+        for body in bodies:
+            for arr in extract_json_arrays_from_socketio(body):
+                if arr[0] in ("scoreboard", "log"):
+                    json.loads(arr[1])
+
+    cases = {
+        "full (old)": full,
+        "lazy scoreboard+log": FrameDecoder(("scoreboard", "log")).decode,
+        "lazy scoreboard": FrameDecoder(("scoreboard",)).decode,
+        "lazy nothing": FrameDecoder(()).decode,
+    }
+    for name, fn in cases.items():
+        run = fn if name == "full (old)" else (lambda fn=fn: [fn(body) for body in bodies])
+        ms = median_ms(run, runs=5)
+        print(f"scorebot {name:<24} {ms:8.1f} ms")
+
+
+if __name__ == "__main__":
+    bench_cli_startup()
+    bench_match_parse()
+    bench_scorebot_decode()
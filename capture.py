@@ -0,0 +1,154 @@
+import os
+import json
+import gzip
+import time
+import logging
+from collections import deque
+
+from group_commit import GroupCommitWriter
+from socketio_frames import LazyFrame
+from configs import (CAPTURE_DIR, CAPTURE_RING_SIZE, CAPTURE_SEGMENT_BYTES, CAPTURE_SEGMENT_SECONDS,
+                     CAPTURE_RETENTION_SECONDS, CAPTURE_MAX_SEGMENTS, CAPTURE_FLUSH_SECONDS)
+
+logger = logging.getLogger(__name__)
+
+
+def frame_json(frame):
+    """ JSON text of one [name, payload] frame; a LazyFrame's payload is copied as received, never decoded """
+    if not isinstance(frame, LazyFrame):
+        return json.dumps(frame, ensure_ascii=False)
+    raw = frame.raw
+    if "\n" in raw or "\r" in raw:
+        # only whitespace between tokens (JSON strings can't hold raw newlines): keep the record on one line
+        raw = raw.replace("\r", " ").replace("\n", " ")
+    return f"[{json.dumps(frame.name, ensure_ascii=False)}, {raw}]"
+
+
+class RawCapture():
+    """ Every scorebot poll as received, in rotating gzip segments on disk and a bounded ring in memory """
+    def __init__(self, name, directory=CAPTURE_DIR, ring_size=CAPTURE_RING_SIZE,
+                 segment_bytes=CAPTURE_SEGMENT_BYTES, segment_seconds=CAPTURE_SEGMENT_SECONDS,
+                 retention_seconds=CAPTURE_RETENTION_SECONDS, max_segments=CAPTURE_MAX_SEGMENTS,
+                 flush_seconds=CAPTURE_FLUSH_SECONDS):
+        self.name = name
+        self.directory = directory
+        self.ring = deque(maxlen=ring_size)
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.retention_seconds = retention_seconds
+        self.max_segments = max_segments
+        self.flush_seconds = flush_seconds
+        self.manifest_path = os.path.join(directory, f"{name}.manifest.json")
+        os.makedirs(directory, exist_ok=True)
+
+        self.segments = self.load_manifest()
+        self.segment = None
+        self.fp = None
+        self.raw = None
+        self.last_flush = 0.0
+
+    # ------------------ Manifest ------------------ #
+    def load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return []
+        with open(self.manifest_path, "r", encoding="utf-8") as fp:
+            return json.load(fp)["segments"]
+
+    def save_manifest(self):
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fp:
+            json.dump({"name": self.name, "segments": self.segments}, fp, indent=1)
+        os.replace(tmp, self.manifest_path)
+
+    # ------------------ Writing ------------------ #
+    def record(self, frames, timestamp=None):
+        """ One poll: [name, payload] arrays or LazyFrames (stored raw, decoded only when read back) """
+        timestamp = time.time() if timestamp is None else timestamp
+        self.ring.append((timestamp, frames))
+
+        if self.segment is None or self._should_rotate(timestamp):
+            self.rotate(timestamp)
+
+        frames_text = ", ".join(frame_json(frame) for frame in frames)
+        line = f'{{"timestamp": {json.dumps(timestamp)}, "frames": [{frames_text}]}}\n'.encode("utf-8")
+        self.fp.write(line)
+        self.segment["end"] = timestamp
+        self.segment["frames"] += 1
+        self.segment["bytes"] += len(line)
+
+        # sync-flush the gzip stream now and then so a crash loses at most a few seconds
+        if timestamp - self.last_flush >= self.flush_seconds:
+            self.fp.flush()
+            self.last_flush = timestamp
+
+    def _should_rotate(self, now):
+        return (self.segment["bytes"] >= self.segment_bytes or
+                now - self.segment["start"] >= self.segment_seconds)
+
+    def rotate(self, now=None):
+        now = time.time() if now is None else now
+        self._close_segment()
+        file_name = f"{self.name}-{int(now * 1000)}.jsonl.gz"
+        self.segment = {"file": file_name, "start": now, "end": now, "frames": 0, "bytes": 0, "compressed_bytes": None}
+        # compressed output is batched by the group-commit writer, not written per poll
+        self.raw = GroupCommitWriter(os.path.join(self.directory, file_name))
+        self.fp = gzip.GzipFile(filename=file_name, mode="wb", fileobj=self.raw)
+        self.segments.append(self.segment)
+        self.expire(now)
+        self.save_manifest()
+
+    def _close_segment(self):
+        if self.fp is None:
+            return
+        self.fp.close()
+        self.raw.close()
+        self.fp = None
+        self.raw = None
+        path = os.path.join(self.directory, self.segment["file"])
+        self.segment["compressed_bytes"] = os.path.getsize(path) if os.path.exists(path) else 0
+
+    def expire(self, now):
+        keep = []
+        for i, segment in enumerate(self.segments):
+            is_current = segment is self.segment
+            too_old = segment["end"] < now - self.retention_seconds
+            too_many = len(self.segments) - i > self.max_segments
+            if not is_current and (too_old or too_many):
+                try:
+                    os.remove(os.path.join(self.directory, segment["file"]))
+                except FileNotFoundError:
+                    pass
+                logger.info(f"Capture segment {segment['file']} expired")
+            else:
+                keep.append(segment)
+        self.segments = keep
+
+    def close(self):
+        self._close_segment()
+        self.segment = None
+        self.save_manifest()
+
+    # ------------------ Reading ------------------ #
+    def recent(self):
+        return [(timestamp, [f.array() if isinstance(f, LazyFrame) else f for f in frames])
+                for timestamp, frames in self.ring]
+
+    def iter_polls(self):
+        """ (timestamp, frames) of every poll still on disk, oldest first """
+        if self.fp is not None:
+            self.fp.flush()
+        for segment in self.segments:
+            path = os.path.join(self.directory, segment["file"])
+            try:
+                with gzip.open(path, "rt", encoding="utf-8") as fp:
+                    for line in fp:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            break  # tail of a segment cut short by a crash
+                        yield record["timestamp"], record["frames"]
+            except (EOFError, FileNotFoundError):
+                continue
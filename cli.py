@@ -0,0 +1,251 @@
+""" Single entry point for the scraper and live tracker: python cli.py <command> --help """
+# Subcommands import what they need (bs4, curl_cffi, cloudscraper, ...) when they run
+import sys
+import json
+import logging
+import argparse
+
+from configs import LOG_FORMAT, LOG_DATEFMT, METRICS_ENABLED, METRICS_PORT, QUEUE_PATH
+
+logger = logging.getLogger("hltv")
+
+
+def dump(data, output=None):
+    text = json.dumps(data, ensure_ascii=False, indent=4)
+    if output:
+        with open(output, "w", encoding="utf-8") as fp:
+            fp.write(text)
+        logger.info(f"Saved {output}")
+    else:
+        print(text)
+
+
+# ------------------ Subcommands ------------------ #
+def cmd_discover(args):
+    if args.event is not None:
+        from main import get_event_matches
+        for match in get_event_matches(args.event):
+            print(f"{match['url']}\t{match['status'].value}")
+        return
+    from main import get_match_list_day
+    for url in get_match_list_day(args.days_ahead):
+        print(url)
+
+
+def enrich(matches, enabled):
+    """ Joins player profiles onto the matches when --enrich was given """
+    if enabled:
+        from player_profiles import ProfileEnricher
+        ProfileEnricher().enrich(matches)
+    return matches
+
+
+def cmd_scrape(args):
+    from match import MatchFactory
+    matches = []
+    for url in args.urls:
+        matches.append(MatchFactory(url, None, logger, args.ensure_pt).get_match())
+    matches = [match.to_json() for match in enrich(matches, args.enrich)]
+    dump(matches if len(matches) > 1 else matches[0], args.output)
+
+
+def cmd_reparse(args):
+    from match import MatchFactory
+    if args.archive:
+        from archive import get_default_archive
+        archive = get_default_archive()
+        if args.match_id:
+            entry = archive.latest(match_id=args.match_id)
+            pages = [(entry["url"], archive.get_text(entry["sha256"]))] if entry else []
+        else:
+            pages = archive.iter_latest(matches_only=True)
+    else:
+        if not args.file or not args.url:
+            sys.exit("reparse needs FILE and --url, or --archive")
+        with open(args.file, "r", encoding="utf-8") as fp:
+            pages = [(args.url, fp.read())]
+
+    matches = [MatchFactory(url, html, logger, args.ensure_pt).get_match().to_json() for url, html in pages]
+    enrich(matches, args.enrich)
+    dump(matches if len(matches) != 1 else matches[0], args.output)
+
+
+def cmd_live(args):
+    from live_match import LiveMatch
+    from group_commit import install_signal_handlers
+    install_signal_handlers()
+    if METRICS_ENABLED:
+        from metrics import start_http_server
+        start_http_server(METRICS_PORT)
+    LiveMatch(args.url, capture=args.capture, store=args.store).run()
+
+
+def cmd_state(args):
+    from event_store import EventStore
+    if args.from_capture:
+        from capture import RawCapture
+        store = EventStore.from_capture(RawCapture(args.name))
+    else:
+        store = EventStore(args.name)
+    map_name = int(args.map) if args.map.isdigit() else args.map
+    state = store.state_at(map_name, args.round)
+    store.close()
+    if state is None:
+        sys.exit(f"{args.name}: no state for map {args.map}" + (f" round {args.round}" if args.round else ""))
+    dump(state.snapshot(), args.output)
+
+
+def cmd_watch(args):
+    import time
+    from live_page import LivePageRefresher
+    refresher = LivePageRefresher(args.url, logger)
+    while True:
+        diff = refresher.refresh()
+        if diff:
+            print(json.dumps(diff, ensure_ascii=False), flush=True)
+        # no match yet, or a page without a parsed status: keep watching
+        status = getattr(refresher.match, "status", None)
+        if getattr(status, "name", "?") == "PAST":
+            break
+        time.sleep(args.interval)
+
+
+def cmd_daemon(args):
+    import signal
+    from daemon import Daemon
+    if METRICS_ENABLED:
+        from metrics import start_http_server
+        start_http_server(METRICS_PORT)
+    daemon = Daemon()
+    signal.signal(signal.SIGINT, daemon.stop)
+    signal.signal(signal.SIGTERM, daemon.stop)
+    daemon.run()
+
+
+def cmd_export(args):
+    from export import ParquetExporter, load_matches
+    exporter = ParquetExporter(args.root) if args.root else ParquetExporter()
+    for path in args.files:
+        exporter.append(load_matches(path))
+
+
+def cmd_crawl(args):
+    import signal
+    import work_queue
+    if args.remote and args.action in ("serve", "results"):
+        sys.exit(f"crawl {args.action} runs next to the queue file, not with --remote")
+    queue = work_queue.RemoteQueue(args.remote) if args.remote else work_queue.WorkQueue(args.queue)
+
+    if args.action == "enqueue":
+        urls = list(args.urls)
+        if args.file:
+            with open(args.file, "r", encoding="utf-8") as fp:
+                urls.extend(line.strip() for line in fp if line.strip())
+        if args.days is not None:
+            from main import get_match_list_day
+            for days_ahead in range(args.days[0], args.days[1] + 1):
+                urls.extend(get_match_list_day(days_ahead))
+        if args.event is not None:
+            from main import get_event_matches
+            urls.extend(match["url"] for match in get_event_matches(args.event))
+        logger.info(f"Enqueued {queue.enqueue(urls)} new of {len(urls)} URLs")
+    elif args.action == "work":
+        worker = work_queue.Worker(queue, owner=args.worker_id, batch=args.batch)
+        signal.signal(signal.SIGINT, worker.stop)
+        signal.signal(signal.SIGTERM, worker.stop)
+        worker.run(exit_when_empty=args.exit_when_empty)
+    elif args.action == "serve":
+        server = work_queue.serve_queue(queue, args.host, args.port)
+        try:
+            signal.pause()
+        except KeyboardInterrupt:
+            server.shutdown()
+    elif args.action == "status":
+        dump(queue.stats())
+    elif args.action == "results":
+        dump(enrich(queue.results(), args.enrich), args.output)
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("-q", "--quiet", action="store_true", help="only log warnings and errors")
+    parser = argparse.ArgumentParser(prog="hltv", description="HLTV match scraper and live tracker")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("discover", parents=[common], help="list match URLs for a day")
+    p.add_argument("--days-ahead", type=int, default=0)
+    p.add_argument("--event", type=int, help="all matches of an HLTV event id (upcoming, live and finished) instead of one day")
+    p.set_defaults(func=cmd_discover)
+
+    p = sub.add_parser("scrape", parents=[common], help="fetch and parse match pages")
+    p.add_argument("urls", nargs="+")
+    p.add_argument("--ensure-pt", action="store_true")
+    p.add_argument("--enrich", action="store_true", help="join player profiles (fetched once per player, cached)")
+    p.add_argument("--output")
+    p.set_defaults(func=cmd_scrape)
+
+    p = sub.add_parser("reparse", parents=[common], help="parse saved or archived match pages without fetching")
+    p.add_argument("file", nargs="?")
+    p.add_argument("--url", help="match URL the saved file belongs to")
+    p.add_argument("--archive", action="store_true", help="re-parse pages from the raw page archive")
+    p.add_argument("--match-id")
+    p.add_argument("--ensure-pt", action="store_true")
+    p.add_argument("--enrich", action="store_true", help="join player profiles (fetched once per player, cached)")
+    p.add_argument("--output")
+    p.set_defaults(func=cmd_reparse)
+
+    p = sub.add_parser("live", parents=[common], help="track a live match through the scorebot")
+    p.add_argument("url")
+    p.add_argument("--capture", action="store_true", help="keep a raw capture of every poll")
+    p.add_argument("--store", action="store_true", help="keep an event log with snapshots for per-round state lookups")
+    p.set_defaults(func=cmd_live)
+
+    p = sub.add_parser("state", parents=[common], help="scoreboard and economy of a stored match at the end of a round")
+    p.add_argument("name", help="store name, e.g. match-2388596")
+    p.add_argument("map", help="map name or 1-based map number")
+    p.add_argument("round", nargs="?", type=int, help="1-based round (default: latest state of the map)")
+    p.add_argument("--from-capture", action="store_true", help="build the store from the raw capture of the same name first")
+    p.add_argument("--output")
+    p.set_defaults(func=cmd_state)
+
+    p = sub.add_parser("watch", parents=[common], help="print map score / stat row changes of a live match page as JSON lines")
+    p.add_argument("url")
+    p.add_argument("--interval", type=float, default=60, help="seconds between conditional refreshes")
+    p.set_defaults(func=cmd_watch)
+
+    p = sub.add_parser("daemon", parents=[common], help="schedule scrapes and live tracking continuously")
+    p.set_defaults(func=cmd_daemon)
+
+    p = sub.add_parser("crawl", parents=[common], help="distributed crawl through a leased work queue")
+    p.add_argument("action", choices=("enqueue", "work", "serve", "status", "results"))
+    p.add_argument("urls", nargs="*", help="match URLs to enqueue")
+    p.add_argument("--queue", default=QUEUE_PATH, help="SQLite queue file")
+    p.add_argument("--remote", help="URL of a queue started with `crawl serve` (workers on other hosts)")
+    p.add_argument("--file", help="enqueue: file with one match URL per line")
+    p.add_argument("--days", type=int, nargs=2, metavar=("FROM", "TO"), help="enqueue: discover matches FROM..TO days ahead")
+    p.add_argument("--event", type=int, help="enqueue: every match of an HLTV event id")
+    p.add_argument("--worker-id")
+    p.add_argument("--batch", type=int, default=1, help="work: URLs leased at a time")
+    p.add_argument("--exit-when-empty", action="store_true")
+    p.add_argument("--host", default="127.0.0.1", help="address to serve on; the API is unauthenticated, "
+                   "only bind a public interface on a trusted network")
+    p.add_argument("--port", type=int)
+    p.add_argument("--enrich", action="store_true", help="results: join player profiles")
+    p.add_argument("--output")
+    p.set_defaults(func=cmd_crawl)
+
+    p = sub.add_parser("export", parents=[common], help="append scraped matches (JSON / JSON lines) to the Parquet datasets")
+    p.add_argument("files", nargs="+")
+    p.add_argument("--root", help="dataset directory (default: configs.EXPORT_DIR)")
+    p.set_defaults(func=cmd_export)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.WARNING if args.quiet else logging.INFO, format=LOG_FORMAT, datefmt=LOG_DATEFMT)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
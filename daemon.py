@@ -0,0 +1,205 @@
+import json
+import time
+import heapq
+import signal
+import logging
+import itertools
+import threading
+from datetime import datetime
+
+from match import MatchFactory, MatchStatus
+from main import get_match_list_day, get_event_matches, match_key
+from live_match import LiveMatch
+from live_page import LivePageRefresher
+from configs import (DAEMON_DISCOVERY_INTERVAL, DAEMON_DISCOVERY_DAYS, DAEMON_EVENTS, DAEMON_PREMATCH_LEAD,
+                     DAEMON_STARTING_POLL, DAEMON_LIVE_CHECK, DAEMON_RECHECK_INTERVAL, DAEMON_TRACKER_JOIN_TIMEOUT,
+                     DAEMON_OUTPUT_PATH, DAEMON_DIFF_PATH, METRICS_ENABLED, METRICS_PORT, LOG_FORMAT, LOG_DATEFMT)
+from metrics import start_http_server
+
+logger = logging.getLogger(__name__)
+
+
+class Job():
+    DISCOVER = "discover"
+    SCRAPE = "scrape"
+
+    def __init__(self, kind, url=None):
+        self.kind = kind
+        self.url = url
+
+    def __repr__(self):
+        return f"Job({self.kind}{', ' + self.url if self.url else ''})"
+
+
+class Daemon():
+    """ Long-running scheduler: discovers matches, re-checks them by status and tracks the live ones """
+    def __init__(self, output_path=DAEMON_OUTPUT_PATH, diff_path=DAEMON_DIFF_PATH, events=DAEMON_EVENTS):
+        self.output_path = output_path
+        self.diff_path = diff_path
+        self.events = list(events)
+        self.queue = []
+        self.seq = itertools.count()
+        # keyed by match id: listings can link the same match under different slugs
+        self.known = {}        # match id -> last MatchStatus
+        self.trackers = {}     # match id -> (LiveMatch, Thread)
+        self.refreshers = {}   # match id -> LivePageRefresher, while LIVE
+        self.stop_event = threading.Event()
+
+    # ------------------ Queue ------------------ #
+    def schedule(self, job, at):
+        heapq.heappush(self.queue, (at, next(self.seq), job))
+
+    def run(self):
+        self.schedule(Job(Job.DISCOVER), time.time())
+        while not self.stop_event.is_set():
+            if not self.queue:
+                self.stop_event.wait(DAEMON_RECHECK_INTERVAL)
+                continue
+            at, _, job = self.queue[0]
+            wait = at - time.time()
+            if wait > 0:
+                self.stop_event.wait(wait)
+                continue
+            heapq.heappop(self.queue)
+            try:
+                if job.kind == Job.DISCOVER:
+                    self.discover()
+                else:
+                    self.scrape(job.url)
+            except Exception:
+                logger.exception(f"Error running {job}, retrying in {DAEMON_RECHECK_INTERVAL}s")
+                self.schedule(job, time.time() + DAEMON_RECHECK_INTERVAL)
+        self.shutdown()
+
+    def stop(self, *args):
+        logger.info("Stopping daemon...")
+        self.stop_event.set()
+
+    # ------------------ Jobs ------------------ #
+    def discover(self):
+        new = 0
+        for days_ahead in range(DAEMON_DISCOVERY_DAYS):
+            for url in get_match_list_day(days_ahead):
+                key = match_key(url)
+                if key not in self.known:
+                    self.known[key] = None
+                    self.schedule(Job(Job.SCRAPE, url), time.time())
+                    new += 1
+        for event_id in self.events:
+            for match in get_event_matches(event_id):
+                url, key = match["url"], match_key(match["url"])
+                if key in self.known:
+                    continue
+                self.known[key] = None
+                # the listing already has the start time: no page fetch until it's due
+                at = time.time()
+                if match["status"] == MatchStatus.FUTURE and match["start"]:
+                    at = max(at, match["start"] - DAEMON_PREMATCH_LEAD)
+                self.schedule(Job(Job.SCRAPE, url), at)
+                new += 1
+        logger.info(f"Discovery found {new} new matches, {len(self.known)} tracked")
+        self.schedule(Job(Job.DISCOVER), time.time() + DAEMON_DISCOVERY_INTERVAL)
+
+    def scrape(self, url):
+        match = self.refresh_live(url)
+        if match is None:
+            match = MatchFactory(url, None, logger).get_match()
+        key = match_key(url)
+        previous = self.known.get(key)
+        status = getattr(match, "status", None)
+        if status != previous:
+            logger.info(f"{url}: {previous.name if previous else 'NEW'} -> {status.name if status else None}")
+        self.known[key] = status
+        now = time.time()
+
+        if status == MatchStatus.FUTURE:
+            start = getattr(match, "start_timestamp", None) or self.parse_datetime(match.datetime)
+            if start is None:
+                next_at = now + DAEMON_RECHECK_INTERVAL
+            elif start - DAEMON_PREMATCH_LEAD > now:
+                next_at = start - DAEMON_PREMATCH_LEAD
+            else:
+                # due or delayed: poll until it goes live
+                next_at = now + DAEMON_STARTING_POLL
+            self.schedule(Job(Job.SCRAPE, url), next_at)
+
+        elif status == MatchStatus.LIVE:
+            self.attach_tracker(url)
+            if key not in self.refreshers:
+                self.refreshers[key] = LivePageRefresher(url, logger)
+            self.schedule(Job(Job.SCRAPE, url), now + DAEMON_LIVE_CHECK)
+
+        elif status == MatchStatus.PAST:
+            self.detach_tracker(url)
+            self.refreshers.pop(key, None)
+            self.save(match)
+            # keep the id in self.known so discovery doesn't pick it up again
+            logger.info(f"{url}: final stats saved, released")
+
+        else:
+            self.schedule(Job(Job.SCRAPE, url), now + DAEMON_RECHECK_INTERVAL)
+
+    def refresh_live(self, url):
+        """ Latest Match of a LIVE url via a conditional refresh, None if the url isn't live """
+        refresher = self.refreshers.get(match_key(url))
+        if refresher is None:
+            return None
+        diff = refresher.refresh()
+        if diff:
+            logger.info(f"{url}: {len(diff['maps'])} map and {len(diff['stats'])} stat row changes")
+            with open(self.diff_path, "a", encoding="utf-8") as fp:
+                fp.write(json.dumps(diff, ensure_ascii=False) + "\n")
+        return refresher.match
+
+    @staticmethod
+    def parse_datetime(value):
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, "%d-%m-%Y %H:%M").timestamp()
+        except ValueError:
+            return None
+
+    # ------------------ Live tracking ------------------ #
+    def attach_tracker(self, url):
+        tracker = self.trackers.get(match_key(url))
+        if tracker and tracker[1].is_alive():
+            return
+        lm = LiveMatch(url)
+        thread = threading.Thread(target=lm.run, name=f"live-{lm.match_id}", daemon=True)
+        thread.start()
+        self.trackers[match_key(url)] = (lm, thread)
+        logger.info(f"{url}: live tracking started")
+
+    def detach_tracker(self, url):
+        tracker = self.trackers.pop(match_key(url), None)
+        if not tracker:
+            return
+        lm, thread = tracker
+        lm.stop()
+        # the loop wakes up from its poll wait and closes its writers before the thread ends
+        thread.join(DAEMON_TRACKER_JOIN_TIMEOUT)
+        if thread.is_alive():
+            logger.warning(f"{url}: live tracker still running after {DAEMON_TRACKER_JOIN_TIMEOUT}s "
+                           f"(stuck in a request?), its files may not be closed")
+            return
+        logger.info(f"{url}: live tracking stopped")
+
+    def save(self, match):
+        with open(self.output_path, "a", encoding="utf-8") as fp:
+            fp.write(json.dumps(match.to_json(), ensure_ascii=False) + "\n")
+
+    def shutdown(self):
+        for key in list(self.trackers):
+            self.detach_tracker(key)
+        logger.info("Daemon stopped.")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT, datefmt=LOG_DATEFMT)
+    if METRICS_ENABLED:
+        start_http_server(METRICS_PORT)
+    daemon = Daemon()
+    signal.signal(signal.SIGINT, daemon.stop)
+    signal.signal(signal.SIGTERM, daemon.stop)
+    daemon.run()
@@ -0,0 +1,240 @@
+import os
+import json
+import socket
+import asyncio
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+# Overflow policies of a subscriber buffer
+DROP_OLDEST = "drop_oldest"   # ring buffer: newest events win
+DROP_NEWEST = "drop_newest"   # keep the backlog, discard what doesn't fit
+KEEP_LATEST = "keep_latest"   # coalesce: only the latest event of each name is kept
+
+
+class Subscription():
+    """ Bounded per-subscriber buffer; offer() never blocks, the overflow policy decides what is dropped """
+    def __init__(self, events=None, maxsize=1000, policy=DROP_OLDEST):
+        self.events = set(events) if events else None
+        self.maxsize = maxsize
+        self.policy = policy
+        self.buffer = deque()
+        self.latest = {}
+        self.cond = threading.Condition()
+        self.closed = False
+        self.delivered = 0
+        self.dropped = 0
+
+    def wants(self, event_name):
+        return self.events is None or event_name in self.events
+
+    def offer(self, event_name, data):
+        with self.cond:
+            if self.closed:
+                return
+            if self.policy == KEEP_LATEST:
+                if event_name in self.latest:
+                    self.dropped += 1
+                else:
+                    self.buffer.append(event_name)
+                self.latest[event_name] = data
+            elif len(self.buffer) >= self.maxsize:
+                self.dropped += 1
+                if self.policy == DROP_NEWEST:
+                    return
+                self.buffer.popleft()
+                self.buffer.append((event_name, data))
+            else:
+                self.buffer.append((event_name, data))
+            self.cond.notify()
+
+    def _pop(self):
+        item = self.buffer.popleft()
+        if self.policy == KEEP_LATEST:
+            return item, self.latest.pop(item)
+        return item
+
+    def get(self, timeout=None):
+        """ Next (event_name, data), or None on timeout / once closed and drained """
+        with self.cond:
+            if not self.buffer and not self.closed:
+                self.cond.wait(timeout)
+            if not self.buffer:
+                return None
+            self.delivered += 1
+            return self._pop()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def pending(self):
+        return len(self.buffer)
+
+
+class CallbackSubscription(Subscription):
+    """ Runs callback(event_name, data) on its own thread, so a slow consumer only fills its own buffer """
+    def __init__(self, callback, events=None, maxsize=1000, policy=DROP_OLDEST, name=None):
+        super().__init__(events, maxsize, policy)
+        self.callback = callback
+        self.errors = 0
+        self.thread = threading.Thread(target=self._worker, name=name or f"bus-{getattr(callback, '__name__', 'callback')}", daemon=True)
+        self.thread.start()
+
+    def _worker(self):
+        while True:
+            item = self.get()
+            if item is None:
+                if self.closed:
+                    return
+                continue
+            try:
+                self.callback(*item)
+            except Exception:
+                self.errors += 1
+                logger.exception(f"Subscriber {self.thread.name} failed on '{item[0]}' event")
+
+    def close(self, timeout=None):
+        """ Stops taking events and waits until the buffered ones went through the callback """
+        super().close()
+        if threading.current_thread() is not self.thread:
+            self.thread.join(timeout)
+            if self.thread.is_alive():
+                raise TimeoutError(f"Subscriber {self.thread.name} still draining {self.pending()} events after {timeout}s")
+
+
+class AsyncSubscription(Subscription):
+    """ Subscription consumed from an asyncio loop: `async for name, data in sub` """
+    def __init__(self, loop, events=None, maxsize=1000, policy=DROP_OLDEST):
+        super().__init__(events, maxsize, policy)
+        self.loop = loop
+        self.ready = asyncio.Event()
+
+    def offer(self, event_name, data):
+        super().offer(event_name, data)
+        self.loop.call_soon_threadsafe(self.ready.set)
+
+    def close(self):
+        super().close()
+        self.loop.call_soon_threadsafe(self.ready.set)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while True:
+            with self.cond:
+                if self.buffer:
+                    self.delivered += 1
+                    return self._pop()
+                if self.closed:
+                    raise StopAsyncIteration
+                self.ready.clear()
+            await self.ready.wait()
+
+
+class EventBus():
+    """ In-process fan-out of decoded live events to independent subscribers """
+    def __init__(self):
+        self.subscriptions = []
+        self.lock = threading.Lock()
+        self.published = 0
+
+    def add(self, subscription):
+        with self.lock:
+            self.subscriptions = self.subscriptions + [subscription]
+        return subscription
+
+    def subscribe(self, callback=None, events=None, maxsize=1000, policy=DROP_OLDEST, name=None):
+        if callback is None:
+            return self.add(Subscription(events, maxsize, policy))
+        return self.add(CallbackSubscription(callback, events, maxsize, policy, name))
+
+    def subscribe_async(self, loop=None, events=None, maxsize=1000, policy=DROP_OLDEST):
+        return self.add(AsyncSubscription(loop or asyncio.get_running_loop(), events, maxsize, policy))
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscriptions = [s for s in self.subscriptions if s is not subscription]
+        subscription.close()
+
+    def publish(self, event_name, data):
+        self.published += 1
+        for subscription in self.subscriptions:
+            if subscription.wants(event_name):
+                subscription.offer(event_name, data)
+
+    def close(self):
+        with self.lock:
+            subscriptions, self.subscriptions = self.subscriptions, []
+        for subscription in subscriptions:
+            subscription.close()
+
+    def stats(self):
+        return [{"type": type(s).__name__, "events": sorted(s.events) if s.events else None,
+                 "pending": s.pending(), "delivered": s.delivered, "dropped": s.dropped}
+                for s in self.subscriptions]
+
+
+class UnixSocketFanout():
+    """ Serves bus events as JSON lines on a local Unix socket, one bounded subscription per client """
+    def __init__(self, bus, path, events=None, maxsize=1000, policy=DROP_OLDEST, send_timeout=5):
+        self.bus = bus
+        self.path = path
+        self.send_timeout = send_timeout
+        self.events = events
+        self.maxsize = maxsize
+        self.policy = policy
+        self.clients = []
+        self.lock = threading.Lock()    # clients are dropped from their own send threads
+        if os.path.exists(path):
+            os.unlink(path)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(path)
+        self.server.listen()
+        self.running = True
+        self.thread = threading.Thread(target=self._accept_loop, name=f"fanout-{path}", daemon=True)
+        self.thread.start()
+
+    def _accept_loop(self):
+        while self.running:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            conn.settimeout(self.send_timeout)  # a stuck client gets dropped instead of pinning its thread
+            client = {"conn": conn, "sub": None}
+
+            def send(event_name, data, client=client):
+                line = json.dumps([event_name, data], ensure_ascii=False) + "\n"
+                try:
+                    client["conn"].sendall(line.encode("utf-8"))
+                except OSError:
+                    self._drop(client)
+
+            client["sub"] = self.bus.subscribe(send, self.events, self.maxsize, self.policy,
+                                               name=f"fanout-client-{conn.fileno()}")
+            with self.lock:
+                self.clients.append(client)
+
+    def _drop(self, client):
+        with self.lock:
+            if client in self.clients:
+                self.clients.remove(client)
+        if client["sub"] is not None:
+            self.bus.unsubscribe(client["sub"])
+        client["conn"].close()
+
+    def close(self):
+        self.running = False
+        self.server.close()
+        with self.lock:
+            clients = list(self.clients)
+        for client in clients:
+            self._drop(client)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
@@ -0,0 +1,256 @@
+import os
+import json
+import time
+import bisect
+import logging
+
+from configs import STORE_DIR, STORE_SNAPSHOT_EVERY
+from live_state import LiveMatchState, log_entries
+from group_commit import GroupCommitWriter
+
+logger = logging.getLogger(__name__)
+
+
+# Why a snapshot was taken
+ROUND_END = 0   # right after the RoundEnd of `round`
+PERIODIC = 1    # every snapshot_every events
+MAP_END = 2     # last state of a map, taken before the first event of the next one
+
+
+class EventStore():
+    """ Event-sourced store of one live match: event log, state snapshots and their index """
+    def __init__(self, name, directory=STORE_DIR, snapshot_every=STORE_SNAPSHOT_EVERY, match_id=None):
+        self.name = name
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        os.makedirs(directory, exist_ok=True)
+        # [seq, timestamp, kind, payload] per scoreboard frame or log entry (Kill, RoundEnd, ...)
+        self.events_path = os.path.join(directory, f"{name}.events.jsonl")
+        # LiveMatchState.dump() at every round end, every snapshot_every events and every map end
+        self.snapshots_path = os.path.join(directory, f"{name}.snapshots.jsonl")
+        # [map_index, map_name, round, reason, seq, event_offset, snapshot_offset] per snapshot
+        self.index_path = os.path.join(directory, f"{name}.snapshots.idx")
+
+        self.index = []     # snapshot index entries, in write order
+        self.keys = []      # (map_index, seq, reason) of each entry, increasing
+        self.state = LiveMatchState(match_id)
+        self.map_index = -1
+        self.seq = 0
+        self.since_snapshot = 0
+        self.recover()
+
+        self.events_fp = GroupCommitWriter(self.events_path)
+        self.snapshots_fp = open(self.snapshots_path, "ab")
+        self.index_fp = open(self.index_path, "a", encoding="utf-8")
+
+    # ------------------ Recovery ------------------ #
+    def recover(self):
+        """ Reloads the snapshot index and rebuilds the current state from the last snapshot + tail """
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as fp:
+                for line in fp:
+                    line = line.strip()
+                    if line:
+                        self._add_index(json.loads(line))
+        offset = 0
+        if self.index:
+            entry = self.index[-1]
+            self.state = self.load_snapshot(entry)
+            self.map_index = entry[0]
+            self.seq = entry[4]
+            offset = entry[5]
+        if os.path.exists(self.events_path):
+            with open(self.events_path, "rb+") as fp:
+                fp.seek(offset)
+                for line in fp:
+                    try:
+                        seq, _, kind, payload = json.loads(line)
+                    except ValueError:
+                        break
+                    self._fold(kind, payload)
+                    self.seq = seq
+                    self.since_snapshot += 1
+                    offset += len(line)
+                # drop a line cut short by a crash so new events start on a fresh line
+                fp.truncate(offset)
+        if self.seq:
+            logger.info(f"Event store {self.name} recovered at event {self.seq}, {len(self.index)} snapshots")
+
+    def _add_index(self, entry):
+        self.index.append(entry)
+        self.keys.append((entry[0], entry[4], entry[3]))
+
+    # ------------------ Writing ------------------ #
+    def append(self, event_name, data, timestamp=None):
+        """ Stores and folds one decoded scorebot frame; log frames are split into their entries """
+        if isinstance(data, str):
+            data = json.loads(data)
+        timestamp = time.time() if timestamp is None else timestamp
+        if event_name == "scoreboard":
+            self._append(timestamp, "scoreboard", data)
+        elif event_name == "log":
+            # a reconnect replays a backlog of entries already stored
+            for kind, payload in self.state.log_cursor.unseen(log_entries(data)):
+                self._append(timestamp, kind, payload)
+
+    def _append(self, timestamp, kind, payload):
+        if self.starts_new_map(kind, payload):
+            self.snapshot(MAP_END)
+        self.seq += 1
+        self.events_fp.write((json.dumps([self.seq, timestamp, kind, payload], ensure_ascii=False) + "\n").encode("utf-8"))
+        self._fold(kind, payload)
+        self.since_snapshot += 1
+        if kind == "RoundEnd":
+            self.snapshot(ROUND_END)
+        elif self.since_snapshot >= self.snapshot_every:
+            self.snapshot(PERIODIC)
+
+    def _fold(self, kind, payload, state=None):
+        state = state or self.state
+        before = state.map_name
+        if kind == "scoreboard":
+            state.apply_scoreboard(payload)
+        else:
+            state.apply_log(kind, payload)
+        if state is self.state and state.map_name is not None and state.map_name != before:
+            self.map_index += 1
+
+    def starts_new_map(self, kind, payload, state=None):
+        current = (state or self.state).map_name
+        if current is None:
+            return False
+        if kind == "scoreboard":
+            new = payload.get("mapName")
+        elif kind == "MatchStarted":
+            new = payload.get("map")
+        else:
+            return False
+        return bool(new) and new != current
+
+    def snapshot(self, reason):
+        if self.map_index < 0:
+            return
+        # events before the snapshot reach the file before the snapshot and index do
+        self.events_fp.flush()
+        line = (json.dumps(self.state.dump(), ensure_ascii=False) + "\n").encode("utf-8")
+        snapshot_offset = self.snapshots_fp.tell()
+        self.snapshots_fp.write(line)
+        self.snapshots_fp.flush()
+        entry = [self.map_index, self.state.map_name, len(self.state.rounds), reason,
+                 self.seq, self.events_fp.tell(), snapshot_offset]
+        self.index_fp.write(json.dumps(entry) + "\n")
+        self.index_fp.flush()
+        self._add_index(entry)
+        self.since_snapshot = 0
+
+    def close(self):
+        for fp in (self.events_fp, self.snapshots_fp, self.index_fp):
+            fp.close()
+
+    # ------------------ Reading ------------------ #
+    def load_snapshot(self, entry):
+        with open(self.snapshots_path, "rb") as fp:
+            fp.seek(entry[6])
+            return LiveMatchState.restore(json.loads(fp.readline()))
+
+    def iter_events(self, offset=0):
+        """ (seq, timestamp, kind, payload) from a byte offset of the event log """
+        if not os.path.exists(self.events_path):
+            return
+        self.events_fp.flush()
+        with open(self.events_path, "rb") as fp:
+            fp.seek(offset)
+            for line in fp:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    break  # partially written last line
+
+    def maps(self):
+        """ Map names in play order """
+        names = []
+        for entry in self.index:
+            if entry[0] == len(names):
+                names.append(entry[1])
+        return names
+
+    def map_ordinal(self, map_name):
+        """ 0-based map index from a map name or a 1-based ordinal """
+        if isinstance(map_name, int):
+            return map_name - 1
+        for entry in self.index:
+            if entry[1] == map_name:
+                return entry[0]
+        # map started but no snapshot yet: it can only be the one in play
+        return self.map_index if self.state.map_name == map_name else None
+
+    def state_at(self, map_name, round=None):
+        """ LiveMatchState at the end of round `round` (None: latest) of a map given by name or 1-based ordinal """
+        map_index = self.map_ordinal(map_name)
+        if map_index is None or map_index < 0:
+            return None
+
+        lo = bisect.bisect_left(self.keys, (map_index,))
+        hi = bisect.bisect_left(self.keys, (map_index + 1,))
+        # a Restart sends the round count back to 0: only the snapshots after the last one count
+        start = lo
+        for i in range(lo + 1, hi):
+            if self.index[i][2] < self.index[i - 1][2]:
+                start = i
+        over = hi > start and self.index[hi - 1][3] == MAP_END
+
+        if round is None:
+            if over:
+                return self.load_snapshot(self.index[hi - 1])
+            base = hi - 1
+        else:
+            for i in range(hi - 1, start - 1, -1):
+                if self.index[i][2] == round and self.index[i][3] == ROUND_END:
+                    return self.load_snapshot(self.index[i])
+            if over:
+                # the map is over; without a round-end snapshot that round never happened
+                return None
+            base = start - 1
+            for i in range(start, hi):
+                if self.index[i][2] >= round:
+                    break
+                base = i
+
+        if base < 0:
+            state, current_map, offset = LiveMatchState(self.state.match_id), -1, 0
+        else:
+            entry = self.index[base]
+            state, current_map, offset = self.load_snapshot(entry), entry[0], entry[5]
+
+        # Short tail: at most snapshot_every events up to the next snapshot
+        for _, _, kind, payload in self.iter_events(offset):
+            if current_map == map_index and self.starts_new_map(kind, payload, state):
+                break
+            before = state.map_name
+            self._fold(kind, payload, state)
+            if state.map_name is not None and state.map_name != before:
+                current_map += 1
+            if kind == "RoundEnd" and current_map == map_index and round is not None and len(state.rounds) >= round:
+                break
+
+        if current_map != map_index:
+            return None
+        if round is not None and len(state.rounds) < round - 1:
+            return None
+        return state
+
+    # ------------------ Import ------------------ #
+    @classmethod
+    def from_capture(cls, capture, name=None, **kwargs):
+        """ Builds a store from a RawCapture by replaying its polls once; an existing store is reused as is """
+        store = cls(name or capture.name, **kwargs)
+        if store.seq:
+            return store
+        for timestamp, frames in capture.iter_polls():
+            for frame in frames:
+                if isinstance(frame, list) and len(frame) >= 2 and frame[0] in ("scoreboard", "log"):
+                    try:
+                        store.append(frame[0], frame[1], timestamp)
+                    except ValueError:
+                        continue
+        return store
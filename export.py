@@ -0,0 +1,246 @@
+""" Columnar export of scraped matches (Match.to_json() dicts) to hive-partitioned Parquet datasets """
+import os
+import re
+import json
+import uuid
+import logging
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.dataset as ds
+
+from configs import EXPORT_DIR, EXPORT_COMPRESSION
+
+logger = logging.getLogger(__name__)
+
+
+TOTAL_MAP = "total"
+FINISHED = "Match Finished"
+UNKNOWN_DATE = "unknown"
+VETO_RE = re.compile(r"^(\d+)\.\s+(.*?)\s+(removed|picked)\s+(.+)$")
+LEFT_OVER_RE = re.compile(r"^(\d+)\.\s+(.+?)\s+was left over$")
+
+CATEGORY = pa.dictionary(pa.int32(), pa.string())
+
+# <root>/<table>/date=YYYY-MM-DD/part-*.parquet; low-cardinality strings are dictionary-encoded
+SCHEMAS = {
+    "matches": pa.schema([
+        ("match_id", pa.int64()),
+        ("url", pa.string()),
+        ("event", CATEGORY),
+        ("start", pa.timestamp("s")),
+        ("match_status", CATEGORY),
+        ("any_pt", pa.bool_()),
+        ("team_a_name", CATEGORY),
+        ("team_b_name", CATEGORY),
+        ("maps_played", pa.int8()),
+    ]),
+    "lineups": pa.schema([
+        ("match_id", pa.int64()),
+        ("side", CATEGORY),
+        ("team", CATEGORY),
+        ("slot", pa.int8()),
+        ("player_id", pa.int64()),
+        ("nickname", CATEGORY),
+        ("nationality", CATEGORY),
+    ]),
+    "maps": pa.schema([
+        ("match_id", pa.int64()),
+        ("map_index", pa.int8()),
+        ("map_name", CATEGORY),
+        ("team_a_name", CATEGORY),
+        ("team_a_score", pa.int16()),
+        ("team_a_status", CATEGORY),
+        ("team_b_name", CATEGORY),
+        ("team_b_score", pa.int16()),
+        ("team_b_status", CATEGORY),
+    ]),
+    "veto": pa.schema([
+        ("match_id", pa.int64()),
+        ("step", pa.int8()),
+        ("team", CATEGORY),
+        ("action", CATEGORY),
+        ("map_name", CATEGORY),
+    ]),
+    "player_map_stats": pa.schema([
+        ("match_id", pa.int64()),
+        ("map_name", CATEGORY),
+        ("team", CATEGORY),
+        ("nickname", CATEGORY),
+        ("kills", pa.int16()),
+        ("deaths", pa.int16()),
+        ("adr", pa.float64()),
+        ("kast", pa.float64()),
+        ("rating", pa.float64()),
+        ("swing", pa.float64()),
+    ]),
+}
+
+
+# ------------------ Parsing ------------------ #
+def parse_number(value, cast=float):
+    """ '83.3%' -> 83.3, '+7.30%' -> 7.3, '13' -> 13, '-' / '' / None -> None """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return cast(value)
+    value = value.strip().rstrip("%")
+    try:
+        return cast(float(value))
+    except ValueError:
+        return None
+
+
+def parse_start(value):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%d-%m-%Y %H:%M")
+    except ValueError:
+        return None
+
+
+def parse_veto(lines):
+    """ ['1. G2 removed Nuke', ..., '7. Dust2 was left over'] -> [(step, team, action, map)] """
+    steps = []
+    for line in lines:
+        line = line.strip()
+        m = VETO_RE.match(line)
+        if m:
+            steps.append((int(m.group(1)), m.group(2), m.group(3), m.group(4)))
+            continue
+        m = LEFT_OVER_RE.match(line)
+        if m:
+            steps.append((int(m.group(1)), None, "left over", m.group(2)))
+    return steps
+
+
+def match_rows(match):
+    """ One Match.to_json() dict -> (date partition, {table: [row dicts]}) """
+    match_id = int(match["match_id"]) if match.get("match_id") else None
+    start = parse_start(match.get("datetime"))
+    date = start.strftime("%Y-%m-%d") if start else UNKNOWN_DATE
+    maps_info = match.get("maps_info") or []
+
+    rows = {name: [] for name in SCHEMAS}
+    rows["matches"].append({
+        "match_id": match_id,
+        "url": match.get("url"),
+        "event": match.get("event"),
+        "start": start,
+        "match_status": match.get("match_status"),
+        "any_pt": match.get("any_pt"),
+        "team_a_name": match.get("team_a_name"),
+        "team_b_name": match.get("team_b_name"),
+        "maps_played": sum(1 for m in maps_info if m["team_a"]["score"] is not None),
+    })
+
+    for side in ("a", "b"):
+        team = match.get(f"team_{side}_name")
+        for slot, p in enumerate(match.get(f"team_{side}_players") or []):
+            rows["lineups"].append({"match_id": match_id, "side": side, "team": team, "slot": slot,
+                                    "player_id": parse_number(p.get("player_id"), int),
+                                    "nickname": p["nickname"], "nationality": p["nationality"]})
+
+    for i, m in enumerate(maps_info):
+        row = {"match_id": match_id, "map_index": i, "map_name": m["map_name"]}
+        for side in ("team_a", "team_b"):
+            row[f"{side}_name"] = m[side]["name"]
+            row[f"{side}_score"] = parse_number(m[side]["score"], int)
+            row[f"{side}_status"] = m[side]["status"]
+        rows["maps"].append(row)
+
+    for step, team, action, map_name in parse_veto(match.get("veto_info") or []):
+        rows["veto"].append({"match_id": match_id, "step": step, "team": team,
+                             "action": action, "map_name": map_name})
+
+    stats = match.get("stats") or {}
+    scopes = [(TOTAL_MAP, stats.get("total", {}))] + list(stats.get("maps", {}).items())
+    for map_name, teams in scopes:
+        for team, players in teams.items():
+            for p in players:
+                rows["player_map_stats"].append({
+                    "match_id": match_id, "map_name": map_name, "team": team, "nickname": p["nickname"],
+                    "kills": p["kills"], "deaths": p["deaths"],
+                    "adr": parse_number(p["adr"]), "kast": parse_number(p["kast"]),
+                    "rating": parse_number(p["rating"]), "swing": parse_number(p["swing"]),
+                })
+    return date, rows
+
+
+def load_matches(path):
+    """ Match dicts from a JSON file (one match or a list) or a JSON-lines file """
+    with open(path, "r", encoding="utf-8") as fp:
+        text = fp.read()
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    return data if isinstance(data, list) else [data]
+
+
+class ParquetExporter():
+    """ Appends finished matches to the datasets under root, skipping match ids listed in <root>/exported.json """
+    def __init__(self, root=EXPORT_DIR, compression=EXPORT_COMPRESSION):
+        self.root = root
+        self.compression = compression
+        self.state_path = os.path.join(root, "exported.json")
+        os.makedirs(root, exist_ok=True)
+        self.exported = set()
+        if os.path.exists(self.state_path):
+            with open(self.state_path, "r", encoding="utf-8") as fp:
+                self.exported = set(json.load(fp))
+
+    def append(self, matches, finished_only=True):
+        """ Writes one part file per table and date for the not yet exported matches, returns how many were new """
+        partitions = {}
+        new_ids = set()
+        for match in matches:
+            match_id = match.get("match_id")
+            if match_id is None or match_id in self.exported or match_id in new_ids:
+                continue
+            if finished_only and match.get("match_status") != FINISHED:
+                continue
+            new_ids.add(match_id)
+            date, rows = match_rows(match)
+            tables = partitions.setdefault(date, {name: [] for name in SCHEMAS})
+            for name, table_rows in rows.items():
+                tables[name].extend(table_rows)
+
+        part = uuid.uuid4().hex
+        for date, tables in partitions.items():
+            for name, table_rows in tables.items():
+                if not table_rows:
+                    continue
+                directory = os.path.join(self.root, name, f"date={date}")
+                os.makedirs(directory, exist_ok=True)
+                table = pa.Table.from_pylist(table_rows, schema=SCHEMAS[name])
+                pq.write_table(table, os.path.join(directory, f"part-{part}.parquet"), compression=self.compression)
+
+        if new_ids:
+            self.exported |= new_ids
+            tmp = self.state_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as fp:
+                json.dump(sorted(self.exported), fp)
+            os.replace(tmp, self.state_path)
+        logger.info(f"Exported {len(new_ids)} new matches into {len(partitions)} date partitions")
+        return len(new_ids)
+
+    def schema(self, name):
+        return SCHEMAS[name].append(pa.field("date", pa.string()))
+
+    def dataset(self, name):
+        schema = self.schema(name)
+        return ds.dataset(os.path.join(self.root, name), format="parquet", schema=schema,
+                          partitioning=ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive"))
+
+    def read(self, name, dates=None, columns=None):
+        """ Whole table as one pyarrow.Table (to_pandas() for a DataFrame), optionally only some dates """
+        if not os.path.isdir(os.path.join(self.root, name)):
+            # nothing exported yet
+            table = self.schema(name).empty_table()
+            return table.select(columns) if columns else table
+        dataset = self.dataset(name)
+        expr = ds.field("date").isin(list(dates)) if dates else None
+        return dataset.to_table(columns=columns, filter=expr)
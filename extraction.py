@@ -0,0 +1,79 @@
+import soupsieve as sv
+
+
+# ------------------ Converters ------------------ #
+def text(el):
+    return el.get_text(strip=True)
+
+
+def raw_text(el):
+    return el.text.strip()
+
+
+def classes(el):
+    return el.get("class", [])
+
+
+def strings(el):
+    return [s.strip() for s in el.stripped_strings if s.strip()]
+
+
+def element(el):
+    return el
+
+
+class Field():
+    """ One value pulled from a tag: converted, an attribute, or a nested Schema """
+    def __init__(self, selector=None, convert=text, attr=None, schema=None,
+                 many=False, limit=0, required=False, default=None):
+        self.selector = selector   # CSS, relative to the parent tag (None = the parent itself)
+        self.matcher = sv.compile(selector) if selector else None
+        self.convert = convert
+        self.attr = attr
+        self.schema = schema
+        self.many = many            # every match (up to limit) as a list
+        self.limit = limit
+        # missing single match: the parent record is None; many=True skips items whose schema gives None
+        self.required = required
+        self.default = default
+
+    def value(self, el):
+        if self.schema is not None:
+            return self.schema.extract(el)
+        if self.attr is not None:
+            return el.get(self.attr, self.default)
+        return self.convert(el)
+
+    def extract(self, tag):
+        """ Returns the field value, or Schema.MISSING when a required match is absent """
+        if self.many:
+            targets = self.matcher.select(tag, self.limit) if self.matcher else [tag]
+            values = (self.value(el) for el in targets)
+            return [v for v in values if v is not None]
+
+        el = self.matcher.select_one(tag) if self.matcher else tag
+        if el is None:
+            return Schema.MISSING if self.required else self.default
+        return self.value(el)
+
+
+class Schema():
+    """ Named group of Fields extracted from the same tag """
+    MISSING = object()
+
+    def __init__(self, **fields):
+        self.fields = fields
+
+    def extract(self, tag, only=None):
+        """ dict of field values, or None if a required field is missing """
+        out = {}
+        for name in only or self.fields:
+            value = self.fields[name].extract(tag)
+            if value is Schema.MISSING:
+                return None
+            out[name] = value
+        return out
+
+    def field(self, tag, name):
+        value = self.fields[name].extract(tag)
+        return None if value is Schema.MISSING else value
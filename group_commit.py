@@ -0,0 +1,167 @@
+""" Group-commit file writer for the live recordings: buffered writes reach the file in one os.write() """
+import os
+import time
+import atexit
+import signal
+import weakref
+import logging
+import threading
+
+from configs import GROUP_COMMIT_BYTES, GROUP_COMMIT_SECONDS, GROUP_COMMIT_FSYNC
+
+logger = logging.getLogger(__name__)
+
+
+# "never": left to the OS, "commit": after every group commit, "close": once when the writer is closed
+FSYNC_POLICIES = ("never", "commit", "close")
+
+_writers = weakref.WeakSet()
+_writers_lock = threading.Lock()
+_flusher = None
+
+
+class GroupCommitWriter():
+    """ Commits once max_bytes are buffered or the oldest buffered write is max_delay seconds old """
+    def __init__(self, path, max_bytes=GROUP_COMMIT_BYTES, max_delay=GROUP_COMMIT_SECONDS,
+                 fsync=GROUP_COMMIT_FSYNC, encoding="utf-8"):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync policy must be one of {FSYNC_POLICIES}, got {fsync!r}")
+        self.name = path
+        self.mode = "ab"
+        self.max_bytes = max_bytes
+        self.max_delay = max_delay
+        self.fsync = fsync
+        self.encoding = encoding
+        self.fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self.committed = os.fstat(self.fd).st_size
+        self.buffer = []
+        self.buffered = 0
+        self.first_write = None
+        self.lock = threading.Lock()
+        self.closed = False
+
+        self.writes = 0     # write() calls
+        self.commits = 0    # os.write() calls
+        self.syncs = 0
+        _register(self)
+
+    # ------------------ File-like API ------------------ #
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode(self.encoding)
+        with self.lock:
+            if self.closed:
+                raise ValueError("write to closed GroupCommitWriter")
+            if not self.buffer:
+                self.first_write = time.monotonic()
+            self.buffer.append(data)
+            self.buffered += len(data)
+            self.writes += 1
+            if self.buffered >= self.max_bytes:
+                self._commit()
+        return len(data)
+
+    def flush(self):
+        """ Commits now; file.flush() semantics, so wrappers like GzipFile can drive it """
+        with self.lock:
+            self._commit()
+
+    def tell(self):
+        """ Offset the next write() will land at """
+        with self.lock:
+            return self.committed + self.buffered
+
+    def writable(self):
+        return True
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self._commit()
+            if self.fsync != "never":
+                os.fsync(self.fd)
+                self.syncs += 1
+            os.close(self.fd)
+            self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    # ------------------ Commit ------------------ #
+    def commit_if_due(self, now):
+        with self.lock:
+            if self.buffer and now - self.first_write >= self.max_delay:
+                self._commit()
+
+    def _commit(self):
+        if not self.buffer or self.closed:
+            return
+        data = b"".join(self.buffer)
+        self.buffer = []
+        self.buffered = 0
+        view = memoryview(data)
+        while view:
+            n = os.write(self.fd, view)
+            view = view[n:]
+        self.committed += len(data)
+        self.commits += 1
+        if self.fsync == "commit":
+            os.fsync(self.fd)
+            self.syncs += 1
+
+    def stats(self):
+        return {"file": self.name, "writes": self.writes, "commits": self.commits,
+                "syncs": self.syncs, "buffered": self.buffered}
+
+
+# ------------------ Background flushing ------------------ #
+def _register(writer):
+    global _flusher
+    with _writers_lock:
+        _writers.add(writer)
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(target=_flush_loop, name="group-commit", daemon=True)
+            _flusher.start()
+
+
+def _flush_loop():
+    while True:
+        with _writers_lock:
+            writers = [w for w in _writers if not w.closed]
+        tick = min((w.max_delay for w in writers), default=GROUP_COMMIT_SECONDS) / 4
+        time.sleep(min(max(tick, 0.01), 0.5))
+        now = time.monotonic()
+        for writer in writers:
+            try:
+                writer.commit_if_due(now)
+            except OSError:
+                logger.exception(f"Group commit to {writer.name} failed")
+
+
+def flush_all():
+    """ Commits every open writer (atexit, signal handlers) """
+    with _writers_lock:
+        writers = list(_writers)
+    for writer in writers:
+        try:
+            writer.flush()
+        except (OSError, ValueError):
+            pass
+
+
+def install_signal_handlers(signals=(signal.SIGTERM,)):
+    """ Commits all writers on the given signals, then exits through SystemExit so finally/close paths run """
+    def handler(signum, frame):
+        logger.info(f"Signal {signum}: committing buffered recordings")
+        flush_all()
+        raise SystemExit(128 + signum)
+
+    for sig in signals:
+        signal.signal(sig, handler)
+
+
+atexit.register(flush_all)
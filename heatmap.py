@@ -0,0 +1,184 @@
+import os
+import json
+import gzip
+import numpy as np
+
+from live_state import SeenWindow
+
+
+RESOLUTION = 128
+
+# Radar overview origin (top-left corner, world units) and units per radar pixel (1024px radar)
+MAP_OVERVIEWS = {
+    "de_ancient": (-2953, 2164, 5.0),
+    "de_anubis": (-2796, 3328, 5.22),
+    "de_dust2": (-2476, 3239, 4.4),
+    "de_inferno": (-2087, 3870, 4.9),
+    "de_mirage": (-3230, 1713, 5.0),
+    "de_nuke": (-3453, 2887, 7.0),
+    "de_overpass": (-4831, 1781, 5.2),
+    "de_train": (-2308, 2078, 4.082077),
+    "de_vertigo": (-3168, 1762, 4.0),
+}
+DEFAULT_OVERVIEW = (-4096, 4096, 8.0)
+
+WEAPON_CLASSES = {
+    "awp": "awp",
+    "ssg08": "sniper", "scar20": "sniper", "g3sg1": "sniper",
+    "ak47": "rifle", "m4a1": "rifle", "m4a1_silencer": "rifle", "famas": "rifle",
+    "galilar": "rifle", "aug": "rifle", "sg556": "rifle",
+    "mp9": "smg", "mac10": "smg", "mp7": "smg", "mp5sd": "smg", "ump45": "smg",
+    "p90": "smg", "bizon": "smg",
+    "glock": "pistol", "usp_silencer": "pistol", "hkp2000": "pistol", "p250": "pistol",
+    "deagle": "pistol", "fiveseven": "pistol", "tec9": "pistol", "cz75a": "pistol",
+    "elite": "pistol", "revolver": "pistol",
+    "nova": "heavy", "xm1014": "heavy", "mag7": "heavy", "sawedoff": "heavy",
+    "m249": "heavy", "negev": "heavy",
+    "hegrenade": "grenade", "inferno": "grenade", "molotov": "grenade",
+    "incgrenade": "grenade", "flashbang": "grenade", "smokegrenade": "grenade", "decoy": "grenade",
+    "taser": "other",
+}
+
+
+def weapon_class(weapon):
+    if not weapon:
+        return "other"
+    if weapon.startswith("knife") or weapon == "bayonet":
+        return "knife"
+    return WEAPON_CLASSES.get(weapon, "other")
+
+
+class KillHeatmaps():
+    """ Fixed-resolution kill position histograms per (map, side, weapon class, layer) """
+    def __init__(self, resolution=RESOLUTION, flags=("headShot",)):
+        self.resolution = resolution
+        self.flags = tuple(flags)
+        self.grids = {}
+        self.map_name = None
+        self.kills = 0
+        # every scorebot reconnect replays a backlog of kills already counted
+        self.seen_kills = SeenWindow()
+
+    # ------------------ Updates ------------------ #
+    def apply(self, event_name, data):
+        """ Same input as LiveMatchState.apply: decoded "scoreboard" / "log" frames """
+        if isinstance(data, str):
+            data = json.loads(data)
+        if event_name == "scoreboard":
+            self.map_name = data.get("mapName") or self.map_name
+        elif event_name == "log":
+            for entry in reversed(data.get("log", [])):
+                if "MatchStarted" in entry:
+                    self.map_name = entry["MatchStarted"].get("map") or self.map_name
+                elif "Kill" in entry:
+                    self.add_kill(entry["Kill"])
+
+    def add_kill(self, kill, map_name=None):
+        """ False if the kill (by eventId) was counted already """
+        event_id = kill.get("eventId")
+        if event_id is not None and not self.seen_kills.add(event_id):
+            return False
+        map_name = map_name or self.map_name or "unknown"
+        wclass = weapon_class(kill.get("weapon"))
+        side = kill.get("killerSide")
+
+        cell = self.cell(map_name, kill.get("killerX"), kill.get("killerY"))
+        if cell:
+            self.grid(map_name, side, wclass, "killer")[cell] += 1
+            for flag in self.flags:
+                if kill.get(flag):
+                    self.grid(map_name, side, wclass, f"killer_{flag}")[cell] += 1
+
+        cell = self.cell(map_name, kill.get("victimX"), kill.get("victimY"))
+        if cell:
+            self.grid(map_name, kill.get("victimSide"), wclass, "victim")[cell] += 1
+        self.kills += 1
+        return True
+
+    def cell(self, map_name, x, y):
+        if x is None or y is None:
+            return None
+        pos_x, pos_y, scale = MAP_OVERVIEWS.get(map_name, DEFAULT_OVERVIEW)
+        extent = 1024 * scale
+        col = int((x - pos_x) / extent * self.resolution)
+        row = int((pos_y - y) / extent * self.resolution)
+        if 0 <= row < self.resolution and 0 <= col < self.resolution:
+            return row, col
+        return None
+
+    def grid(self, map_name, side, wclass, layer):
+        key = (map_name, side, wclass, layer)
+        grid = self.grids.get(key)
+        if grid is None:
+            grid = np.zeros((self.resolution, self.resolution), dtype=np.uint32)
+            self.grids[key] = grid
+        return grid
+
+    # ------------------ Queries ------------------ #
+    def total(self, map_name, side=None, wclass=None, layer="killer"):
+        """ Sum of all grids of a map matching the given side / weapon class / layer (None = any) """
+        out = np.zeros((self.resolution, self.resolution), dtype=np.uint64)
+        for (m, s, w, l), grid in self.grids.items():
+            if m == map_name and l == layer and side in (None, s) and wclass in (None, w):
+                out += grid
+        return out
+
+    def merge(self, other):
+        if other.resolution != self.resolution:
+            raise ValueError(f"Cannot merge heatmaps of resolution {other.resolution} into {self.resolution}")
+        for key, grid in other.grids.items():
+            if key in self.grids:
+                self.grids[key] += grid
+            else:
+                self.grids[key] = grid.copy()
+        self.kills += other.kills
+        return self
+
+    # ------------------ Persistence ------------------ #
+    def save(self, path):
+        arrays = {"|".join(str(k) for k in key): grid for key, grid in self.grids.items()}
+        meta = {"resolution": self.resolution, "flags": self.flags, "kills": self.kills}
+        # written aside and swapped in, so a reader never sees half a file
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as fp:
+            np.savez_compressed(fp, __meta__=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data["__meta__"]))
+            heatmaps = cls(meta["resolution"], meta["flags"])
+            heatmaps.kills = meta["kills"]
+            for name in data.files:
+                if name == "__meta__":
+                    continue
+                map_name, side, wclass, layer = name.split("|")
+                heatmaps.grids[(map_name, None if side == "None" else side, wclass, layer)] = data[name]
+        return heatmaps
+
+    @classmethod
+    def merge_files(cls, paths):
+        merged = None
+        for path in paths:
+            heatmaps = cls.load(path)
+            merged = heatmaps if merged is None else merged.merge(heatmaps)
+        return merged
+
+    @classmethod
+    def from_capture(cls, path, **kwargs):
+        """ Replays a raw capture: one JSON list of [event, data] frames per line, or RawCapture records """
+        heatmaps = cls(**kwargs)
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as fp:
+            for line in fp:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                if isinstance(record, dict):
+                    record = record.get("frames", [])
+                for frame in record:
+                    if isinstance(frame, list) and len(frame) >= 2:
+                        heatmaps.apply(frame[0], frame[1])
+        return heatmaps
@@ -1,7 +1,21 @@
 import re
 import logging
-import cloudscraper
 import time
+import itertools
+import threading
+from configs import (SCOREBOT_BROWSER_PROFILES, LIVE_POLL_INTERVAL, METRICS_ENABLED, METRICS_PORT,
+                     LIVE_LOG_PATH, LIVE_SUBSCRIBER_BUFFER, LIVE_FANOUT_SOCKET, LOG_FORMAT, LOG_DATEFMT,
+                     SCOREBOARD_FIELDS, LIVE_HEATMAP_PATH, LIVE_HEATMAP_SAVE_INTERVAL)
+from event_bus import EventBus, UnixSocketFanout, KEEP_LATEST
+from capture import RawCapture
+from event_store import EventStore
+from socketio_frames import FrameDecoder
+from scorebot_schema import SCOREBOARD, PayloadValidator, APPLY_ERROR
+from group_commit import GroupCommitWriter
+from metrics import (HTTP_REQUESTS, HTTP_LATENCY, LIVE_EVENTS, LIVE_EVENT_RATE, LIVE_POLL_LAG,
+                     LIVE_RECONNECTS, start_http_server)
+from live_state import LiveMatchState
+from heatmap import KillHeatmaps
 
 import json
 def extract_json_arrays_from_socketio(msg):
@@ -80,11 +94,6 @@ def extract_json_arrays_from_socketio(msg):
     return results
 
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
 logger = logging.getLogger(__name__)
 
 
@@ -92,11 +101,64 @@ BASE_SITE = "https://www.hltv.org"
 SOCKET_BASE = "https://scorebot-lb.hltv.org"
 UA = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36"
 
+def project_score(event_data):
+    """ SCOREBOARD_FIELDS of a scoreboard payload; missing or mistyped keys get their schema default """
+    return SCOREBOARD.project(event_data, SCOREBOARD_FIELDS)
+
+
+class ScoreLogWriter():
+    """ Bus subscriber appending projected scoreboard events to a JSONL file, group-committed """
+    def __init__(self, path):
+        self.log_file = GroupCommitWriter(path)
+
+    def __call__(self, event_name, event_data):
+        # stamped so log_index.LogIndex can seek the log by time
+        line = {"timestamp": round(time.time(), 3), **project_score(event_data)}
+        self.log_file.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+    def close(self):
+        self.log_file.close()
+
+
+def print_score(event_name, event_data):
+    print(json.dumps(project_score(event_data), ensure_ascii=False))
+    print("\n\n\n-----\n\n\n")
+
+
 class LiveMatch():
-    def __init__(self,url):
+    def __init__(self, url, bus=None, log_path=LIVE_LOG_PATH, echo=True, capture=False, store=False,
+                 events=("scoreboard", "log"), heatmap_path=LIVE_HEATMAP_PATH):
         match = re.search(r"https:\/\/www\.hltv\.org\/matches\/(\d+)\/.+", url)
         self.match_id = match.group(1) if match else None
         self.matchLive = True
+        self._stop = threading.Event()
+        self.browser_profiles = itertools.cycle(SCOREBOT_BROWSER_PROFILES)
+        self.state = LiveMatchState(self.match_id)
+        self.heatmaps = KillHeatmaps()
+        self.heatmap_path = heatmap_path.format(match_id=self.match_id) if heatmap_path else None
+        self.heatmap_saved_at = time.monotonic()
+        self.heatmap_saved_kills = 0
+        # Only these events get their payloads decoded; the rest are counted and skipped
+        self.decoder = FrameDecoder(events)
+        # Malformed frames are dropped and counted here instead of raising in the poll loop
+        self.validator = PayloadValidator(self.match_id)
+
+        # Consumers read decoded events from the bus on their own threads,
+        # so a slow one never holds up polling
+        self.owns_bus = bus is None
+        self.bus = bus or EventBus()
+        self.subscriptions = []
+        self.log_writer = None
+        if log_path:
+            self.log_writer = ScoreLogWriter(log_path.format(match_id=self.match_id))
+            self.subscriptions.append(self.bus.subscribe(self.log_writer, events=("scoreboard",), maxsize=LIVE_SUBSCRIBER_BUFFER, name=f"log-{self.match_id}"))
+        if echo:
+            self.subscriptions.append(self.bus.subscribe(print_score, events=("scoreboard",), policy=KEEP_LATEST, name=f"echo-{self.match_id}"))
+        self.fanout = UnixSocketFanout(self.bus, LIVE_FANOUT_SOCKET.format(match_id=self.match_id)) if LIVE_FANOUT_SOCKET else None
+        # Full raw capture of every poll, bounded in memory and on disk
+        self.capture = RawCapture(f"match-{self.match_id}") if capture else None
+        # Event log + snapshots for rebuilding the state at any round
+        self.store = EventStore(f"match-{self.match_id}", match_id=self.match_id) if store else None
         self.reset()
 
     def run(self):
@@ -113,6 +175,7 @@ class LiveMatch():
             self.readyForMatchSent = False
 
     def connect(self):
+        LIVE_RECONNECTS.inc(self.match_id)
         self.reset()
         self.solveCloudflare()
         self.fetchSID()
@@ -121,8 +184,10 @@ class LiveMatch():
 
     def solveCloudflare(self):
         logger.info("Solving Cloudflare...")
+        import cloudscraper  # heavy, only needed once we actually connect
         try:
-            self.scraper = cloudscraper.create_scraper(browser={"browser":"chrome","platform":"windows","desktop":True})
+            # Each (re)connect presents the next browser identity
+            self.scraper = cloudscraper.create_scraper(browser=next(self.browser_profiles))
             self.scraper.headers.update({"User-Agent": UA, "Origin": BASE_SITE, "Referer": BASE_SITE})
             self.scraper.get(BASE_SITE)
             logger.info("Solved Cloudflare!")
@@ -164,62 +229,69 @@ class LiveMatch():
         except Exception as e:
             logger.exception("Error sending 'readyForMatch' message",e)
 
+    def stop(self):
+        """ Ends the poll loop; a loop waiting for its next poll wakes up right away """
+        self.matchLive = False
+        self._stop.set()
+
+    def snapshot(self):
+        return self.state.snapshot()
+
+    def save_heatmaps(self):
+        """ Writes the kill heatmaps to heatmap_path if kills were added since the last save """
+        self.heatmap_saved_at = time.monotonic()
+        if not self.heatmap_path or self.heatmaps.kills == self.heatmap_saved_kills:
+            return False
+        self.heatmaps.save(self.heatmap_path)
+        self.heatmap_saved_kills = self.heatmaps.kills
+        return True
+
     def listen_loop(self):
-        with open("LOG_FILE.json", "a", encoding="utf-8") as log_file:
+        last_poll = None
+        try:
             while self.matchLive:
                 try:
                     t = str(int(time.time() * 1000))
                     poll_url = f"{SOCKET_BASE}/socket.io/?EIO=3&transport=polling&t={t}&sid={self.sid}"
+                    poll_start = time.monotonic()
                     r = self.scraper.get(poll_url)
                     raw = r.text
-
-                    # Extract JSON arrays (each should be [eventName, eventData, ...])
-                    arrays = extract_json_arrays_from_socketio(raw)
-
-                    for arr in arrays:
-                        if not isinstance(arr, list) or len(arr) < 2:
+                    HTTP_REQUESTS.inc("scorebot", r.status_code)
+                    HTTP_LATENCY.observe("scorebot", value=time.monotonic() - poll_start)
+
+                    frames, decoded = self.decoder.decode(raw)
+                    n_events = len(frames)
+                    for frame in frames:
+                        LIVE_EVENTS.inc(self.match_id, frame.name)
+                    if self.capture:
+                        # payloads are written as received, not decoded
+                        self.capture.record(frames)
+
+                    for event_name, event_data in decoded:
+                        if not self.validator.check(event_name, event_data):
                             continue
-
-                        event_name = arr[0]
-                        event_data = arr[1]
-
-                        # Only keep "log" events
-                        if event_name != "scoreboard":
+                        try:
+                            self.state.apply(event_name, event_data)
+                            self.heatmaps.apply(event_name, event_data)
+                            if self.store:
+                                self.store.append(event_name, event_data)
+                        except (KeyError, TypeError, AttributeError, ValueError):
+                            # a bad frame costs this frame, not the connection
+                            logger.exception(f"Dropped '{event_name}' frame that passed the schema")
+                            self.validator.count(event_name, "*", APPLY_ERROR)
+                            self.validator.drop(event_name)
                             continue
+                        self.bus.publish(event_name, event_data)
+
+                    now = time.monotonic()
+                    if last_poll is not None:
+                        LIVE_POLL_LAG.set(self.match_id, value=max(0.0, now - last_poll - LIVE_POLL_INTERVAL))
+                        LIVE_EVENT_RATE.set(self.match_id, value=n_events / (now - last_poll))
+                    last_poll = now
+                    if now - self.heatmap_saved_at >= LIVE_HEATMAP_SAVE_INTERVAL:
+                        self.save_heatmaps()
 
-                        # Decode nested JSON inside data
-                        if isinstance(event_data, str):
-                            try:
-                                event_data = json.loads(event_data)
-                            except Exception:
-                                continue
-
-                        score = {
-                            "mapName" : event_data["mapName"],
-                            "terroristTeamName" : event_data["terroristTeamName"],
-                            "ctTeamName" : event_data["ctTeamName"],
-                            "currentRound" : event_data["currentRound"],
-                            "counterTerroristScore" : event_data["counterTerroristScore"],
-                            "terroristScore" : event_data["terroristScore"],
-                            "ctTeamId" : event_data["ctTeamId"],
-                            "tTeamId" : event_data["tTeamId"],
-                            "frozen" : event_data["frozen"],
-                            "live" : event_data["live"],
-                            "ctTeamScore" : event_data["ctTeamScore"],
-                            "tTeamScore" : event_data["tTeamScore"],
-                            "startingCt" : event_data["startingCt"],
-                            "startingT" : event_data["startingT"],
-                            "regulationHalfLength" : event_data["regulationHalfLength"],
-                            "overtimeHalfLength" : event_data["overtimeHalfLength"]
-                        }
-
-
-                        print(json.dumps(score, ensure_ascii=False))
-                        print("\n\n\n-----\n\n\n")
-                        log_file.write(json.dumps(score, ensure_ascii=False) + "\n")
-                        log_file.flush()
-
-                    time.sleep(20)
+                    self._stop.wait(LIVE_POLL_INTERVAL)
 
 
 
@@ -227,13 +299,41 @@ class LiveMatch():
                     self.matchLive = False
 
                 except Exception as e:
+                    if not self.matchLive:
+                        break
                     logger.exception("Error in listening loop",e)
                     logger.info("Reconnecting...")
                     self.connect()
+        finally:
+            self.close()
+
+    def close(self):
+        if self.fanout:
+            self.fanout.close()
+        if self.owns_bus:
+            self.bus.close()
+        else:
+            # a shared bus outlives this match: only drop our own subscribers
+            for subscription in self.subscriptions:
+                self.bus.unsubscribe(subscription)
+        if self.capture:
+            self.capture.close()
+        if self.store:
+            self.store.close()
+        if self.log_writer:
+            self.log_writer.close()
+        try:
+            self.save_heatmaps()
+        except OSError:
+            logger.exception(f"Kill heatmaps of match {self.match_id} not saved")
             
 
 
 
 
-lm = LiveMatch('https://www.hltv.org/matches/2388856/mouz-nxt-vs-algo-urban-riga-open-season-2')
-lm.run()
\ No newline at end of file
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT, datefmt=LOG_DATEFMT)
+    if METRICS_ENABLED:
+        start_http_server(METRICS_PORT)
+    lm = LiveMatch('https://www.hltv.org/matches/2388856/mouz-nxt-vs-algo-urban-riga-open-season-2')
+    lm.run()
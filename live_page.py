@@ -0,0 +1,201 @@
+""" Conditional refreshes of a LIVE match page, re-extracting and diffing only the regions that changed """
+import re
+import time
+import hashlib
+import logging
+
+from configs import ARCHIVE_PAGES
+from match import Match
+from match_schema import MATCH_PAGE
+from metrics import LIVE_PAGE_REFRESHES
+from streaming import extract
+
+logger = logging.getLogger(__name__)
+
+
+# Region name -> marker inside its opening tag. A region runs from its tag to the
+# next region's tag, so every field MATCH_PAGE reads must sit inside one region.
+REGION_ANCHORS = (
+    ("teams", 'class="standard-box teamsBox'),
+    ("maps", 'class="col-6 col-7-small'),
+    ("stats_tabs", 'class="matchstats'),
+    ("stats", 'class="stats-content'),
+    ("lineups", 'class="lineups'),
+    ("rest", 'class="past-matches'),
+)
+REPEATED_REGIONS = ("stats",)
+
+STAT_FIELDS = ("kills", "deaths", "kd", "adr", "kast", "rating", "swing")
+TEAM_FIELDS = ("name", "score", "status")
+
+
+# ------------------ Regions ------------------ #
+def split_regions(html):
+    """ [(name, start, end)] in document order, "head" covers whatever precedes the first anchor """
+    starts = []
+    for name, marker in REGION_ANCHORS:
+        pos = html.find(marker)
+        n = 0
+        while pos != -1:
+            tag_start = html.rfind("<", 0, pos)
+            starts.append((tag_start, f"{name}:{n}" if name in REPEATED_REGIONS else name))
+            if name not in REPEATED_REGIONS:
+                break
+            n += 1
+            pos = html.find(marker, pos + len(marker))
+    starts.sort()
+
+    regions = []
+    prev_start, prev_name = 0, "head"
+    for start, name in starts:
+        regions.append((prev_name, prev_start, start))
+        prev_start, prev_name = start, name
+    regions.append((prev_name, prev_start, len(html)))
+    return regions
+
+
+def region_hash(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def merge_regions(parts):
+    """ Per-region MATCH_PAGE dicts (in document order) -> the dict for the whole page """
+    page = {}
+    for name, field in MATCH_PAGE.fields.items():
+        if field.many:
+            page[name] = [v for part in parts for v in part[name]]
+        else:
+            page[name] = next((part[name] for part in parts if part[name] is not field.default), field.default)
+    return page
+
+
+# ------------------ Diff ------------------ #
+def stat_rows(match_json):
+    rows = {}
+    stats = match_json.get("stats") or {}
+    scopes = [("total", stats.get("total", {}))] + list(stats.get("maps", {}).items())
+    for scope, teams in scopes:
+        for team, players in teams.items():
+            for p in players:
+                rows[(scope, team, p["nickname"])] = p
+    return rows
+
+
+def diff_match(old, new):
+    """ Changed status, map results and player stat rows between two Match.to_json() dicts """
+    old = old or {}
+    diff = {"maps": [], "stats": []}
+
+    if old.get("match_status") != new.get("match_status"):
+        diff["status"] = [old.get("match_status"), new.get("match_status")]
+
+    old_maps = old.get("maps_info", [])
+    for i, m in enumerate(new.get("maps_info", [])):
+        before = old_maps[i] if i < len(old_maps) else {}
+        changes = {}
+        if before.get("map_name") != m["map_name"]:
+            changes["map_name"] = [before.get("map_name"), m["map_name"]]
+        for side in ("team_a", "team_b"):
+            for key in TEAM_FIELDS:
+                a = (before.get(side) or {}).get(key)
+                b = m[side][key]
+                if a != b:
+                    changes[f"{side}.{key}"] = [a, b]
+        if changes:
+            diff["maps"].append({"index": i, "map_name": m["map_name"], "changes": changes})
+
+    old_rows = stat_rows(old)
+    new_rows = stat_rows(new)
+    for key, row in new_rows.items():
+        before = old_rows.get(key, {})
+        changes = {f: [before.get(f), row[f]] for f in STAT_FIELDS if before.get(f) != row[f]}
+        if changes:
+            scope, team, nickname = key
+            diff["stats"].append({"map": scope, "team": team, "nickname": nickname, "changes": changes})
+    for key in old_rows.keys() - new_rows.keys():
+        scope, team, nickname = key
+        diff["stats"].append({"map": scope, "team": team, "nickname": nickname, "removed": True})
+    return diff
+
+
+class LivePageRefresher():
+    """ refresh() gives None when nothing relevant changed, else a diff (the first one carries the full state) """
+    def __init__(self, url, logger=logger, pool=None, archive=None):
+        self.url = url
+        self.logger = logger
+        self.pool = pool
+        self.archive = archive
+        self.etag = None
+        self.last_modified = None
+        self.body_hash = None
+        self.regions = {}       # region name -> (hash, extracted dict)
+        self.match = None
+        self.match_json = None
+
+    def fetch(self):
+        """ Response text, or None on 304 """
+        if self.pool is None:
+            from sessions import get_default_pool
+            self.pool = get_default_pool()
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        resp = self.pool.fetch(self.url, headers=headers)
+        if resp.status_code == 304:
+            return None
+        self.etag = resp.headers.get("ETag")
+        self.last_modified = resp.headers.get("Last-Modified")
+        if ARCHIVE_PAGES:
+            if self.archive is None:
+                from archive import get_default_archive
+                self.archive = get_default_archive()
+            self.archive.put(self.url, resp.content)
+        return resp.text
+
+    def refresh(self, html=None):
+        """ Fetches (unless html is given) and returns the diff since the last refresh, or None """
+        if html is None:
+            html = self.fetch()
+            if html is None:
+                LIVE_PAGE_REFRESHES.inc("not_modified")
+                return None
+
+        body_hash = region_hash(html)
+        if body_hash == self.body_hash:
+            LIVE_PAGE_REFRESHES.inc("unchanged")
+            return None
+        self.body_hash = body_hash
+
+        parts = []
+        changed = []
+        regions = {}
+        for name, start, end in split_regions(html):
+            chunk = html[start:end]
+            digest = region_hash(chunk)
+            cached = self.regions.get(name)
+            if cached and cached[0] == digest:
+                part = cached[1]
+            else:
+                part = extract(MATCH_PAGE, chunk)
+                changed.append(name)
+            regions[name] = (digest, part)
+            parts.append(part)
+        self.regions = regions
+
+        if not changed:
+            LIVE_PAGE_REFRESHES.inc("unchanged")
+            return None
+
+        match = Match(self.url, None, self.logger, page=merge_regions(parts))
+        match_json = match.to_json()
+        diff = diff_match(self.match_json, match_json)
+        self.match, self.match_json = match, match_json
+
+        if not diff["maps"] and not diff["stats"] and "status" not in diff:
+            LIVE_PAGE_REFRESHES.inc("unchanged")
+            return None
+        LIVE_PAGE_REFRESHES.inc("changed")
+        diff.update({"match_id": match.match_id, "url": self.url, "fetched_at": time.time(), "regions": changed})
+        return diff
@@ -0,0 +1,381 @@
+import json
+from collections import deque
+
+
+SIDES = ("CT", "TERRORIST")
+SEEN_KILL_IDS = 512  # recent Kill eventIds remembered to drop replayed log entries
+SEEN_LOG_TAIL = 1024 # entries after the newest Kill remembered to line up replayed backlogs
+
+
+def log_entries(data):
+    """ (kind, payload) of a decoded "log" frame, oldest first (scorebot sends the newest first) """
+    return [(kind, payload) for entry in reversed(data.get("log", [])) for kind, payload in entry.items()]
+
+
+def entry_key(kind, payload):
+    return json.dumps([kind, payload], sort_keys=True, separators=(",", ":"))
+
+
+class SeenWindow():
+    """ Bounded set of recently seen (increasing) ids; the oldest are forgotten first """
+    def __init__(self, size=SEEN_KILL_IDS, ids=()):
+        self.size = size
+        self.ids = set()
+        self.order = deque()
+        self.floor = None   # newest id forgotten: anything up to it is older than the window
+        for event_id in ids:
+            self.add(event_id)
+
+    def add(self, event_id):
+        """ False if the id was seen already """
+        if event_id in self.ids or (self.floor is not None and event_id <= self.floor):
+            return False
+        self.ids.add(event_id)
+        self.order.append(event_id)
+        if len(self.order) > self.size:
+            forgotten = self.order.popleft()
+            self.ids.discard(forgotten)
+            self.floor = forgotten if self.floor is None else max(self.floor, forgotten)
+        return True
+
+    def dump(self):
+        return list(self.order)
+
+
+class LogCursor():
+    """ Position in the scorebot log: the newest Kill eventId folded and the entries folded after it """
+    def __init__(self, last_kill=None, tail=()):
+        self.last_kill = last_kill
+        self.tail = list(tail)
+
+    def unseen(self, entries):
+        """ The (kind, payload) entries, oldest first, that come after everything folded so far """
+        # every (re)connect starts with a backlog of old entries; only Kill carries an (increasing) id
+        anchor = -1
+        if self.last_kill is not None:
+            for i, (kind, payload) in enumerate(entries):
+                if kind == "Kill":
+                    event_id = payload.get("eventId")
+                    if event_id is not None and event_id <= self.last_kill:
+                        anchor = i
+        if anchor < 0:
+            return entries
+        start = anchor + 1
+        for key in self.tail:
+            if start >= len(entries) or entry_key(*entries[start]) != key:
+                break
+            start += 1
+        return entries[start:]
+
+    def advance(self, kind, payload):
+        """ Records one folded entry """
+        event_id = payload.get("eventId") if kind == "Kill" else None
+        if event_id is not None:
+            if self.last_kill is None or event_id > self.last_kill:
+                self.last_kill = event_id
+                self.tail = []
+        elif self.last_kill is not None and len(self.tail) < SEEN_LOG_TAIL:
+            self.tail.append(entry_key(kind, payload))
+
+    def dump(self):
+        return [self.last_kill, self.tail]
+
+
+class PlayerState():
+    __slots__ = ("player_id", "nick", "side", "kills", "deaths", "assists", "headshots",
+                 "damage", "money", "hp", "alive", "kevlar", "helmet", "defuse_kit")
+
+    def __init__(self, player_id, nick, side):
+        self.player_id = player_id
+        self.nick = nick
+        self.side = side
+        self.kills = 0
+        self.deaths = 0
+        self.assists = 0
+        self.headshots = 0
+        self.damage = 0.0       # total damage on this map
+        self.money = 0
+        self.hp = 100
+        self.alive = True
+        self.kevlar = False
+        self.helmet = False
+        self.defuse_kit = False
+
+    def kd(self):
+        return round(self.kills / self.deaths, 2) if self.deaths else float(self.kills)
+
+    def adr(self, rounds_played):
+        return round(self.damage / rounds_played, 1) if rounds_played else 0.0
+
+    def hs_pct(self):
+        return round(100.0 * self.headshots / self.kills, 1) if self.kills else 0.0
+
+    def dump(self):
+        return [getattr(self, name) for name in self.__slots__]
+
+    @classmethod
+    def restore(cls, values):
+        player = cls.__new__(cls)
+        for name, value in zip(cls.__slots__, values):
+            setattr(player, name, value)
+        return player
+
+    def to_json(self, rounds_played=0):
+        return {
+            "id": self.player_id,
+            "nick": self.nick,
+            "side": self.side,
+            "kills": self.kills,
+            "deaths": self.deaths,
+            "assists": self.assists,
+            "kd": self.kd(),
+            "adr": self.adr(rounds_played),
+            "hs_pct": self.hs_pct(),
+            "money": self.money,
+            "hp": self.hp,
+            "alive": self.alive,
+        }
+
+
+class LiveMatchState():
+    """ Running state of one live match folded from scorebot events; scoreboard frames overwrite the totals """
+    def __init__(self, match_id=None):
+        self.match_id = match_id
+        self.events = 0
+        # survives map changes: a backlog replays the earlier maps as well
+        self.log_cursor = LogCursor()
+        self.reset_map(None)
+
+    def reset_map(self, map_name):
+        self.map_name = map_name
+        self.current_round = 0
+        self.ct_score = 0
+        self.t_score = 0
+        self.team_names = {"CT": None, "TERRORIST": None}
+        self.team_ids = {"CT": None, "TERRORIST": None}
+        self.live = False
+        self.frozen = False
+        self.bomb_planted = False
+        self.players = {}
+        self.round_kills = {"CT": 0, "TERRORIST": 0}
+        self.round_start_money = {"CT": 0, "TERRORIST": 0}
+        self.rounds = []
+        self.seen_kills = SeenWindow()
+        self.seen_assists = SeenWindow()
+
+    # ------------------ Event folding ------------------ #
+    def apply(self, event_name, data):
+        """ Folds one decoded ["scoreboard"|"log", data] frame into the state """
+        if isinstance(data, str):
+            data = json.loads(data)
+        if event_name == "scoreboard":
+            self.apply_scoreboard(data)
+        elif event_name == "log":
+            for kind, payload in self.log_cursor.unseen(log_entries(data)):
+                self.apply_log(kind, payload)
+
+    def apply_scoreboard(self, sb):
+        self.events += 1
+        map_name = sb.get("mapName")
+        if map_name and map_name != self.map_name and self.map_name is not None:
+            self.reset_map(map_name)
+        self.map_name = map_name or self.map_name
+
+        self.current_round = sb.get("currentRound", self.current_round)
+        self.ct_score = sb.get("counterTerroristScore", self.ct_score)
+        self.t_score = sb.get("terroristScore", self.t_score)
+        self.team_names["CT"] = sb.get("ctTeamName", self.team_names["CT"])
+        self.team_names["TERRORIST"] = sb.get("terroristTeamName", self.team_names["TERRORIST"])
+        self.team_ids["CT"] = sb.get("ctTeamId", self.team_ids["CT"])
+        self.team_ids["TERRORIST"] = sb.get("tTeamId", self.team_ids["TERRORIST"])
+        self.live = sb.get("live", self.live)
+        self.frozen = sb.get("frozen", self.frozen)
+        self.bomb_planted = sb.get("bombPlanted", self.bomb_planted)
+
+        for side in SIDES:
+            for p in sb.get(side) or []:
+                player = self._player(p.get("dbId"), p.get("nick") or p.get("name"), side)
+                player.side = side
+                player.kills = p.get("score", player.kills)
+                player.deaths = p.get("deaths", player.deaths)
+                player.assists = p.get("assists", player.assists)
+                player.headshots = p.get("headshots", player.headshots)
+                # damagePrRound is the damage so far divided by currentRound (the round in play
+                # included), so it is turned back into total damage; adr() divides by rounds played
+                per_round = p.get("damagePrRound")
+                if per_round is not None:
+                    player.damage = per_round * max(self.current_round or 0, 1)
+                player.money = p.get("money", player.money)
+                player.hp = p.get("hp", player.hp)
+                player.alive = p.get("alive", player.alive)
+                player.kevlar = p.get("kevlar", player.kevlar)
+                player.helmet = p.get("helmet", player.helmet)
+                player.defuse_kit = p.get("hasDefusekit", player.defuse_kit)
+
+    def apply_log(self, kind, data):
+        self.events += 1
+        self.log_cursor.advance(kind, data)
+        handler = getattr(self, f"_on_{kind}", None)
+        if handler:
+            handler(data)
+
+    def _on_MatchStarted(self, data):
+        map_name = data.get("map") or self.map_name
+        if map_name == self.map_name and self.rounds:
+            return  # sent again once the map is over; a real restart comes as Restart
+        self.reset_map(map_name)
+
+    def _on_Restart(self, data):
+        self.reset_map(self.map_name)
+
+    def _on_RoundStart(self, data):
+        self.round_kills = {"CT": 0, "TERRORIST": 0}
+        self.round_start_money = self.side_money()
+        self.bomb_planted = False
+        for player in self.players.values():
+            player.alive = True
+            player.hp = 100
+
+    def _on_RoundEnd(self, data):
+        ct_score = data.get("counterTerroristScore", self.ct_score)
+        t_score = data.get("terroristScore", self.t_score)
+        if self.rounds and (self.rounds[-1]["ct_score"], self.rounds[-1]["t_score"]) == (ct_score, t_score):
+            return  # the same round end again
+        self.ct_score = ct_score
+        self.t_score = t_score
+        self.rounds.append({
+            "round": len(self.rounds) + 1,
+            "winner": data.get("winner"),
+            "win_type": data.get("winType"),
+            "ct_score": self.ct_score,
+            "t_score": self.t_score,
+            "kills": dict(self.round_kills),
+            "start_money": dict(self.round_start_money),
+        })
+        self.current_round = self.ct_score + self.t_score + 1
+
+    def _on_BombPlanted(self, data):
+        self.bomb_planted = True
+
+    def _on_Kill(self, data):
+        event_id = data.get("eventId")
+        if event_id is not None and not self.seen_kills.add(event_id):
+            return
+
+        killer = self._player(data.get("killerId"), data.get("killerNick"), data.get("killerSide"))
+        victim = self._player(data.get("victimId"), data.get("victimNick"), data.get("victimSide"))
+        if data.get("killerSide") != data.get("victimSide"):
+            killer.kills += 1
+            if data.get("headShot"):
+                killer.headshots += 1
+            if killer.side in self.round_kills:
+                self.round_kills[killer.side] += 1
+        victim.deaths += 1
+        victim.alive = False
+        victim.hp = 0
+
+    def _on_Assist(self, data):
+        kill_id = data.get("killEventId")
+        if kill_id is not None and not self.seen_assists.add(kill_id):
+            return
+        assister = self._find_nick(data.get("assisterNick"))
+        if assister:
+            assister.assists += 1
+
+    def _on_Suicide(self, data):
+        player = self._find_nick(data.get("playerNick"))
+        if player:
+            player.deaths += 1
+            player.alive = False
+            player.hp = 0
+
+    def _player(self, player_id, nick, side):
+        key = player_id if player_id is not None else nick
+        player = self.players.get(key)
+        if player is None:
+            player = PlayerState(player_id, nick, side)
+            self.players[key] = player
+        return player
+
+    def _find_nick(self, nick):
+        for player in self.players.values():
+            if player.nick == nick:
+                return player
+        return None
+
+    # ------------------ Persistence ------------------ #
+    def dump(self):
+        """ Everything needed to resume folding, as plain JSON types """
+        return {
+            "match_id": self.match_id,
+            "events": self.events,
+            "map_name": self.map_name,
+            "current_round": self.current_round,
+            "ct_score": self.ct_score,
+            "t_score": self.t_score,
+            "team_names": self.team_names,
+            "team_ids": self.team_ids,
+            "live": self.live,
+            "frozen": self.frozen,
+            "bomb_planted": self.bomb_planted,
+            "players": [[key, p.dump()] for key, p in self.players.items()],
+            "round_kills": self.round_kills,
+            "round_start_money": self.round_start_money,
+            "rounds": self.rounds,
+            "seen_kills": self.seen_kills.dump(),
+            "seen_assists": self.seen_assists.dump(),
+            "log_cursor": self.log_cursor.dump(),
+        }
+
+    @classmethod
+    def restore(cls, data):
+        state = cls(data["match_id"])
+        for name in ("events", "map_name", "current_round", "ct_score", "t_score", "team_names", "team_ids",
+                     "live", "frozen", "bomb_planted", "round_kills", "round_start_money", "rounds"):
+            setattr(state, name, data[name])
+        state.players = {key: PlayerState.restore(values) for key, values in data["players"]}
+        state.seen_kills = SeenWindow(ids=data["seen_kills"])
+        state.seen_assists = SeenWindow(ids=data.get("seen_assists", ()))
+        state.log_cursor = LogCursor(*data.get("log_cursor", (None, ())))
+        return state
+
+    # ------------------ Views ------------------ #
+    def side_money(self):
+        money = {"CT": 0, "TERRORIST": 0}
+        for player in self.players.values():
+            if player.side in money:
+                money[player.side] += player.money
+        return money
+
+    def economy(self):
+        economy = {}
+        for side in SIDES:
+            players = [p for p in self.players.values() if p.side == side]
+            total = sum(p.money for p in players)
+            economy[side] = {
+                "team": self.team_names[side],
+                "money": total,
+                "avg_money": round(total / len(players)) if players else 0,
+                "alive": sum(1 for p in players if p.alive),
+                "armor": sum(1 for p in players if p.kevlar),
+                "helmets": sum(1 for p in players if p.helmet),
+                "defuse_kits": sum(1 for p in players if p.defuse_kit),
+            }
+        return economy
+
+    def snapshot(self):
+        return {
+            "match_id": self.match_id,
+            "map_name": self.map_name,
+            "current_round": self.current_round,
+            "ct_score": self.ct_score,
+            "t_score": self.t_score,
+            "teams": {side: {"name": self.team_names[side], "id": self.team_ids[side]} for side in SIDES},
+            "live": self.live,
+            "frozen": self.frozen,
+            "bomb_planted": self.bomb_planted,
+            "players": [p.to_json(self.ct_score + self.t_score) for p in self.players.values()],
+            "economy": self.economy(),
+            "rounds": list(self.rounds),
+            "events": self.events,
+        }
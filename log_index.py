@@ -0,0 +1,188 @@
+import os
+import re
+import json
+import mmap
+import bisect
+from array import array
+
+
+# Keys are matched with optional backslashes so double-encoded payloads
+# ("[\"log\", \"{\\\"map\\\": ...}\"]") are indexed without decoding them.
+TIMESTAMP_RE = re.compile(rb'"timestamp"\s*:\s*([0-9.]+)')
+MAP_RE = re.compile(rb'\\*"(?:mapName|map)\\*"\s*:\s*\\*"(\w+)')
+ROUND_RE = re.compile(rb'\\*"currentRound\\*"\s*:\s*(\d+)')
+ROUND_END_RE = re.compile(rb'\\*"counterTerroristScore\\*"\s*:\s*(\d+)\s*,\s*\\*"terroristScore\\*"\s*:\s*(\d+)\s*,\s*\\*"winner')
+
+INDEX_VERSION = 1
+
+
+class LogIndex():
+    """ Memory-mapped reader for append-only JSONL logs with a sidecar index (<log>.idx, <log>.idx.json) """
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path + ".idx"
+        self.meta_path = path + ".idx.json"
+        self.fp = None
+        self.mm = None
+        self.load()
+
+    # ------------------ Index maintenance ------------------ #
+    def _empty(self):
+        self.offsets = array("q")
+        self.timestamps = array("d")
+        self.map_codes = array("i")
+        self.rounds = array("i")
+        self.maps = []
+        self.indexed_bytes = 0
+        self.round_starts = {}
+
+    def load(self):
+        self._empty()
+        if os.path.exists(self.meta_path) and os.path.exists(self.index_path):
+            with open(self.meta_path, "r", encoding="utf-8") as fp:
+                meta = json.load(fp)
+            if meta.get("version") == INDEX_VERSION and meta["indexed_bytes"] <= os.path.getsize(self.path):
+                with open(self.index_path, "rb") as fp:
+                    for arr in (self.offsets, self.timestamps, self.map_codes, self.rounds):
+                        arr.fromfile(fp, meta["lines"])
+                self.maps = meta["maps"]
+                self.indexed_bytes = meta["indexed_bytes"]
+                for i in range(len(self.offsets)):
+                    self.round_starts.setdefault((self.map_codes[i], self.rounds[i]), i)
+        self.refresh()
+
+    def save(self):
+        with open(self.index_path, "wb") as fp:
+            for arr in (self.offsets, self.timestamps, self.map_codes, self.rounds):
+                arr.tofile(fp)
+        meta = {"version": INDEX_VERSION, "lines": len(self.offsets),
+                "indexed_bytes": self.indexed_bytes, "maps": self.maps}
+        with open(self.meta_path, "w", encoding="utf-8") as fp:
+            json.dump(meta, fp)
+
+    def _remap(self):
+        self.close()
+        size = os.path.getsize(self.path)
+        if size == 0:
+            return size
+        self.fp = open(self.path, "rb")
+        self.mm = mmap.mmap(self.fp.fileno(), 0, access=mmap.ACCESS_READ)
+        return size
+
+    def refresh(self):
+        """ Indexes lines appended since the last call, each with the timestamp, map and round in effect """
+        size = self._remap()
+        if size < self.indexed_bytes:
+            # truncated or rotated: start over
+            self._empty()
+        if size == self.indexed_bytes:
+            return 0
+
+        ts = self.timestamps[-1] if self.timestamps else 0.0
+        map_code = self.map_codes[-1] if self.map_codes else -1
+        rnd = self.rounds[-1] if self.rounds else 0
+        pos = self.indexed_bytes
+        added = 0
+        while pos < size:
+            end = self.mm.find(b"\n", pos)
+            if end == -1:
+                break  # partial line still being written
+            line = self.mm[pos:end]
+
+            m = TIMESTAMP_RE.search(line)
+            if m:
+                ts = float(m.group(1))
+            m = MAP_RE.search(line)
+            if m:
+                name = m.group(1).decode()
+                if name not in self.maps:
+                    self.maps.append(name)
+                new_code = self.maps.index(name)
+                if new_code != map_code:
+                    map_code, rnd = new_code, 0
+            m = ROUND_RE.search(line)
+            if m:
+                rnd = int(m.group(1))
+            else:
+                m = ROUND_END_RE.search(line)
+                if m:
+                    rnd = int(m.group(1)) + int(m.group(2)) + 1
+
+            i = len(self.offsets)
+            self.offsets.append(pos)
+            self.timestamps.append(ts)
+            self.map_codes.append(map_code)
+            self.rounds.append(rnd)
+            self.round_starts.setdefault((map_code, rnd), i)
+            pos = end + 1
+            added += 1
+
+        self.indexed_bytes = pos
+        if added:
+            self.save()
+        return added
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+        if self.fp is not None:
+            self.fp.close()
+            self.fp = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ------------------ Reading ------------------ #
+    def __len__(self):
+        return len(self.offsets)
+
+    def line_bytes(self, i):
+        end = self.offsets[i + 1] - 1 if i + 1 < len(self.offsets) else self.indexed_bytes - 1
+        return self.mm[self.offsets[i]:end]
+
+    def line(self, i):
+        return json.loads(self.line_bytes(i))
+
+    def lines(self, start, stop=None, parse=True):
+        stop = len(self.offsets) if stop is None else min(stop, len(self.offsets))
+        for i in range(start, stop):
+            yield self.line(i) if parse else self.line_bytes(i)
+
+    def map_code(self, map_key):
+        """ map_key is a map name ("de_nuke") or its 1-based order of appearance in the log """
+        if isinstance(map_key, int):
+            return map_key - 1 if 0 < map_key <= len(self.maps) else None
+        return self.maps.index(map_key) if map_key in self.maps else None
+
+    def seek_round(self, map_key, rnd):
+        """ Line number where the given round of the given map starts, or None """
+        return self.round_starts.get((self.map_code(map_key), rnd))
+
+    def round_lines(self, map_key, rnd, parse=True):
+        start = self.seek_round(map_key, rnd)
+        if start is None:
+            return
+        code = self.map_codes[start]
+        for i in range(start, len(self.offsets)):
+            if self.map_codes[i] != code or self.rounds[i] != rnd:
+                break
+            yield self.line(i) if parse else self.line_bytes(i)
+
+    def timed(self):
+        """ Whether any line carried a timestamp; lines before the first one count as time 0 """
+        return bool(self.timestamps) and self.timestamps[-1] > 0
+
+    def seek_time(self, timestamp):
+        """ First line at or after timestamp """
+        if self.timestamps and not self.timed():
+            raise ValueError(f"{self.path} has no timestamps, it can only be read by line or round")
+        return bisect.bisect_left(self.timestamps, timestamp)
+
+    def since(self, timestamp, until=None, parse=True):
+        start = self.seek_time(timestamp)
+        stop = bisect.bisect_left(self.timestamps, until) if until is not None else None
+        return self.lines(start, stop, parse)
@@ -1,21 +1,34 @@
-from match import MatchFactory,Match
-from configs import MATCHES_DATE_URL, DELAY_BETWEEN_REQUESTS, IMPERSONATE_BROWSER, JSON_OUTPUT_PATH
+from match import MatchFactory,Match,MatchStatus
+from configs import (MATCHES_DATE_URL, MATCHES_EVENT_URL, RESULTS_EVENT_URL, RESULTS_PAGE_SIZE,
+                     DELAY_BETWEEN_REQUESTS, JSON_OUTPUT_PATH)
+from metrics import PARSE_SECONDS
 
 from bs4 import BeautifulSoup
 from datetime import datetime,timedelta
 import logging
-from curl_cffi import requests
+import time
+import re
 
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
 logger = logging.getLogger(__name__)
 
 
 
+def listing_matches(soup):
+    """ (absolute url, wrapper tag) of every match with two teams on a /matches listing """
+    for match in soup.select("div.match-wrapper"):
+        teams = match.select(".match-team .match-teamname")
+        if len(teams) < 2:
+            continue
+
+        a_tag = match.find("a", href=True)
+        if not a_tag:
+            continue
+
+        href = a_tag["href"]
+        if href.startswith("/matches/"):
+            yield "https://www.hltv.org" + href, match
+
+
 def get_match_list_day(days_ahead):
     target_date = datetime.now() + timedelta(days=days_ahead)
     formatted_date = target_date.strftime("%Y-%m-%d")
@@ -23,21 +36,74 @@ def get_match_list_day(days_ahead):
 
     url = MATCHES_DATE_URL + formatted_date
 
-    resp = requests.get(url, impersonate=IMPERSONATE_BROWSER)
+    from sessions import get_default_pool
+
+    resp = get_default_pool().fetch(url)
+    start = time.perf_counter()
     soup = BeautifulSoup(resp.text, "html.parser")
     
-    match_urls = []
-    for match in soup.select("div.match-wrapper"):
-        teams = match.select(".match-team .match-teamname")
-        if len(teams) < 2:
-            continue
+    match_urls = [match_url for match_url, _ in listing_matches(soup)]
 
-        a_tag = match.find("a", href=True)
-        if not a_tag:
+    PARSE_SECONDS.observe("matches_day", value=time.perf_counter() - start)
+    return match_urls
+
+
+def get_event_matches(event_id, pool=None):
+    """ [{"url", "status", "start"}] of every match of an HLTV event, results first; finished wins over listed """
+    if pool is None:
+        from sessions import get_default_pool
+        pool = get_default_pool()
+    logger.info(f"Scraping HLTV matches for event {event_id}")
+    matches = {}
+
+    # Results are paginated, RESULTS_PAGE_SIZE per page
+    offset = 0
+    while True:
+        url = f"{RESULTS_EVENT_URL}{event_id}" + (f"&offset={offset}" if offset else "")
+        resp = pool.fetch(url)
+        start = time.perf_counter()
+        soup = BeautifulSoup(resp.text, "html.parser")
+        found = 0
+        for result in soup.select("div.results-all div.result-con"):
+            a_tag = result.find("a", href=True)
+            if not a_tag or not a_tag["href"].startswith("/matches/"):
+                continue
+            found += 1
+            match_url = "https://www.hltv.org" + a_tag["href"]
+            unix = result.get("data-zonedgrouping-entry-unix")
+            matches.setdefault(match_key(match_url), {"url": match_url, "status": MatchStatus.PAST,
+                                                      "start": unix_seconds(unix)})
+        PARSE_SECONDS.observe("results", value=time.perf_counter() - start)
+        next_page = soup.select_one("a.pagination-next")
+        if not found or next_page is None or "inactive" in next_page.get("class", []):
+            break
+        offset += RESULTS_PAGE_SIZE
+        time.sleep(DELAY_BETWEEN_REQUESTS)
+
+    time.sleep(DELAY_BETWEEN_REQUESTS)
+    resp = pool.fetch(f"{MATCHES_EVENT_URL}{event_id}")
+    start = time.perf_counter()
+    soup = BeautifulSoup(resp.text, "html.parser")
+    for match_url, wrapper in listing_matches(soup):
+        if match_key(match_url) in matches:
             continue
+        live = wrapper.get("live") == "true" or wrapper.select_one(".match-meta-live") is not None
+        time_tag = wrapper.select_one("[data-unix]")
+        matches[match_key(match_url)] = {"url": match_url,
+                                         "status": MatchStatus.LIVE if live else MatchStatus.FUTURE,
+                                         "start": unix_seconds(time_tag.get("data-unix") if time_tag else None)}
+    PARSE_SECONDS.observe("matches_event", value=time.perf_counter() - start)
+
+    logger.info(f"Event {event_id}: {len(matches)} matches")
+    return list(matches.values())
+
+
+def match_key(url):
+    """ Match id of a match URL (the slug after it can change when a team is renamed) """
+    m = re.search(r"/matches/(\d+)", url)
+    return m.group(1) if m else url
 
-        href = a_tag["href"]
-        if href.startswith("/matches/"):
-            match_urls.append("https://www.hltv.org" + href)
 
-    return match_urls
\ No newline at end of file
+def unix_seconds(value):
+    """ data-unix attribute (ms) -> epoch seconds """
+    return int(value) / 1000 if value and str(value).isdigit() else None
@@ -1,9 +1,11 @@
 import re
+import time
 from enum import Enum
-from curl_cffi import requests
 from bs4 import BeautifulSoup
 from datetime import datetime
-from configs import IMPERSONATE_BROWSER
+from configs import ARCHIVE_PAGES, PARSE_ENGINE
+from metrics import PARSE_SECONDS
+from match_schema import MATCH_PAGE
 from player import Player
 from stats import Stats,PlayerStats
 import json
@@ -21,30 +23,49 @@ class MatchStatus(Enum):
 
 
 class MatchFactory():
-    def __init__(self, url, html, logger, ensure_pt = False):
+    def __init__(self, url, html, logger, ensure_pt = False, engine = PARSE_ENGINE):
         self.url = url
         self.logger = logger
         if html == None:
             self.logger.info(f"Fetching {url}")   
             html = self.fetch_html()
 
-        self.soup = BeautifulSoup(html, "html.parser")
+        start = time.perf_counter()
+        # "stream": one pass over the HTML, no DOM; "soup": BeautifulSoup tree + compiled selectors
+        self.soup = None
+        self.page = None
+        if engine == "stream":
+            from streaming import extract
+            self.page = extract(MATCH_PAGE, html)
+        else:
+            self.soup = BeautifulSoup(html, "html.parser")
+        self.parse_seconds = time.perf_counter() - start
         self.ensure_pt = ensure_pt
 
     def fetch_html(self):
-        resp = requests.get(self.url, impersonate=IMPERSONATE_BROWSER)
+        # imported here so parsing saved pages never loads the HTTP stack
+        from sessions import get_default_pool
+        from archive import get_default_archive
+        # FetchError instead of a challenge page parsed as an empty match
+        resp = get_default_pool().fetch(self.url)
+        if ARCHIVE_PAGES:
+            get_default_archive().put(self.url, resp.content)
         return resp.text
     
     def get_match(self):
-        return Match(self.url,self.soup,self.logger,self.ensure_pt)
+        start = time.perf_counter()
+        match = Match(self.url,self.soup,self.logger,self.ensure_pt,self.page)
+        PARSE_SECONDS.observe("match", value=self.parse_seconds + time.perf_counter() - start)
+        return match
 
 
 
 class Match():
-    def __init__(self, url, soup, logger, ensure_pt = False):
+    def __init__(self, url, soup, logger, ensure_pt = False, page = None):
         self.logger = logger
         self.url = url
         self.soup = soup
+        self.page = page
 
         match = re.search(r"https:\/\/www\.hltv\.org\/matches\/(\d+)\/.+", url)
         self.match_id = match.group(1) if match else None
@@ -84,29 +105,34 @@ class Match():
     
 
 
-        logger.info(f"Match data scrape complete ({"PT found" if self.any_pt else "No PT found"})")
+        self.logger.info(f"Match data scrape complete ({'PT found' if self.any_pt else 'No PT found'})")
         
 
+    def section(self, name):
+        """ One MATCH_PAGE field, from the pre-extracted page or straight from the soup """
+        if self.page is not None:
+            return self.page[name]
+        return MATCH_PAGE.field(self.soup, name)
+
     def init_scrape(self):
         # ---- TIME / EVENT / STATUS ----
-        container = self.soup.find("div", class_="timeAndEvent")
-        if not container:
+        info = self.section("time_and_event")
+        if not info:
             return None
 
-        time_div = container.find("div", class_="time")
-        date_div = container.find("div", class_="date")
-        event_div = container.find("div", class_="event")
-        status_div = container.find("div", class_="countdown")
-
-        time_str = time_div.text.strip() if time_div else None
-        date_str = convert_date_string(date_div.text.strip()) if date_div else None
-        event_name = event_div.text.strip() if event_div else None
+        time_str = info["time"]
+        date_str = convert_date_string(info["date"]) if info["date"] else None
+        event_name = info["event"]
 
         self.datetime = f"{date_str} {time_str}" if date_str and time_str else None
         self.event = event_name
 
-        if status_div:
-            text = status_div.get_text(strip=True).lower()
+        # Scheduled start as epoch seconds (the displayed time depends on the client timezone)
+        unix_ms = info["unix"]
+        self.start_timestamp = int(unix_ms) / 1000 if unix_ms and unix_ms.isdigit() else None
+
+        if info["countdown"] is not None:
+            text = info["countdown"].lower()
             if "match over" in text:
                 self.status = MatchStatus.PAST
             elif "live" in text:
@@ -115,66 +141,42 @@ class Match():
                 self.status = MatchStatus.FUTURE
 
         # ---- TEAM A / TEAM B ----
-        teams_box = self.soup.find("div", class_="standard-box teamsBox")
+        teams_box = self.section("teams_box")
         if not teams_box:
             return
 
-        team_divs = teams_box.find_all("div", class_="team", limit=2)
+        team_divs = teams_box["teams"]
 
         self.team_a_name = None
         self.team_b_name = None
 
         if len(team_divs) >= 1:
-            team_a_name_div = team_divs[0].find("div", class_="teamName")
-            self.team_a_name = team_a_name_div.get_text(strip=True) if team_a_name_div else None
+            self.team_a_name = team_divs[0]["name"]
 
         if len(team_divs) >= 2:
-            team_b_name_div = team_divs[1].find("div", class_="teamName")
-            self.team_b_name = team_b_name_div.get_text(strip=True) if team_b_name_div else None
+            self.team_b_name = team_divs[1]["name"]
             
 
     def extract_stats(self):
         map_lookup = self.build_map_name_lookup()
-        stats_blocks = self.soup.select("div.stats-content")
-        for block in stats_blocks:
-            map_id = block.get("data-map-id")
+        for block in self.section("stats"):
+            map_id = block["map_id"]
 
-            if map_id == "all" or block.get("id") == "all-content":
+            if map_id == "all" or block["id"] == "all-content":
                 map_name = "total"
                 is_total = True
             else:
                 map_name = map_lookup.get(map_id, "unknown")
                 is_total = False
 
-            tables = block.select("table.table.totalstats")
-            for table in tables:
-                header = table.select_one("tr.header-row")
-                team_tag = header.select_one("a.teamName") if header else None
-                team_name = team_tag.get_text(strip=True) if team_tag else None
+            for table in block["tables"]:
+                team_name = table["team_name"]
 
-                for row in table.select("tr"):
-                    if "header-row" in row.get("class", []):
+                for row in table["rows"]:
+                    if "header-row" in row["classes"]:
                         continue
 
-                    nick_tag = row.select_one("span.player-nick")
-                    nickname = nick_tag.get_text(strip=True)
-
-
-                    # nationality 
-                    flag = row.select_one("img.flag") 
-                    nationality = flag["title"] if flag else None
-
-                    kd = row.select_one("td.kd.traditional-data")
-                    adr = row.select_one("td.adr.traditional-data")
-                    kast = row.select_one("td.kast.traditional-data")
-                    rating = row.select_one("td.rating")
-                    swing = row.select_one("td.roundSwing")
-
-                    kd_text = kd.get_text(strip=True) if kd else None
-                    adr_text = adr.get_text(strip=True) if adr else None
-                    kast_text = kast.get_text(strip=True) if kast else None
-                    rating_text = rating.get_text(strip=True) if rating else None
-                    swing_text = swing.get_text(strip=True) if swing else None
+                    kd_text = row["kd"]
 
                     kills = deaths = None
                     if kd_text and "-" in kd_text:
@@ -182,14 +184,14 @@ class Match():
                         kills, deaths = int(k), int(d)
 
                     ps = PlayerStats(
-                        nickname=nickname,
+                        nickname=row["nickname"],
                         kills=kills,
                         deaths=deaths,
                         kd=kd_text,
-                        adr=adr_text,
-                        kast=kast_text,
-                        rating=rating_text,
-                        swing=swing_text
+                        adr=row["adr"],
+                        kast=row["kast"],
+                        rating=row["rating"],
+                        swing=row["swing"]
                     )
 
                     # Add to Stats object
@@ -203,102 +205,63 @@ class Match():
         """Scrapes map info: picks, bans, results, scores, and stats URLs."""
         self.maps_info = []
 
-        maps_container = self.soup.select_one("div.col-6.col-7-small")
-        if not maps_container:
+        maps_box = self.section("maps_box")
+        if not maps_box:
             return
 
-        # Extract veto/pick info (if available)
-        veto_boxes = maps_container.select("div.veto-box")
+        # Extract veto/pick info (if available), each line is a pick/ban
         self.veto_info = []
-        for vb in veto_boxes:
-            text_div = vb.select_one("div.padding")
-            if text_div:
-                # Each line is a pick/ban
-                lines = [line.strip() for line in text_div.stripped_strings if line.strip()]
-                self.veto_info.extend(lines)
+        for vb in maps_box["veto"]:
+            self.veto_info.extend(vb["lines"])
 
         # Extract per-map results
-        mapholders = maps_container.select("div.mapholder")
-        for m in mapholders:
-            map_name_div = m.select_one(".mapname")
-            map_name = map_name_div.get_text(strip=True) if map_name_div else None
-
-            results = m.select_one(".results")
-            if not results:
-                continue
-
-            left_team_div = results.select_one(".results-left")
-            right_team_div = results.select_one(".results-right")
-
-            def parse_team(team_div):
-                if not team_div:
-                    return {"name": None, "score": None, "status": None}
-                name_div = team_div.select_one(".results-teamname")
-                score_div = team_div.select_one(".results-team-score")
-                classes = team_div.get("class", [])
-                if "won" in classes:
-                    status = "won"
-                elif "lost" in classes:
-                    status = "lost"
-                elif "tie" in classes:
-                    status = "tie"
-                else:
-                    status = None
-                # If score is "-", treat as None
-                score = score_div.get_text(strip=True) if score_div else None
-                if score == "-":
-                    score = None
-                return {
-                    "name": name_div.get_text(strip=True) if name_div else None,
-                    "score": score,
-                    "status": status
-                }
-
-            left_team = parse_team(left_team_div)
-            right_team = parse_team(right_team_div)
-
+        def parse_team(team):
+            if not team:
+                return {"name": None, "score": None, "status": None}
+            classes = team["classes"]
+            if "won" in classes:
+                status = "won"
+            elif "lost" in classes:
+                status = "lost"
+            elif "tie" in classes:
+                status = "tie"
+            else:
+                status = None
+            # If score is "-", treat as None
+            score = team["score"]
+            if score == "-":
+                score = None
+            return {
+                "name": team["name"],
+                "score": score,
+                "status": status
+            }
+
+        for m in maps_box["mapholders"]:
             self.maps_info.append({
-                "map_name": map_name,
-                "team_a": left_team,
-                "team_b": right_team
+                "map_name": m["map_name"],
+                "team_a": parse_team(m["team_a"]),
+                "team_b": parse_team(m["team_b"])
             })
 
 
     def build_map_name_lookup(self):
         mapping = {}
-
-        full_names = self.soup.select(".dynamic-map-name-full")
-        for div in full_names:
-            map_id = div.get("id")
-            map_name = div.get_text(strip=True)
-            if map_id:
-                mapping[map_id] = map_name
-
+        for div in self.section("map_names"):
+            if div["id"]:
+                mapping[div["id"]] = div["name"]
         return mapping
 
     def players_scrape(self):
         self.team_a_players = []
         self.team_b_players = []
-        lineups = self.soup.select("div.lineup.standard-box")
         fst = True
-        for lineup in lineups:
-            team_name_tag = lineup.select_one(".box-headline a.text-ellipsis")
-            team_name = team_name_tag.get_text(strip=True)
-
-            player_divs = lineup.select("div.player-compare")
-            for pdiv in player_divs:
-                name_div = pdiv.select_one(".text-ellipsis")
-                if not name_div:
-                    continue
-                player_name = name_div.get_text(strip=True)
-
-                flag_img = pdiv.find("img", class_="flag")
-                nationality = flag_img['title'] if flag_img else None
-
+        for lineup in self.section("lineups"):
+            for p in lineup["players"]:
                 if fst:
-                    self.team_a_players.append(Player(player_name, nationality))
+                    self.team_a_players.append(Player(p["name"], p["nationality"], p["player_id"]))
                 else:
-                    self.team_b_players.append(Player(player_name, nationality))
+                    self.team_b_players.append(Player(p["name"], p["nationality"], p["player_id"]))
                     
             fst = False
 
@@ -325,11 +288,8 @@ if __name__ == "__main__":
 
     
     import logging
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s [%(levelname)s] %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S"
-    )
+    from configs import LOG_FORMAT, LOG_DATEFMT
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT, datefmt=LOG_DATEFMT)
     logger = logging.getLogger(__name__)
     mtcs = {
         "past": {"url": "https://www.hltv.org/matches/2388113/furia-vs-g2-starladder-budapest-major-2025", "file_name" : "single_match_past.html"},
@@ -0,0 +1,112 @@
+""" Where things live on an HLTV match page (and the player pages of its lineups); selectors compile on import """
+from extraction import Schema, Field, text, raw_text, classes, strings
+
+
+# ---- LINEUPS ----
+LINEUP_PLAYER = Schema(
+    name=Field(".text-ellipsis", required=True),
+    nationality=Field("img.flag", attr="title"),
+    player_id=Field(attr="data-player-id"),
+)
+
+LINEUP = Schema(
+    team_name=Field(".box-headline a.text-ellipsis"),
+    players=Field("div.player-compare", many=True, schema=LINEUP_PLAYER),
+)
+
+# ---- TIME / EVENT / STATUS ----
+TIME_AND_EVENT = Schema(
+    time=Field("div.time", convert=raw_text),
+    unix=Field("div.time", attr="data-unix"),
+    date=Field("div.date", convert=raw_text),
+    event=Field("div.event", convert=raw_text),
+    countdown=Field("div.countdown"),
+)
+
+# ---- TEAM A / TEAM B ----
+TEAM = Schema(
+    name=Field("div.teamName"),
+)
+
+TEAMS_BOX = Schema(
+    teams=Field("div.team", many=True, limit=2, schema=TEAM),
+)
+
+# ---- MAPS / VETO ----
+RESULT_TEAM = Schema(
+    name=Field(".results-teamname"),
+    score=Field(".results-team-score"),
+    classes=Field(convert=classes),
+)
+
+MAPHOLDER = Schema(
+    map_name=Field(".mapname"),
+    results=Field(".results", convert=lambda el: True, required=True),
+    team_a=Field(".results .results-left", schema=RESULT_TEAM),
+    team_b=Field(".results .results-right", schema=RESULT_TEAM),
+)
+
+VETO_BOX = Schema(
+    lines=Field("div.padding", convert=strings, default=[]),
+)
+
+MAPS_BOX = Schema(
+    veto=Field("div.veto-box", many=True, schema=VETO_BOX),
+    mapholders=Field("div.mapholder", many=True, schema=MAPHOLDER),
+)
+
+MAP_NAME = Schema(
+    id=Field(attr="id"),
+    name=Field(convert=text),
+)
+
+# ---- STATS ----
+STATS_ROW = Schema(
+    classes=Field(convert=classes),
+    nickname=Field("span.player-nick", required=True),
+    nationality=Field("img.flag", attr="title"),
+    kd=Field("td.kd.traditional-data"),
+    adr=Field("td.adr.traditional-data"),
+    kast=Field("td.kast.traditional-data"),
+    rating=Field("td.rating"),
+    swing=Field("td.roundSwing"),
+)
+
+STATS_TABLE = Schema(
+    team_name=Field("tr.header-row a.teamName"),
+    rows=Field("tr", many=True, schema=STATS_ROW),
+)
+
+STATS_BLOCK = Schema(
+    map_id=Field(attr="data-map-id"),
+    id=Field(attr="id"),
+    tables=Field("table.table.totalstats", many=True, schema=STATS_TABLE),
+)
+
+# ---- PAGE ----
+MATCH_PAGE = Schema(
+    lineups=Field("div.lineup.standard-box", many=True, schema=LINEUP),
+    time_and_event=Field("div.timeAndEvent", schema=TIME_AND_EVENT),
+    teams_box=Field("div.standard-box.teamsBox", schema=TEAMS_BOX),
+    maps_box=Field("div.col-6.col-7-small", schema=MAPS_BOX),
+    map_names=Field(".dynamic-map-name-full", many=True, schema=MAP_NAME),
+    stats=Field("div.stats-content", many=True, schema=STATS_BLOCK),
+)
+
+# ---- PLAYER PROFILE PAGE (/player/<id>/<nickname>) ----
+TEAM_HISTORY_ROW = Schema(
+    team=Field("td.team-name-cell span.team-name", required=True),
+    team_link=Field("td.team-name-cell a", attr="href"),
+    period=Field("td.time-period-cell", convert=raw_text),
+    period_unix=Field("td.time-period-cell span", many=True, attr="data-unix"),
+)
+
+PLAYER_PAGE = Schema(
+    nickname=Field("h1.playerNickname"),
+    real_name=Field("div.playerRealname", convert=raw_text),
+    nationality=Field("div.playerRealname img.flag", attr="title"),
+    age=Field("div.playerAge span.listRight"),
+    team=Field("div.playerTeam span.listRight a"),
+    team_link=Field("div.playerTeam span.listRight a", attr="href"),
+    team_history=Field("table.team-breakdown tr.team", many=True, schema=TEAM_HISTORY_ROW),
+)
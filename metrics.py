@@ -0,0 +1,201 @@
+import re
+import bisect
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric():
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+        return tuple(str(v) for v in labels)
+
+    def remove(self, *labels):
+        with self.lock:
+            self.values.pop(self._key(labels), None)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            items = list(self.values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, *labels, value):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, *labels, value):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _samples(self, key, state):
+        counts, total, count = state
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            cumulative += n
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', _format_value(bound)))} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry():
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets)
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# ------------------ Scraper / tracker metrics ------------------ #
+HTTP_REQUESTS = REGISTRY.counter("hltv_http_requests_total", "HTTP requests by endpoint and status", ("endpoint", "status"))
+HTTP_LATENCY = REGISTRY.histogram("hltv_http_request_seconds", "HTTP request latency by endpoint", ("endpoint",))
+PARSE_SECONDS = REGISTRY.histogram("hltv_parse_seconds", "Time to parse one page", ("page",))
+CACHE_REQUESTS = REGISTRY.counter("hltv_cache_requests_total", "Cache lookups by cache and result (hit/miss)", ("cache", "result"))
+LIVE_EVENTS = REGISTRY.counter("hltv_live_events_total", "Scorebot events received", ("match_id", "event"))
+LIVE_EVENT_RATE = REGISTRY.gauge("hltv_live_events_per_second", "Scorebot events per second over the last poll", ("match_id",))
+LIVE_POLL_LAG = REGISTRY.gauge("hltv_live_poll_lag_seconds", "Time between polls beyond the configured poll interval", ("match_id",))
+LIVE_RECONNECTS = REGISTRY.counter("hltv_live_reconnects_total", "Scorebot (re)connections", ("match_id",))
+LIVE_SCHEMA_VIOLATIONS = REGISTRY.counter("hltv_live_schema_violations_total", "Scorebot payload schema violations by event, key and kind", ("match_id", "event", "key", "kind"))
+LIVE_FRAMES_DROPPED = REGISTRY.counter("hltv_live_frames_dropped_total", "Malformed scorebot frames dropped instead of processed", ("match_id", "event"))
+LIVE_PAGE_REFRESHES = REGISTRY.counter("hltv_live_page_refreshes_total", "Live match page refreshes by result (not_modified/unchanged/changed)", ("result",))
+FETCH_RESULTS = REGISTRY.counter("hltv_fetch_results_total", "Page fetch attempts by endpoint and classification (ok/challenge/rate_limited/not_found/error)", ("endpoint", "result"))
+FETCH_BREAKER_OPEN = REGISTRY.gauge("hltv_fetch_breaker_open", "1 while the challenge circuit breaker pauses fetching", ())
+
+
+ENDPOINT_PATTERNS = (
+    ("scorebot", re.compile(r"scorebot")),
+    ("matches_event", re.compile(r"/matches\?event=")),
+    ("matches_day", re.compile(r"/matches\?")),
+    ("match", re.compile(r"/matches/\d+")),
+    ("results", re.compile(r"/results")),
+    ("matches_list", re.compile(r"/matches(/|$)")),
+    ("player", re.compile(r"/player/\d+")),
+    ("event", re.compile(r"/events/\d+")),
+)
+
+
+def endpoint_of(url):
+    """ Low-cardinality endpoint label for a URL """
+    for name, pattern in ENDPOINT_PATTERNS:
+        if pattern.search(url):
+            return name
+    return "other"
+
+
+# ------------------ Exposition ------------------ #
+def start_http_server(port, host="127.0.0.1", registry=REGISTRY):
+    """ Serves registry.render() on http://host:port/metrics from a daemon thread """
+    # http.server pulls in the email package; keep it off the import path of short jobs
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True)
+    thread.start()
+    logger.info(f"Metrics available at http://{host}:{server.server_port}/metrics")
+    return server
@@ -1,16 +1,22 @@
 class Player():
-    def __init__(self, nickname, nationality):
+    def __init__(self, nickname, nationality, player_id=None):
         self.nickname = nickname
         self.nationality = nationality
+        self.player_id = player_id
+        self.profile = None     # joined by player_profiles.ProfileEnricher
 
     def is_pt(self):
         return self.nationality == 'Portugal'
 
     def to_json(self):
-        return {
+        data = {
             "nickname": self.nickname,
-            "nationality": self.nationality
+            "nationality": self.nationality,
+            "player_id": self.player_id
         }
+        if self.profile is not None:
+            data["profile"] = self.profile
+        return data
 
     def to_csv(self):
         return [self.nickname, self.nationality]
\ No newline at end of file
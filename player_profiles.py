@@ -0,0 +1,263 @@
+""" Player profile enrichment: each unique player's page fetched at most once per TTL, joined onto the lineups """
+import os
+import re
+import json
+import time
+import logging
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+from configs import (PROFILE_CACHE_PATH, PROFILE_TTL, PROFILE_WORKERS, DELAY_BETWEEN_REQUESTS,
+                     ARCHIVE_PAGES, PARSE_ENGINE)
+from metrics import CACHE_REQUESTS, PARSE_SECONDS
+from match_schema import PLAYER_PAGE
+
+logger = logging.getLogger(__name__)
+
+
+PLAYER_URL = "https://www.hltv.org/player/{player_id}/{slug}"
+TEAM_ID_RE = re.compile(r"/team/(\d+)/")
+AGE_RE = re.compile(r"(\d+)")
+
+
+def player_url(player_id, nickname=None):
+    # HLTV redirects any slug to the canonical one, the id is what matters
+    slug = re.sub(r"[^a-z0-9-]+", "", (nickname or "player").lower()) or "player"
+    return PLAYER_URL.format(player_id=player_id, slug=slug)
+
+
+def unix_date(value):
+    """ data-unix (ms) -> 'YYYY-MM-DD' """
+    if not value or not value.isdigit():
+        return None
+    return datetime.fromtimestamp(int(value) / 1000, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+def team_id(link):
+    m = TEAM_ID_RE.search(link or "")
+    return int(m.group(1)) if m else None
+
+
+def parse_profile(player_id, html, engine=PARSE_ENGINE):
+    """ Profile dict from a player page """
+    start = time.perf_counter()
+    if engine == "stream":
+        from streaming import extract
+        page = extract(PLAYER_PAGE, html)
+    else:
+        from bs4 import BeautifulSoup
+        page = PLAYER_PAGE.extract(BeautifulSoup(html, "html.parser"))
+    PARSE_SECONDS.observe("player", value=time.perf_counter() - start)
+
+    age = AGE_RE.search(page["age"] or "")
+    history = []
+    for row in page["team_history"]:
+        dates = [unix_date(v) for v in row["period_unix"]]
+        history.append({
+            "team": row["team"],
+            "team_id": team_id(row["team_link"]),
+            "start": dates[0] if dates else None,
+            # a single date means the stint is still running ("... - Present")
+            "end": dates[1] if len(dates) > 1 else None,
+        })
+    return {
+        "player_id": int(player_id),
+        "nickname": page["nickname"],
+        "real_name": page["real_name"] or None,
+        "nationality": page["nationality"],
+        "age": int(age.group(1)) if age else None,
+        "team": page["team"],
+        "team_id": team_id(page["team_link"]),
+        "team_history": history,
+    }
+
+
+# ------------------ Cache ------------------ #
+class ProfileCache():
+    """ Profiles by player id as JSON lines, newest line wins; a None profile records a missing player page """
+    def __init__(self, path=PROFILE_CACHE_PATH, ttl=PROFILE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        lines = 0
+        with open(self.path, "r", encoding="utf-8") as fp:
+            for line in fp:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # cut short by a crash
+                self.entries[str(entry["player_id"])] = entry
+                lines += 1
+        if lines > 2 * len(self.entries):
+            self.compact()
+
+    def compact(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fp:
+            for entry in self.entries.values():
+                fp.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(tmp, self.path)
+
+    def fresh(self, player_id, now=None):
+        """ The cache entry if it is younger than the TTL, else None """
+        entry = self.entries.get(str(player_id))
+        if entry is None or (now or time.time()) - entry["fetched_at"] >= self.ttl:
+            return None
+        return entry
+
+    def put(self, player_id, profile, fetched_at=None):
+        entry = {"player_id": str(player_id), "fetched_at": fetched_at or time.time(), "profile": profile}
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as fp:
+                fp.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.entries[entry["player_id"]] = entry
+        return entry
+
+
+class _Call():
+    """ One in-flight profile fetch that other threads can wait on """
+    def __init__(self):
+        self.done = threading.Event()
+        self.profile = None
+        self.error = None
+
+
+# ------------------ Enrichment ------------------ #
+class ProfileEnricher():
+    def __init__(self, cache=None, pool=None, archive=None, workers=PROFILE_WORKERS,
+                 delay=DELAY_BETWEEN_REQUESTS):
+        self.cache = cache if cache is not None else ProfileCache()
+        self.pool = pool
+        self.archive = archive
+        self.workers = workers
+        self.delay = delay
+        self.inflight = {}
+        self.lock = threading.Lock()
+        self.fetched = 0
+        self.coalesced = 0
+
+    def get(self, player_id, nickname=None):
+        """ Profile of one player: from the cache, from a fetch already running, or fetched now """
+        player_id = str(player_id)
+        entry = self.cache.fresh(player_id)
+        if entry is not None:
+            CACHE_REQUESTS.inc("player_profile", "hit")
+            return entry["profile"]
+
+        with self.lock:
+            call = self.inflight.get(player_id)
+            leader = call is None
+            if leader:
+                # a fetch may have finished between the cache check and the lock
+                entry = self.cache.fresh(player_id)
+                if entry is not None:
+                    CACHE_REQUESTS.inc("player_profile", "hit")
+                    return entry["profile"]
+                call = self.inflight[player_id] = _Call()
+        if not leader:
+            self.coalesced += 1
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.profile
+
+        CACHE_REQUESTS.inc("player_profile", "miss")
+        try:
+            call.profile = self._fetch(player_id, nickname)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.inflight[player_id]
+            call.done.set()
+        return call.profile
+
+    def _fetch(self, player_id, nickname):
+        from sessions import FetchError, NOT_FOUND, get_default_pool
+        if self.pool is None:
+            self.pool = get_default_pool()
+        url = player_url(player_id, nickname)
+        try:
+            resp = self.pool.fetch(url)
+        except FetchError as e:
+            if e.kind != NOT_FOUND:
+                raise
+            self.cache.put(player_id, None)
+            return None
+        finally:
+            self.fetched += 1
+            time.sleep(self.delay)
+        if ARCHIVE_PAGES:
+            if self.archive is None:
+                from archive import get_default_archive
+                self.archive = get_default_archive()
+            self.archive.put(url, resp.content)
+        profile = parse_profile(player_id, resp.text)
+        self.cache.put(player_id, profile)
+        return profile
+
+    # ------------------ Batches ------------------ #
+    def collect(self, matches):
+        """ {player_id: nickname} over every lineup of the given matches """
+        unique = {}
+        for players in _lineups(matches):
+            for p in players:
+                player_id, nickname = _player_key(p)
+                if player_id:
+                    unique.setdefault(str(player_id), nickname)
+        return unique
+
+    def enrich(self, matches):
+        """ Fetches every uncached player of the matches once and sets `profile` on them; {player_id: profile} """
+        matches = list(matches)
+        unique = self.collect(matches)
+        profiles = {}
+
+        def load(item):
+            player_id, nickname = item
+            try:
+                profiles[player_id] = self.get(player_id, nickname)
+            except Exception as e:
+                logger.warning(f"Profile of player {player_id} ({nickname}) not fetched: {e}")
+
+        missing = [item for item in unique.items() if self.cache.fresh(item[0]) is None]
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as executor:
+            list(executor.map(load, unique.items()))
+        logger.info(f"Profiles for {len(unique)} unique players: {len(unique) - len(missing)} cached, "
+                    f"{len(missing)} to fetch, {sum(1 for p in profiles.values() if p is not None)} joined")
+
+        for players in _lineups(matches):
+            for p in players:
+                player_id, _ = _player_key(p)
+                profile = profiles.get(str(player_id)) if player_id else None
+                if profile is None:
+                    continue
+                if isinstance(p, dict):
+                    p["profile"] = profile
+                else:
+                    p.profile = profile
+        return profiles
+
+
+def _lineups(matches):
+    for match in matches:
+        if isinstance(match, dict):
+            yield match.get("team_a_players") or []
+            yield match.get("team_b_players") or []
+        else:
+            yield getattr(match, "team_a_players", [])
+            yield getattr(match, "team_b_players", [])
+
+
+def _player_key(player):
+    if isinstance(player, dict):
+        return player.get("player_id"), player.get("nickname")
+    return player.player_id, player.nickname
@@ -0,0 +1,142 @@
+""" Schemas of the scorebot payloads LiveMatch consumes: malformed frames are dropped and counted, not raised """
+import logging
+
+from metrics import LIVE_SCHEMA_VIOLATIONS, LIVE_FRAMES_DROPPED
+
+logger = logging.getLogger(__name__)
+
+
+# Violation kinds
+NOT_OBJECT = "not_object"   # payload isn't a JSON object
+MISSING = "missing"         # key absent or null
+WRONG_TYPE = "wrong_type"
+WRONG_ITEM = "wrong_item"   # list item of the wrong type
+APPLY_ERROR = "apply_error" # passed the schema but a consumer still choked on it
+
+_ABSENT = object()
+
+
+class Key():
+    """ One top-level payload key; types match exactly (True is not an int here) """
+    def __init__(self, name, types, default=None, required=False, items=None):
+        self.name = name
+        self.types = types if isinstance(types, tuple) else (types,)
+        self.default = default     # what project() hands out when the key is missing or mistyped
+        self.required = required   # a missing or mistyped value drops the whole frame
+        self.items = items         # for lists, the type every item must have
+
+    def compile(self):
+        return (self.name, frozenset(self.types), self.default, self.required, self.items)
+
+
+class PayloadSchema():
+    def __init__(self, event, keys):
+        self.event = event
+        self.keys = {key.name: key for key in keys}
+        self.compiled = tuple(key.compile() for key in keys)
+        self.defaults = {key.name: key.default for key in keys}
+
+    def violations(self, data):
+        """ [(key, kind)] of everything wrong with a payload, and whether it must be dropped """
+        if not isinstance(data, dict):
+            return [("*", NOT_OBJECT)], True
+        found = []
+        drop = False
+        for name, types, _, required, items in self.compiled:
+            value = data.get(name, _ABSENT)
+            if value is _ABSENT or value is None:
+                kind = MISSING
+            elif type(value) not in types:
+                kind = WRONG_TYPE
+            elif items is not None and not all(type(item) is items for item in value):
+                kind = WRONG_ITEM
+            else:
+                continue
+            found.append((name, kind))
+            drop = drop or required
+        return found, drop
+
+    def project(self, data, fields=None):
+        """ {key: value} of the given keys (default: all), typed defaults where a value is missing or mistyped """
+        names = fields or self.defaults
+        if not isinstance(data, dict):
+            return {name: self.defaults.get(name) for name in names}
+        out = {}
+        for name in names:
+            value = data.get(name)
+            key = self.keys.get(name)
+            if key is not None and (value is None or type(value) not in key.types):
+                value = key.default
+            out[name] = value
+        return out
+
+
+SCOREBOARD = PayloadSchema("scoreboard", [
+    Key("mapName", str, required=True),
+    Key("terroristTeamName", str),
+    Key("ctTeamName", str),
+    Key("currentRound", int, 0),
+    Key("counterTerroristScore", int, 0),
+    Key("terroristScore", int, 0),
+    Key("ctTeamId", int),
+    Key("tTeamId", int),
+    Key("frozen", bool, False),
+    Key("live", bool, False),
+    Key("ctTeamScore", int, 0),
+    Key("tTeamScore", int, 0),
+    Key("startingCt", int),
+    Key("startingT", int),
+    Key("regulationHalfLength", int, 12),
+    Key("overtimeHalfLength", int, 3),
+])
+
+# Kill, RoundEnd, ... entries, each a one-key object
+LOG = PayloadSchema("log", [
+    Key("log", list, [], required=True, items=dict),
+])
+
+SCHEMAS = {schema.event: schema for schema in (SCOREBOARD, LOG)}
+
+
+class PayloadValidator():
+    """ Checks decoded frames of one match against SCHEMAS and counts what is wrong with them """
+    def __init__(self, match_id=None, schemas=SCHEMAS):
+        self.match_id = match_id
+        self.schemas = schemas
+        self.violations = {}    # (event, key, kind) -> count
+        self.dropped = {}       # event -> count
+        self.partial = 0        # frames kept despite optional key violations
+
+    def check(self, event_name, data):
+        """ True if the frame can be used; events without a schema always pass """
+        schema = self.schemas.get(event_name)
+        if schema is None:
+            return True
+        found, drop = schema.violations(data)
+        if not found:
+            return True
+        if drop:
+            # the frame is gone: only the reason it was dropped is counted
+            for name, kind in found:
+                if name not in schema.keys or schema.keys[name].required:
+                    self.count(event_name, name, kind)
+            self.drop(event_name)
+            logger.debug(f"Dropped malformed '{event_name}' frame: {found}")
+            return False
+        for name, kind in found:
+            self.count(event_name, name, kind)
+        self.partial += 1
+        return True
+
+    def count(self, event_name, name, kind):
+        key = (event_name, name, kind)
+        self.violations[key] = self.violations.get(key, 0) + 1
+        LIVE_SCHEMA_VIOLATIONS.inc(self.match_id, event_name, name, kind)
+
+    def drop(self, event_name):
+        self.dropped[event_name] = self.dropped.get(event_name, 0) + 1
+        LIVE_FRAMES_DROPPED.inc(self.match_id, event_name)
+
+    def stats(self):
+        return {"violations": {"/".join(key): n for key, n in self.violations.items()},
+                "dropped": dict(self.dropped), "partial": self.partial}
@@ -8,6 +8,7 @@ import csv
 import sys
 import logging
 from enum import Enum
+from archive import get_default_archive
 
 class MatchStatus(Enum):
     FUTURE = "future"
@@ -31,11 +32,6 @@ CONFIG = {
 
 
 # ------------------ Logging Setup ------------------ #
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
 logger = logging.getLogger(__name__)
 
 # ------------------ Helper Functions ------------------ #
@@ -124,9 +120,8 @@ class Match():
 
     def fetch_html(self):
         resp = requests.get(self.url, impersonate=CONFIG["impersonate_browser"])
+        get_default_archive().put(self.url, resp.content, self.match_id)
         self.soup = BeautifulSoup(resp.text, "html.parser")
-        with open("single_match_future.html", "w", encoding="utf-8") as f:
-            f.write(self.soup.prettify())
 
     def scrape_html(self):
         self.extract_teams_players()
@@ -235,6 +230,11 @@ class Player():
 
 # ------------------ Main Script ------------------ #
 if __name__ == '__main__':
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S"
+    )
     start_time = time.time()
 
     url = 'https://www.hltv.org/matches/2388121/b8-vs-natus-vincere-starladder-budapest-major-2025'
@@ -0,0 +1,339 @@
+import time
+import random
+import logging
+import threading
+from collections import deque
+from curl_cffi import requests
+
+from metrics import HTTP_REQUESTS, HTTP_LATENCY, FETCH_RESULTS, FETCH_BREAKER_OPEN, endpoint_of
+from configs import (SESSION_PROFILES, SESSION_COOLDOWN, SESSION_MAX_COOLDOWN,
+                     SESSION_FAILURE_THRESHOLD, SESSION_LATENCY_REFERENCE, REQUEST_TIMEOUT,
+                     FETCH_RETRIES, FETCH_BACKOFF, FETCH_MAX_BACKOFF, BREAKER_WINDOW,
+                     BREAKER_THRESHOLD, BREAKER_COOLDOWN, BREAKER_MAX_COOLDOWN)
+
+logger = logging.getLogger(__name__)
+
+
+# Markers of a Cloudflare interstitial served instead of the requested page
+CHALLENGE_MARKERS = (
+    "challenge-platform",
+    "cf_chl_opt",
+    "cf-browser-verification",
+    "<title>Just a moment...</title>",
+    "<title>Attention Required! | Cloudflare</title>",
+)
+
+HEALTH_ALPHA = 0.3  # weight of the newest observation in the moving averages
+
+# Response classes (classify)
+OK = "ok"
+CHALLENGE = "challenge"
+RATE_LIMITED = "rate_limited"
+NOT_FOUND = "not_found"
+ERROR = "error"         # 5xx, other 4xx, connection errors
+RETRYABLE = (CHALLENGE, RATE_LIMITED, ERROR)
+
+
+def is_challenge(status_code, text):
+    if status_code not in (200, 403, 503):
+        return False
+    head = text[:20000]
+    return any(marker in head for marker in CHALLENGE_MARKERS)
+
+
+def classify(resp):
+    """ One of OK, CHALLENGE, RATE_LIMITED, NOT_FOUND, ERROR; 304 counts as OK """
+    status = resp.status_code
+    if is_challenge(status, resp.text):
+        return CHALLENGE
+    if status in (200, 304):
+        return OK
+    if status == 429:
+        return RATE_LIMITED
+    if status in (404, 410):
+        return NOT_FOUND
+    if status == 403:
+        return CHALLENGE  # plain Cloudflare block without the interstitial
+    return ERROR
+
+
+def retry_after(resp):
+    """ Seconds from a Retry-After header (delta-seconds form only), or None """
+    value = resp.headers.get("Retry-After") if resp is not None else None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class FetchError(Exception):
+    """ A page fetch that gave up: not found, or still blocked/failing after the retries """
+    def __init__(self, url, kind, status_code=None, attempts=1):
+        self.url = url
+        self.kind = kind
+        self.status_code = status_code
+        self.attempts = attempts
+        super().__init__(f"{url}: {kind}" + (f" (HTTP {status_code})" if status_code else "") +
+                         f" after {attempts} attempt{'s' if attempts != 1 else ''}")
+
+
+class CircuitBreaker():
+    """ Pauses every fetch once `threshold` challenges come within `window` seconds, then lets one trial through """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, window=BREAKER_WINDOW, threshold=BREAKER_THRESHOLD,
+                 cooldown=BREAKER_COOLDOWN, max_cooldown=BREAKER_MAX_COOLDOWN):
+        self.window = window
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state = self.CLOSED
+        self.challenges = deque()   # timestamps of recent challenges
+        self.trips = 0              # consecutive openings without a success in between
+        self.open_until = 0.0
+        self.trial_running = False
+        self.cond = threading.Condition()
+
+    def before_request(self):
+        """ Blocks while the breaker is open, and while another thread runs the half-open trial """
+        with self.cond:
+            while True:
+                now = time.time()
+                if self.state == self.CLOSED:
+                    return
+                if self.state == self.OPEN and now >= self.open_until:
+                    self.state = self.HALF_OPEN
+                    self.trial_running = False
+                if self.state == self.HALF_OPEN and not self.trial_running:
+                    self.trial_running = True
+                    return
+                wait = self.open_until - now if self.state == self.OPEN else 1.0
+                self.cond.wait(max(wait, 0.05))
+
+    def record(self, kind):
+        with self.cond:
+            now = time.time()
+            if self.state == self.HALF_OPEN and self.trial_running:
+                self.trial_running = False
+                if kind == CHALLENGE:
+                    self._open(now)
+                elif kind in (OK, NOT_FOUND):
+                    self._close()
+                self.cond.notify_all()
+                return
+            if kind != CHALLENGE:
+                if kind == OK and self.state == self.CLOSED:
+                    self.trips = 0
+                return
+            self.challenges.append(now)
+            while self.challenges and self.challenges[0] < now - self.window:
+                self.challenges.popleft()
+            if self.state == self.CLOSED and len(self.challenges) >= self.threshold:
+                self._open(now)
+
+    def _open(self, now):
+        self.trips += 1
+        delay = min(self.cooldown * 2 ** (self.trips - 1), self.max_cooldown)
+        self.state = self.OPEN
+        self.open_until = now + delay
+        self.challenges.clear()
+        FETCH_BREAKER_OPEN.set(value=1)
+        logger.warning(f"Challenges spiking, pausing all fetches for {delay:.0f}s")
+
+    def _close(self):
+        self.state = self.CLOSED
+        self.trips = 0
+        FETCH_BREAKER_OPEN.set(value=0)
+        logger.info("Trial fetch passed, resuming fetches")
+
+    def to_json(self):
+        with self.cond:
+            return {"state": self.state, "trips": self.trips,
+                    "recent_challenges": len(self.challenges),
+                    "open_left": max(0.0, round(self.open_until - time.time(), 1))}
+
+
+class SessionProfile():
+    def __init__(self, impersonate, headers=None, proxy=None):
+        self.impersonate = impersonate
+        self.headers = headers or {}
+        self.proxy = proxy
+
+    @classmethod
+    def from_config(cls, cfg):
+        return cls(cfg["impersonate"], cfg.get("headers"), cfg.get("proxy"))
+
+    def __repr__(self):
+        return f"SessionProfile({self.impersonate}{', ' + self.proxy if self.proxy else ''})"
+
+
+def default_session_factory(profile):
+    proxies = {"http": profile.proxy, "https": profile.proxy} if profile.proxy else None
+    return requests.Session(impersonate=profile.impersonate, headers=profile.headers, proxies=proxies)
+
+
+class PooledSession():
+    def __init__(self, profile, session_factory):
+        self.profile = profile
+        self.session_factory = session_factory
+        self.session = session_factory(profile)
+
+        self.success = 1.0          # EWMA of ok responses (1) vs blocked/failed ones (0)
+        self.latency = None         # EWMA of response time in seconds
+        self.failures = 0           # consecutive blocked/failed responses
+        self.strikes = 0            # cool-downs in a row without a success in between
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.blocked = 0
+
+    def score(self):
+        latency = self.latency if self.latency is not None else SESSION_LATENCY_REFERENCE
+        return self.success / (1.0 + latency / SESSION_LATENCY_REFERENCE)
+
+    def available(self, now):
+        return now >= self.cooldown_until
+
+    def record(self, ok, latency=None):
+        self.requests += 1
+        self.success = (1 - HEALTH_ALPHA) * self.success + HEALTH_ALPHA * (1.0 if ok else 0.0)
+        if latency is not None:
+            self.latency = latency if self.latency is None else (1 - HEALTH_ALPHA) * self.latency + HEALTH_ALPHA * latency
+        if ok:
+            self.failures = 0
+            self.strikes = 0
+        else:
+            self.blocked += 1
+            self.failures += 1
+
+    def cool_down(self, now):
+        self.strikes += 1
+        delay = min(SESSION_COOLDOWN * 2 ** (self.strikes - 1), SESSION_MAX_COOLDOWN)
+        # jitter so sessions blocked together don't all come back on the same tick
+        self.cooldown_until = now + delay * random.uniform(0.8, 1.2)
+        self.failures = 0
+        self.rotate()
+        return delay
+
+    def rotate(self):
+        # Fresh session: drops cookies and the connection the block is tied to
+        try:
+            self.session.close()
+        except Exception:
+            pass
+        self.session = self.session_factory(self.profile)
+
+    def to_json(self):
+        return {
+            "profile": repr(self.profile),
+            "score": round(self.score(), 3),
+            "success": round(self.success, 3),
+            "latency": round(self.latency, 3) if self.latency is not None else None,
+            "requests": self.requests,
+            "blocked": self.blocked,
+            "cooldown_left": max(0.0, round(self.cooldown_until - time.time(), 1)),
+        }
+
+
+class SessionPool():
+    """ HTTP sessions with different browser fingerprints; failing ones are rotated and benched for a while """
+    def __init__(self, profiles, session_factory=default_session_factory,
+                 failure_threshold=SESSION_FAILURE_THRESHOLD, timeout=REQUEST_TIMEOUT, breaker=None):
+        if not profiles:
+            raise ValueError("SessionPool needs at least one profile")
+        self.sessions = [PooledSession(p, session_factory) for p in profiles]
+        self.failure_threshold = failure_threshold
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.lock = threading.Lock()
+
+    def acquire(self, avoid=None):
+        """ Best-scored available session, other than `avoid` if another one is available """
+        with self.lock:
+            now = time.time()
+            ready = [s for s in self.sessions if s.available(now)]
+            if avoid is not None and len(ready) > 1:
+                ready = [s for s in ready if s is not avoid]
+            if ready:
+                return max(ready, key=lambda s: s.score())
+            soonest = min(self.sessions, key=lambda s: s.cooldown_until)
+        wait = soonest.cooldown_until - now
+        logger.warning(f"All sessions cooling down, waiting {wait:.1f}s for {soonest.profile}")
+        time.sleep(max(0.0, wait))
+        return soonest
+
+    def report(self, pooled, ok, latency=None):
+        with self.lock:
+            pooled.record(ok, latency)
+            if not ok and pooled.failures >= self.failure_threshold:
+                delay = pooled.cool_down(time.time())
+                logger.warning(f"Session {pooled.profile} blocked, cooling down for ~{delay:.0f}s")
+
+    def get(self, url, pooled=None, **kwargs):
+        pooled = pooled or self.acquire()
+        kwargs.setdefault("timeout", self.timeout)
+        endpoint = endpoint_of(url)
+        start = time.monotonic()
+        try:
+            resp = pooled.session.get(url, **kwargs)
+        except Exception:
+            self.report(pooled, False)
+            HTTP_REQUESTS.inc(endpoint, "error")
+            raise
+        latency = time.monotonic() - start
+        HTTP_REQUESTS.inc(endpoint, resp.status_code)
+        HTTP_LATENCY.observe(endpoint, value=latency)
+
+        # blocks and server errors count against the session, a 404 doesn't
+        failed = resp.status_code in (403, 429) or resp.status_code >= 500 or is_challenge(resp.status_code, resp.text)
+        self.report(pooled, not failed, latency)
+        return resp
+
+    def fetch(self, url, retries=FETCH_RETRIES, backoff=FETCH_BACKOFF, **kwargs):
+        """ get() with retries and backoff through the circuit breaker; an OK response or FetchError """
+        endpoint = endpoint_of(url)
+        kind, status, pooled = ERROR, None, None
+        for attempt in range(retries + 1):
+            if attempt:
+                delay = min(backoff * 2 ** (attempt - 1), FETCH_MAX_BACKOFF) * random.uniform(0.8, 1.2)
+                if kind == RATE_LIMITED:
+                    delay = max(delay, min(retry_after(resp) or 0.0, FETCH_MAX_BACKOFF))
+                logger.info(f"{url}: {kind}, retry {attempt}/{retries} in {delay:.1f}s")
+                time.sleep(delay)
+            self.breaker.before_request()
+            # a retry goes out on another session, or on a fresh one of the same profile
+            failed, pooled = pooled, self.acquire(avoid=pooled)
+            if pooled is failed:
+                with self.lock:
+                    pooled.rotate()
+            try:
+                resp = self.get(url, pooled=pooled, **kwargs)
+            except Exception as e:
+                resp, kind, status = None, ERROR, None
+                logger.warning(f"{url}: {e!r}")
+            else:
+                kind, status = classify(resp), resp.status_code
+            FETCH_RESULTS.inc(endpoint, kind)
+            self.breaker.record(kind)
+            if kind == OK:
+                return resp
+            if kind not in RETRYABLE:
+                break
+        raise FetchError(url, kind, status, attempt + 1)
+
+    def to_json(self):
+        with self.lock:
+            return {"sessions": [s.to_json() for s in self.sessions], "breaker": self.breaker.to_json()}
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_default_pool():
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = SessionPool([SessionProfile.from_config(p) for p in SESSION_PROFILES])
+        return _default_pool
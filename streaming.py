@@ -0,0 +1,308 @@
+""" Single-pass extraction engine: runs an extraction.Schema over html.parser events, without building a DOM """
+import re
+from html.parser import HTMLParser
+
+from extraction import Schema
+
+
+# Same list bs4's html.parser builder treats as void: closed as soon as opened
+VOID_TAGS = frozenset((
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link",
+    "menuitem", "meta", "param", "source", "track", "wbr", "basefont", "bgsound",
+    "command", "frame", "image", "isindex", "nextid", "spacer",
+))
+# Strings inside these are not part of get_text() in bs4
+HIDDEN_TEXT_TAGS = frozenset(("script", "style", "template"))
+
+COMPOUND_RE = re.compile(r"([a-zA-Z][\w-]*)?((?:[.#][\w-]+)*)$")
+
+
+# ------------------ Selectors ------------------ #
+class Compound():
+    """ tag.class.class#id """
+    __slots__ = ("tag", "classes", "id")
+
+    def __init__(self, text):
+        m = COMPOUND_RE.match(text)
+        if not m or not text:
+            raise ValueError(f"Unsupported selector for the streaming engine: {text!r}")
+        self.tag = m.group(1).lower() if m.group(1) else None
+        parts = re.findall(r"[.#][\w-]+", m.group(2))
+        self.classes = frozenset(p[1:] for p in parts if p[0] == ".")
+        ids = [p[1:] for p in parts if p[0] == "#"]
+        self.id = ids[0] if ids else None
+
+    def matches(self, el):
+        if self.tag is not None and el.name != self.tag:
+            return False
+        if self.id is not None and el.attrs.get("id") != self.id:
+            return False
+        return self.classes <= el.class_set
+
+
+class Selector():
+    """ Descendant chain of compounds, matched right to left against the open-element stack """
+    def __init__(self, text):
+        self.steps = [Compound(part) for part in text.split()]
+        if not self.steps:
+            raise ValueError("Empty selector")
+
+    def matches(self, el, ancestors):
+        if not self.steps[-1].matches(el):
+            return False
+        i = len(self.steps) - 2
+        for anc in reversed(ancestors):
+            if i < 0:
+                break
+            if self.steps[i].matches(anc):
+                i -= 1
+        return i < 0
+
+
+# ------------------ Elements ------------------ #
+class StreamElement():
+    """ The slice of a bs4 Tag the converters use, filled in while the element is open """
+    __slots__ = ("name", "attrs", "class_set", "strings", "text_start")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.class_set = frozenset(attrs["class"]) if "class" in attrs else frozenset()
+        self.strings = None
+        self.text_start = None
+
+    def get(self, key, default=None):
+        return self.attrs.get(key, default)
+
+    def get_text(self, separator="", strip=False):
+        if strip:
+            return separator.join(s.strip() for s in self.strings if s.strip())
+        return separator.join(self.strings)
+
+    @property
+    def text(self):
+        return self.get_text()
+
+    @property
+    def stripped_strings(self):
+        for s in self.strings:
+            s = s.strip()
+            if s:
+                yield s
+
+
+# ------------------ Plan ------------------ #
+class FieldPlan():
+    __slots__ = ("name", "field", "selector", "schema")
+
+    def __init__(self, name, field, schema_plan):
+        self.name = name
+        self.field = field
+        self.selector = Selector(field.selector) if field.selector else None
+        self.schema = schema_plan
+
+    @property
+    def needs_text(self):
+        return self.field.schema is None and self.field.attr is None
+
+
+class SchemaPlan():
+    def __init__(self, schema, plans):
+        plans[id(schema)] = self
+        self.schema = schema
+        self.fields = []
+        for name, field in schema.fields.items():
+            nested = None
+            if field.schema is not None:
+                nested = plans.get(id(field.schema)) or SchemaPlan(field.schema, plans)
+            self.fields.append(FieldPlan(name, field, nested))
+        self.selected = [f for f in self.fields if f.selector is not None]
+        self.on_root = [f for f in self.fields if f.selector is None]
+
+
+_plans = {}
+
+
+def plan_for(schema):
+    """ Selectors are parsed once per schema and reused by every extractor """
+    plan = _plans.get(id(schema))
+    if plan is None:
+        plan = SchemaPlan(schema, _plans)
+    return plan
+
+
+# ------------------ Records ------------------ #
+class Slot():
+    """ Value of one field match, resolved when its element (or nested record) closes """
+    __slots__ = ("value",)
+
+    def __init__(self, value=None):
+        self.value = value
+
+
+class Record():
+    """ One schema being filled for one root element """
+    __slots__ = ("plan", "root", "slots", "counts", "parent_slot")
+
+    def __init__(self, plan, root, parent_slot):
+        self.plan = plan
+        self.root = root
+        self.parent_slot = parent_slot
+        self.slots = {}
+        self.counts = {}
+
+    def wants(self, fp):
+        if fp.field.many:
+            return not fp.field.limit or self.counts.get(fp.name, 0) < fp.field.limit
+        return fp.name not in self.slots
+
+    def add(self, fp, slot):
+        if fp.field.many:
+            self.slots.setdefault(fp.name, []).append(slot)
+            self.counts[fp.name] = self.counts.get(fp.name, 0) + 1
+        else:
+            self.slots[fp.name] = slot
+
+    def finish(self):
+        out = {}
+        for fp in self.plan.fields:
+            field = fp.field
+            if field.many:
+                values = (s.value for s in self.slots.get(fp.name, ()))
+                out[fp.name] = [v for v in values if v is not None]
+            elif fp.name in self.slots:
+                out[fp.name] = self.slots[fp.name].value
+            elif field.required:
+                return None
+            else:
+                out[fp.name] = field.default
+        return out
+
+
+# ------------------ Extractor ------------------ #
+class StreamExtractor(HTMLParser):
+    """ Feeds the document once, filling the schema's records as their elements open and close """
+    def __init__(self, schema):
+        super().__init__(convert_charrefs=True)
+        self.plan = plan_for(schema)
+
+    def reset(self):
+        super().reset()
+        self.stack = []          # open StreamElements
+        self.pending = {}        # id(element) -> [(slot, convert)] to run at its end tag
+        self.records = []        # open Records, innermost last
+        self.texts = []          # text nodes seen while some element collects text
+        self.collecting = 0
+        self.data = []
+        self.hidden = 0
+        self.result = None
+
+    def extract(self, html):
+        self.reset()
+        root = StreamElement("[document]", {})
+        self.open_record(self.plan, root, Slot())
+        self.feed(html)
+        self.close()
+        self.flush_text()
+        while self.stack:
+            self.end_element(self.stack.pop())
+        self.end_element(root)
+        return self.result
+
+    # ---- records ----
+    def open_record(self, plan, el, slot):
+        record = Record(plan, el, slot)
+        self.records.append(record)
+        for fp in plan.on_root:
+            self.match_field(record, fp, el)
+        return record
+
+    def match_field(self, record, fp, el):
+        slot = Slot()
+        record.add(fp, slot)
+        field = fp.field
+        if fp.schema is not None:
+            self.open_record(fp.schema, el, slot)
+        elif field.attr is not None:
+            slot.value = el.get(field.attr, field.default)
+        else:
+            if el.text_start is None:
+                el.text_start = len(self.texts)
+                self.collecting += 1
+            self.pending.setdefault(id(el), []).append((slot, field.convert))
+
+    # ---- elements ----
+    def start_element(self, name, attrs):
+        attrs = {k: ("" if v is None else v) for k, v in attrs}
+        if "class" in attrs:
+            attrs["class"] = attrs["class"].split()
+        el = StreamElement(name, attrs)
+        for record in list(self.records):
+            for fp in record.plan.selected:
+                if record.wants(fp) and fp.selector.matches(el, self.stack):
+                    self.match_field(record, fp, el)
+        self.stack.append(el)
+        if name in HIDDEN_TEXT_TAGS:
+            self.hidden += 1
+        return el
+
+    def end_element(self, el):
+        if el.name in HIDDEN_TEXT_TAGS and self.hidden:
+            self.hidden -= 1
+        if el.text_start is not None:
+            el.strings = self.texts[el.text_start:]
+            self.collecting -= 1
+            for slot, convert in self.pending.pop(id(el), ()):
+                slot.value = convert(el)
+            if not self.collecting:
+                self.texts = []
+        while self.records and self.records[-1].root is el:
+            record = self.records.pop()
+            record.parent_slot.value = record.finish()
+            if not self.records:
+                self.result = record.parent_slot.value
+
+    def flush_text(self):
+        if self.data:
+            text = "".join(self.data)
+            self.data = []
+            if self.collecting and not self.hidden:
+                self.texts.append(text)
+
+    # ---- HTMLParser callbacks ----
+    def handle_starttag(self, tag, attrs):
+        self.flush_text()
+        self.start_element(tag, attrs)
+        if tag in VOID_TAGS:
+            self.end_element(self.stack.pop())
+
+    def handle_startendtag(self, tag, attrs):
+        self.flush_text()
+        self.start_element(tag, attrs)
+        self.end_element(self.stack.pop())
+
+    def handle_endtag(self, tag):
+        self.flush_text()
+        # like bs4: close up to the most recent open tag of that name, ignore strays
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i].name == tag:
+                while len(self.stack) > i:
+                    self.end_element(self.stack.pop())
+                return
+
+    def handle_data(self, data):
+        self.data.append(data)
+
+    def handle_comment(self, data):
+        self.flush_text()
+
+    def handle_decl(self, decl):
+        self.flush_text()
+
+    def handle_pi(self, data):
+        self.flush_text()
+
+
+def extract(schema, html):
+    """ Schema.extract() for raw HTML, in one pass """
+    return StreamExtractor(schema).extract(html)
@@ -0,0 +1,92 @@
+import os
+import sys
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def read_polls(path):
+    """ Decoded [(event_name, data)] of every poll in a socket_json log """
+    polls = []
+    with open(path, "r", encoding="utf-8") as fp:
+        for line in fp:
+            if not line.strip():
+                continue
+            polls.append([(name, json.loads(data) if isinstance(data, str) else data)
+                          for name, data in json.loads(line)])
+    return polls
+
+
+@pytest.fixture(scope="session")
+def capture_polls():
+    return read_polls(os.path.join(ROOT, "socket_json_full.log"))
+
+
+# saved match pages: (url, html file)
+MATCH_PAGES = {
+    "past": ("https://www.hltv.org/matches/2388113/furia-vs-g2-starladder-budapest-major-2025", "single_match_past.html"),
+    "live": ("https://www.hltv.org/matches/2388596/ground-zero-vs-rooster-dfrag-open-series-2", "single_match_live.html"),
+    "future": ("https://www.hltv.org/matches/2388121/b8-vs-natus-vincere-starladder-budapest-major-2025", "single_match_future.html"),
+}
+
+
+def match_page(mode):
+    url, filename = MATCH_PAGES[mode]
+    with open(os.path.join(ROOT, filename), "r", encoding="utf-8") as fp:
+        return url, fp.read()
+
+
+# ------------------ Mock HTTP server for the session pool ------------------ #
+CHALLENGE_PAGE = b"<html><head><title>Just a moment...</title></head></html>"
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """ /ok, /missing, /blocked, /challenge and /error, each counted in server.hits;
+    /flaky and /limited fail every other request (502, 429 with Retry-After: 1) """
+    def do_GET(self):
+        hits = self.server.hits[self.path] = self.server.hits.get(self.path, 0) + 1
+        status, body = {
+            "/ok": (200, b"<html>match</html>"),
+            "/missing": (404, b"not found"),
+            "/blocked": (403, b"forbidden"),
+            "/challenge": (200, CHALLENGE_PAGE),
+            "/error": (502, b"bad gateway"),
+            "/flaky": (502, b"bad gateway") if hits % 2 else (200, b"<html>match</html>"),
+            "/limited": (429, b"slow down") if hits % 2 else (200, b"<html>match</html>"),
+        }[self.path]
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", "1")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="session")
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockHandler)
+    server.hits = {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def url(server):
+    server.hits.clear()
+    return lambda path: f"http://127.0.0.1:{server.server_port}{path}"
+
+
+
+def session_pool(n=1, failure_threshold=2, breaker=None):
+    from sessions import SessionPool, SessionProfile
+    return SessionPool([SessionProfile("chrome120") for _ in range(n)], failure_threshold=failure_threshold,
+                       timeout=5, breaker=breaker)
@@ -0,0 +1,80 @@
+import math
+
+import numpy as np
+import pytest
+
+from aggregate import StatsAggregator, parse_stat
+
+
+def row(nickname, kills, deaths, adr, rating="1.00"):
+    return {"nickname": nickname, "kills": kills, "deaths": deaths, "adr": adr,
+            "kast": "70.0%", "rating": rating, "swing": "+1.00%"}
+
+
+def match(match_id, maps):
+    """ maps: {map name: [(team, row)]}; the total line sums kills/deaths over the maps """
+    by_map = {}
+    totals = {}
+    for map_name, rows in maps.items():
+        teams = by_map.setdefault(map_name, {})
+        for team, r in rows:
+            teams.setdefault(team, []).append(r)
+            t = totals.setdefault((team, r["nickname"]), row(r["nickname"], 0, 0, r["adr"]))
+            t["kills"] += r["kills"]
+            t["deaths"] += r["deaths"]
+    total = {}
+    for (team, _), r in totals.items():
+        total.setdefault(team, []).append(r)
+    return {"match_id": match_id, "stats": {"total": total, "maps": by_map}}
+
+
+MATCHES = [
+    match("1", {"de_nuke": [("A", row("x", 20, 10, "80.5")), ("B", row("y", 10, 20, "60.0"))],
+                "de_train": [("A", row("x", 15, 15, "70.0")), ("B", row("y", 15, 15, "-"))]}),
+    match("2", {"de_nuke": [("A", row("x", 25, 5, "100.0")), ("B", row("z", 5, 25, "40.0"))]}),
+]
+
+
+@pytest.fixture
+def stats():
+    aggregator = StatsAggregator(capacity=2)    # forces the buffers to grow
+    assert aggregator.add_matches(MATCHES) == 2
+    return aggregator
+
+
+def test_parse_stat():
+    assert parse_stat("83.3%") == 83.3
+    assert parse_stat("+7.30%") == 7.3
+    assert math.isnan(parse_stat("-"))
+    assert math.isnan(parse_stat(None))
+
+
+def test_matches_load_once(stats):
+    assert stats.add_match(MATCHES[0]) is False
+    assert stats.size == 4 + 6
+
+
+def test_totals(stats):
+    assert stats.sum("kills") == {"x": 60, "y": 25, "z": 5}
+    assert stats.count("kills") == {"x": 2, "y": 1, "z": 1}
+
+
+def test_per_map_reductions(stats):
+    assert stats.sum("kills", by=("player", "map"), maps=None) == {
+        ("x", "de_nuke"): 45, ("x", "de_train"): 15, ("y", "de_nuke"): 10, ("y", "de_train"): 15, ("z", "de_nuke"): 5}
+    assert stats.mean("adr", maps="de_nuke")["x"] == pytest.approx((80.5 + 100.0) / 2)
+    # missing values are left out of means and counts
+    assert math.isnan(stats.mean("adr", maps="de_train")["y"])
+    assert stats.count("adr", maps=None)["y"] == 1
+
+
+def test_percentile_matches_numpy(stats):
+    result = stats.percentile("kills", 30, by="team", maps=None)
+    assert result["A"] == pytest.approx(np.percentile([20, 15, 25], 30))
+    assert result["B"] == pytest.approx(np.percentile([10, 15, 5], 30))
+
+
+def test_kd_ratio(stats):
+    kd = stats.kd_ratio()
+    assert kd[("x", "de_nuke")] == pytest.approx(45 / 15)
+    assert kd[("y", "de_train")] == pytest.approx(1.0)
@@ -0,0 +1,64 @@
+import os
+import json
+
+import pytest
+
+from archive import PageArchive
+
+URL = "https://www.hltv.org/matches/2388113/furia-vs-g2-starladder-budapest-major-2025"
+OTHER_URL = "https://www.hltv.org/matches/2388121/b8-vs-natus-vincere-starladder-budapest-major-2025"
+PLAYER_URL = "https://www.hltv.org/player/7998/s1mple"
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return PageArchive(str(tmp_path / "archive"))
+
+
+def objects(archive):
+    return sorted(name for _, _, files in os.walk(archive.objects_dir) for name in files)
+
+
+def test_put_dedupes_by_sha256(archive):
+    first = archive.put(URL, "<html>v1</html>", fetched_at=1)
+    again = archive.put(URL, b"<html>v1</html>", fetched_at=2)
+    other = archive.put(OTHER_URL, "<html>v1</html>", fetched_at=3)
+    assert first == again == other
+    assert objects(archive) == [first + ".z"]
+    assert len(archive.entries) == 3
+    assert archive.get_text(first) == "<html>v1</html>"
+    assert archive.entries[0]["match_id"] == "2388113"
+
+
+def test_history_latest_and_iter_latest(archive):
+    archive.put(URL, "<html>v1</html>", fetched_at=10)
+    archive.put(URL, "<html>v2</html>", fetched_at=20)
+    archive.put(OTHER_URL, "<html>other</html>", fetched_at=15)
+    archive.put(PLAYER_URL, "<html>player</html>", fetched_at=30)
+
+    assert [e["fetched_at"] for e in archive.history(url=URL)] == [10, 20]
+    assert [e["fetched_at"] for e in archive.history(match_id=2388113, since=15)] == [20]
+    assert [e["url"] for e in archive.history(until=20)] == [URL, OTHER_URL]
+    assert archive.latest(match_id="2388113")["fetched_at"] == 20
+    assert archive.latest_html(url=URL) == "<html>v2</html>"
+    assert archive.latest(match_id="1") is None
+
+    assert dict(archive.iter_latest()) == {URL: "<html>v2</html>", OTHER_URL: "<html>other</html>",
+                                           PLAYER_URL: "<html>player</html>"}
+    assert [url for url, _ in archive.iter_latest(matches_only=True)] == [URL, OTHER_URL]
+
+
+def test_index_recovery(archive):
+    digest = archive.put(URL, "<html>v1</html>", fetched_at=1)
+    archive.put(OTHER_URL, "<html>gone</html>", fetched_at=2)
+    os.remove(archive.object_path(archive.entries[1]["sha256"]))
+    with open(archive.index_path, "a", encoding="utf-8") as fp:
+        fp.write('{"sha256": "' + digest[:10])       # cut short by a crash
+
+    reopened = PageArchive(archive.root)
+    # the entry whose object is missing and the torn line are skipped
+    assert [e["url"] for e in reopened.entries] == [URL]
+    reopened.put(URL, "<html>v2</html>", fetched_at=3)
+    with open(archive.index_path, encoding="utf-8") as fp:
+        assert [json.loads(line)["fetched_at"] for line in fp] == [1, 2, 3]
+    assert PageArchive(archive.root).latest_html(url=URL) == "<html>v2</html>"
@@ -0,0 +1,54 @@
+import os
+import json
+
+from capture import RawCapture
+from socketio_frames import FrameDecoder, LazyFrame
+
+
+def poll_body(frames):
+    return "".join("42" + json.dumps(frame) for frame in frames)
+
+
+def test_lazy_frames_round_trip(tmp_path, capture_polls):
+    capture = RawCapture("m", directory=str(tmp_path))
+    decoder = FrameDecoder(events=())     # nothing subscribed: no payload gets decoded
+    sent = []
+    for i, frames in enumerate(capture_polls[:5]):
+        arrays = [[name, json.dumps(data)] for name, data in frames]
+        lazy, decoded = decoder.decode(poll_body(arrays))
+        assert decoded == []
+        capture.record(lazy, timestamp=i)
+        sent.append((i, arrays))
+    assert list(capture.iter_polls()) == sent
+    assert capture.recent() == sent
+    capture.close()
+    assert list(RawCapture("m", directory=str(tmp_path)).iter_polls()) == sent
+
+
+def test_whitespace_in_raw_payload_stays_on_one_line(tmp_path):
+    capture = RawCapture("m", directory=str(tmp_path))
+    capture.record([LazyFrame("scoreboard", '{\n  "mapName": "de_train"\r\n}')], timestamp=1)
+    capture.close()
+    assert list(capture.iter_polls()) == [(1, [["scoreboard", {"mapName": "de_train"}]])]
+
+
+def test_segments_rotate_and_expire(tmp_path):
+    capture = RawCapture("m", directory=str(tmp_path), ring_size=3, segment_bytes=100,
+                         segment_seconds=3600, retention_seconds=3600, max_segments=2)
+    for i in range(6):
+        capture.record([["log", {"i": i, "pad": "x" * 100}]], timestamp=1000 + i)
+    assert len(capture.segments) == 2
+    assert sorted(os.listdir(tmp_path)) == sorted([s["file"] for s in capture.segments] + ["m.manifest.json"])
+    assert [t for t, _ in capture.recent()] == [1003, 1004, 1005]
+    assert [t for t, _ in capture.iter_polls()] == [1004, 1005]
+    capture.close()
+
+
+def test_crash_cut_segment_is_read_up_to_the_cut(tmp_path):
+    capture = RawCapture("m", directory=str(tmp_path), flush_seconds=0)
+    capture.record([["log", {"i": 0}]], timestamp=1)
+    capture.record([["log", {"i": 1}]], timestamp=2)
+    capture.raw.flush()
+    # no close(): the gzip stream has no trailer, as after a crash
+    reader = RawCapture("m", directory=str(tmp_path))
+    assert [t for t, _ in reader.iter_polls()] == [1, 2]
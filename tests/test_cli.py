@@ -0,0 +1,24 @@
+import types
+
+import cli
+import live_page
+from match import MatchStatus
+
+
+class FakeRefresher():
+    """ One match per refresh(): None (nothing fetched yet), then pages without and with a status """
+    def __init__(self, url, logger):
+        self.matches = [None, types.SimpleNamespace(status=None), types.SimpleNamespace(status=MatchStatus.PAST)]
+        self.match = None
+        self.refreshes = 0
+
+    def refresh(self):
+        self.match = self.matches[min(self.refreshes, len(self.matches) - 1)]
+        self.refreshes += 1
+        return {"refresh": self.refreshes}
+
+
+def test_watch_survives_a_page_without_status(monkeypatch, capsys):
+    monkeypatch.setattr(live_page, "LivePageRefresher", FakeRefresher)
+    cli.main(["watch", "https://www.hltv.org/matches/1/a-vs-b", "--interval", "0", "-q"])
+    assert capsys.readouterr().out.splitlines() == ['{"refresh": 1}', '{"refresh": 2}', '{"refresh": 3}']
@@ -0,0 +1,160 @@
+import json
+import time
+import logging
+import threading
+
+import pytest
+
+import daemon as daemon_module
+from daemon import Daemon, Job
+from match import MatchStatus
+
+URL = "https://www.hltv.org/matches/2388121/b8-vs-natus-vincere-starladder-budapest-major-2025"
+RENAMED_URL = "https://www.hltv.org/matches/2388121/b8-vs-navi-starladder-budapest-major-2025"
+
+
+class FakeMatch():
+    def __init__(self, url, status, start=None):
+        self.url = url
+        self.status = status
+        self.start_timestamp = start
+        self.datetime = None
+
+    def to_json(self):
+        return {"url": self.url, "match_status": self.status.name}
+
+
+class FakeSite():
+    """ Statuses the match page shows, one per fetch (the last one sticks) """
+    def __init__(self, statuses, start=None):
+        self.statuses = list(statuses)
+        self.start = start
+        self.fetches = 0
+
+    def next_match(self, url):
+        self.fetches += 1
+        status = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        return FakeMatch(url, status, self.start)
+
+
+class FakeLiveMatch():
+    """ Polls until stopped; a stuck one ignores stop() """
+    instances = []
+
+    def __init__(self, url, stuck=False):
+        self.url = url
+        self.match_id = url.split("/")[4]
+        self.stopped = threading.Event()
+        self.released = threading.Event()
+        self.stuck = stuck
+        self.instances.append(self)
+
+    def run(self):
+        (self.released if self.stuck else self.stopped).wait()
+
+    def stop(self):
+        self.stopped.set()
+
+
+@pytest.fixture
+def site(monkeypatch):
+    site = FakeSite([MatchStatus.FUTURE, MatchStatus.LIVE, MatchStatus.LIVE, MatchStatus.PAST])
+
+    class FakeFactory():
+        def __init__(self, url, html, logger):
+            self.url = url
+
+        def get_match(self):
+            return site.next_match(self.url)
+
+    class FakeRefresher():
+        def __init__(self, url, logger):
+            self.url = url
+            self.match = None
+
+        def refresh(self):
+            self.match = site.next_match(self.url)
+            return None
+
+    FakeLiveMatch.instances = []
+    monkeypatch.setattr(daemon_module, "MatchFactory", FakeFactory)
+    monkeypatch.setattr(daemon_module, "LivePageRefresher", FakeRefresher)
+    monkeypatch.setattr(daemon_module, "LiveMatch", FakeLiveMatch)
+    monkeypatch.setattr(daemon_module, "get_match_list_day", lambda days_ahead: [URL] if days_ahead == 0 else [])
+    monkeypatch.setattr(daemon_module, "get_event_matches", lambda event_id: [
+        {"url": RENAMED_URL, "status": MatchStatus.FUTURE, "start": time.time() + 3600}])
+    return site
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    return Daemon(str(tmp_path / "matches.jsonl"), str(tmp_path / "diffs.jsonl"), events=[7902])
+
+
+def scrape_jobs(daemon):
+    return sorted((at, job.url) for at, _, job in daemon.queue if job.kind == Job.SCRAPE)
+
+
+def run_next_scrape(daemon):
+    """ Runs the earliest scrape job now, whatever time it is due """
+    entry = min((e for e in daemon.queue if e[2].kind == Job.SCRAPE), key=lambda e: (e[0], e[1]))
+    daemon.queue.remove(entry)
+    daemon.scrape(entry[2].url)
+
+
+def test_discovery_dedupes_by_match_id(site, daemon):
+    daemon.discover()
+    assert list(daemon.known) == ["2388121"]
+    assert [url for _, url in scrape_jobs(daemon)] == [URL]
+    daemon.discover()
+    assert len(scrape_jobs(daemon)) == 1
+
+
+def test_future_live_past(site, daemon):
+    site.start = time.time() + 3600
+    daemon.discover()
+
+    run_next_scrape(daemon)                     # FUTURE: next look shortly before the start
+    assert daemon.known["2388121"] == MatchStatus.FUTURE
+    [(at, _)] = scrape_jobs(daemon)
+    assert at == pytest.approx(site.start - daemon_module.DAEMON_PREMATCH_LEAD)
+    assert daemon.trackers == {}
+
+    run_next_scrape(daemon)                     # LIVE: tracker and page refresher start
+    assert daemon.known["2388121"] == MatchStatus.LIVE
+    lm, thread = daemon.trackers["2388121"]
+    assert thread.is_alive()
+    assert "2388121" in daemon.refreshers
+    [(at, _)] = scrape_jobs(daemon)
+    assert at == pytest.approx(time.time() + daemon_module.DAEMON_LIVE_CHECK, abs=5)
+
+    # the event listing links the same match under its new slug: still one tracker
+    daemon.attach_tracker(RENAMED_URL)
+    assert len(FakeLiveMatch.instances) == 1
+
+    run_next_scrape(daemon)                     # still LIVE, through the refresher
+    assert daemon.trackers["2388121"] == (lm, thread)
+    assert site.fetches == 3
+
+    run_next_scrape(daemon)                     # PAST: tracker stopped, match saved, nothing scheduled
+    assert not thread.is_alive()
+    assert lm.stopped.is_set()
+    assert daemon.trackers == {} and daemon.refreshers == {}
+    assert scrape_jobs(daemon) == []
+    with open(daemon.output_path, encoding="utf-8") as fp:
+        assert [json.loads(line)["match_status"] for line in fp] == ["PAST"]
+
+
+def test_shutdown_does_not_hang_on_a_stuck_tracker(site, daemon, monkeypatch, caplog):
+    monkeypatch.setattr(daemon_module, "DAEMON_TRACKER_JOIN_TIMEOUT", 0.2)
+    stuck = FakeLiveMatch(URL, stuck=True)
+    thread = threading.Thread(target=stuck.run, daemon=True)
+    thread.start()
+    daemon.trackers["2388121"] = (stuck, thread)
+    start = time.monotonic()
+    with caplog.at_level(logging.WARNING, logger="daemon"):
+        daemon.shutdown()
+    assert time.monotonic() - start < 2
+    assert daemon.trackers == {}
+    assert "still running" in caplog.text
+    stuck.released.set()
@@ -0,0 +1,137 @@
+import json
+import time
+import socket
+import threading
+
+import pytest
+
+from event_bus import EventBus, UnixSocketFanout, DROP_OLDEST, DROP_NEWEST, KEEP_LATEST
+
+
+def drain(subscription):
+    items = []
+    while subscription.pending():
+        items.append(subscription.get(timeout=0))
+    return items
+
+
+def test_overflow_policies():
+    bus = EventBus()
+    oldest = bus.subscribe(maxsize=2, policy=DROP_OLDEST)
+    newest = bus.subscribe(maxsize=2, policy=DROP_NEWEST)
+    latest = bus.subscribe(policy=KEEP_LATEST)
+    for i in range(3):
+        bus.publish("scoreboard", i)
+    bus.publish("log", "x")
+    assert drain(oldest) == [("scoreboard", 2), ("log", "x")]
+    assert drain(newest) == [("scoreboard", 0), ("scoreboard", 1)]
+    assert drain(latest) == [("scoreboard", 2), ("log", "x")]
+    assert (oldest.dropped, newest.dropped, latest.dropped) == (2, 2, 2)
+
+
+def test_event_filter():
+    bus = EventBus()
+    scores = bus.subscribe(events=("scoreboard",))
+    bus.publish("log", {})
+    bus.publish("scoreboard", {})
+    assert drain(scores) == [("scoreboard", {})]
+
+
+def test_slow_callback_does_not_block_publish():
+    bus = EventBus()
+    release = threading.Event()
+    seen = []
+
+    def slow(event_name, data):
+        release.wait(5)
+        seen.append(data)
+
+    bus.subscribe(slow, maxsize=10)
+    start = time.monotonic()
+    for i in range(100):
+        bus.publish("log", i)
+    assert time.monotonic() - start < 1
+    release.set()
+    bus.close()
+    # the newest 10 (plus whichever event the callback was busy with)
+    assert seen[-10:] == list(range(90, 100))
+    assert len(seen) <= 11
+
+
+def test_callback_errors_are_counted():
+    bus = EventBus()
+
+    def broken(event_name, data):
+        raise ValueError(data)
+
+    subscription = bus.subscribe(broken)
+    bus.publish("log", 1)
+    bus.close()
+    assert subscription.errors == 1
+
+
+def test_unix_socket_fanout(tmp_path):
+    bus = EventBus()
+    path = str(tmp_path / "live.sock")
+    fanout = UnixSocketFanout(bus, path)
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.connect(path)
+    try:
+        deadline = time.monotonic() + 5
+        while not fanout.clients and time.monotonic() < deadline:
+            time.sleep(0.01)
+        bus.publish("scoreboard", {"mapName": "de_train"})
+        client.settimeout(5)
+        line = client.makefile("r", encoding="utf-8").readline()
+        assert json.loads(line) == ["scoreboard", {"mapName": "de_train"}]
+    finally:
+        client.close()
+        fanout.close()
+    assert bus.subscriptions == []
+
+
+def test_close_waits_for_the_drain():
+    bus = EventBus()
+    seen = []
+    subscription = bus.subscribe(lambda name, data: (time.sleep(0.01), seen.append(data)), maxsize=100)
+    for i in range(50):
+        bus.publish("log", i)
+    bus.close()
+    assert seen == list(range(50))
+    assert not subscription.thread.is_alive()
+
+
+def test_close_with_timeout_fails_loudly_when_stuck():
+    bus = EventBus()
+    release = threading.Event()
+    subscription = bus.subscribe(lambda name, data: release.wait(5))
+    bus.publish("log", 1)
+    bus.publish("log", 2)
+    with pytest.raises(TimeoutError):
+        subscription.close(timeout=0.1)
+    release.set()
+    subscription.close()
+
+
+def test_fanout_clients_dropping_together(tmp_path):
+    bus = EventBus()
+    path = str(tmp_path / "live.sock")
+    fanout = UnixSocketFanout(bus, path, send_timeout=1)
+    clients = []
+    for _ in range(8):
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(path)
+        clients.append(client)
+    deadline = time.monotonic() + 5
+    while len(fanout.clients) < 8 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    for client in clients:
+        client.close()
+    # every send thread hits the closed socket and drops its client at about the same time
+    deadline = time.monotonic() + 5
+    while fanout.clients and time.monotonic() < deadline:
+        bus.publish("scoreboard", {"pad": "x" * 65536})
+        time.sleep(0.01)
+    assert fanout.clients == []
+    fanout.close()
+    assert bus.subscriptions == []
@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+import main
+from conftest import ROOT
+from main import get_event_matches, match_key
+from match import MatchStatus
+
+FIXTURES = os.path.join(ROOT, "tests", "fixtures")
+PAGES = {
+    "https://www.hltv.org/results?event=7902": "event_7902_results.html",
+    "https://www.hltv.org/results?event=7902&offset=100": "event_7902_results_offset_100.html",
+    "https://www.hltv.org/matches?event=7902": "event_7902_matches.html",
+}
+
+
+class FakeResponse():
+    def __init__(self, text):
+        self.text = text
+        self.status_code = 200
+
+
+class FakePool():
+    """ Saved event listings by URL """
+    def __init__(self):
+        self.urls = []
+
+    def fetch(self, url):
+        self.urls.append(url)
+        with open(os.path.join(FIXTURES, PAGES[url]), "r", encoding="utf-8") as fp:
+            return FakeResponse(fp.read())
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(main, "DELAY_BETWEEN_REQUESTS", 0)
+    return FakePool()
+
+
+def test_match_key():
+    assert match_key("https://www.hltv.org/matches/2388121/b8-vs-navi") == "2388121"
+    assert match_key("https://www.hltv.org/matches/2388121/b8-vs-natus-vincere") == "2388121"
+    assert match_key("not-a-match") == "not-a-match"
+
+
+def test_event_matches(pool):
+    matches = get_event_matches(7902, pool=pool)
+    # both results pages, then the listing of upcoming and live matches
+    assert pool.urls == list(PAGES)
+    by_id = {match_key(m["url"]): m for m in matches}
+    assert list(by_id) == ["2388113", "2388110", "2388100", "2388596", "2388121"]
+    assert len(matches) == len(by_id)
+
+    assert {key: m["status"] for key, m in by_id.items()} == {
+        "2388113": MatchStatus.PAST,      # also listed, the result wins
+        "2388110": MatchStatus.PAST,
+        "2388100": MatchStatus.PAST,
+        "2388596": MatchStatus.LIVE,
+        "2388121": MatchStatus.FUTURE,
+    }
+    assert by_id["2388121"]["url"].endswith("/b8-vs-natus-vincere-starladder-budapest-major-2025")
+    assert by_id["2388113"]["start"] == 1765120800
+    assert by_id["2388596"]["start"] is None
+    assert by_id["2388121"]["start"] == 1765296000
@@ -0,0 +1,68 @@
+import pytest
+
+from event_store import EventStore, MAP_END
+
+# (map, final ct score, final t score, rounds) of the maps in socket_json_full.log
+CAPTURE_MAPS = [("de_nuke", 13, 7, 20), ("de_mirage", 13, 11, 24), ("de_ancient", 13, 7, 20), ("de_train", 3, 2, 5)]
+
+
+def fill(store, polls):
+    for timestamp, frames in enumerate(polls):
+        for name, data in frames:
+            store.append(name, data, timestamp)
+    return store
+
+
+@pytest.fixture
+def store(tmp_path, capture_polls):
+    store = fill(EventStore("match", directory=str(tmp_path), snapshot_every=50), capture_polls)
+    yield store
+    store.close()
+
+
+def test_backlog_replays_are_not_stored(store, capture_polls):
+    assert store.maps() == ["de_mirage"] + [m for m, _, _, _ in CAPTURE_MAPS]
+    kills = sum(1 for _, _, kind, _ in store.iter_events() if kind == "Kill")
+    assert kills == 1352
+    assert store.keys == sorted(store.keys)
+    assert len(set(store.keys)) == len(store.keys)
+
+
+def test_state_at_end_of_each_map(store):
+    for ordinal, (map_name, ct, t, rounds) in enumerate(CAPTURE_MAPS, start=2):
+        state = store.state_at(ordinal)
+        assert (state.map_name, state.ct_score, state.t_score, len(state.rounds)) == (map_name, ct, t, rounds)
+    assert [e[3] for e in store.index if e[0] == 1][-1] == MAP_END
+
+
+def test_state_at_every_round(store):
+    for ordinal, (map_name, _, _, rounds) in enumerate(CAPTURE_MAPS, start=2):
+        final = store.state_at(ordinal)
+        for n in range(1, rounds + 1):
+            # de_mirage is played twice: by name it's the first one
+            state = store.state_at(ordinal if map_name == "de_mirage" else map_name, n)
+            assert len(state.rounds) == n
+            assert (state.ct_score, state.t_score) == (final.rounds[n - 1]["ct_score"], final.rounds[n - 1]["t_score"])
+    # finished map: a round that was never played
+    assert store.state_at(2, 21) is None
+    # map in play: the round being played gives the latest state
+    assert len(store.state_at("de_train", 6).rounds) == 5
+
+
+def test_state_at_latest_matches_live_state(store):
+    # de_train is still in play: a periodic snapshot plus the events after it
+    state = store.state_at("de_train")
+    assert state.dump() == store.state.dump()
+
+
+def test_recover_resumes_after_restart(tmp_path, capture_polls):
+    half = len(capture_polls) // 2
+    store = fill(EventStore("match", directory=str(tmp_path)), capture_polls[:half])
+    store.close()
+    store = fill(EventStore("match", directory=str(tmp_path)), capture_polls[half:])
+    try:
+        assert sum(1 for _, _, kind, _ in store.iter_events() if kind == "Kill") == 1352
+        state = store.state_at("de_train")
+        assert (state.ct_score, state.t_score) == (3, 2)
+    finally:
+        store.close()
@@ -0,0 +1,66 @@
+import logging
+
+import pytest
+
+from conftest import match_page
+from export import ParquetExporter, SCHEMAS, parse_number, parse_veto
+from match import MatchFactory
+
+
+def parsed(mode):
+    url, html = match_page(mode)
+    return MatchFactory(url, html, logging.getLogger(__name__)).get_match().to_json()
+
+
+@pytest.fixture(scope="module")
+def past_match():
+    return parsed("past")
+
+
+def test_parse_number():
+    assert parse_number("83.3%") == 83.3
+    assert parse_number("+7.30%") == 7.3
+    assert parse_number("13", int) == 13
+    assert parse_number("-") is None
+    assert parse_number(None) is None
+
+
+def test_parse_veto():
+    assert parse_veto(["1. G2 removed Nuke", "7. Dust2 was left over"]) == [
+        (1, "G2", "removed", "Nuke"), (7, None, "left over", "Dust2")]
+
+
+def test_read_before_any_export_is_empty(tmp_path):
+    exporter = ParquetExporter(str(tmp_path))
+    table = exporter.read("maps")
+    assert table.num_rows == 0
+    assert table.schema.names == SCHEMAS["maps"].names + ["date"]
+    assert exporter.read("veto", columns=["match_id", "map_name"]).column_names == ["match_id", "map_name"]
+
+
+def test_append_is_incremental(tmp_path, past_match):
+    exporter = ParquetExporter(str(tmp_path))
+    assert exporter.append([past_match, past_match]) == 1
+    assert ParquetExporter(str(tmp_path)).append([past_match]) == 0
+    matches = exporter.read("matches")
+    assert matches.num_rows == 1
+    assert matches.column("match_id").to_pylist() == [int(past_match["match_id"])]
+    assert exporter.read("maps").num_rows == len(past_match["maps_info"])
+
+
+def test_unfinished_matches_are_skipped(tmp_path, past_match):
+    live = dict(past_match, match_id="1", match_status="LIVE")
+    assert ParquetExporter(str(tmp_path)).append([live]) == 0
+
+
+def test_lineups_carry_player_ids(tmp_path):
+    # the saved finished match has no lineups, the live one does
+    live = parsed("live")
+    assert ParquetExporter(str(tmp_path)).append([live], finished_only=False) == 1
+    lineups = ParquetExporter(str(tmp_path)).read("lineups").to_pylist()
+    expected = [(side, slot, int(p["player_id"]), p["nickname"])
+                for side in ("a", "b") for slot, p in enumerate(live[f"team_{side}_players"])]
+    assert len(expected) == 10
+    assert [(r["side"], r["slot"], r["player_id"], r["nickname"]) for r in lineups] == expected
+    assert {r["team"] for r in lineups} == {live["team_a_name"], live["team_b_name"]}
+    assert all(r["match_id"] == int(live["match_id"]) for r in lineups)
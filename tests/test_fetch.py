@@ -0,0 +1,92 @@
+import time
+
+import pytest
+
+from conftest import session_pool as pool
+from sessions import (CircuitBreaker, FetchError, classify, retry_after, OK, CHALLENGE, RATE_LIMITED,
+                      NOT_FOUND, ERROR)
+
+
+class FakeResponse():
+    def __init__(self, status_code, text="", headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+
+@pytest.mark.parametrize("status, text, kind", [
+    (200, "<html>match</html>", OK),
+    (304, "", OK),
+    (200, "<html><head><title>Just a moment...</title></head>", CHALLENGE),
+    (503, "<script>window._cf_chl_opt = {}</script>", CHALLENGE),
+    (403, "forbidden", CHALLENGE),
+    (429, "slow down", RATE_LIMITED),
+    (404, "not found", NOT_FOUND),
+    (410, "gone", NOT_FOUND),
+    (500, "server error", ERROR),
+    (400, "bad request", ERROR),
+])
+def test_classify(status, text, kind):
+    assert classify(FakeResponse(status, text)) == kind
+
+
+def test_retry_after():
+    assert retry_after(FakeResponse(429, headers={"Retry-After": "7"})) == 7.0
+    assert retry_after(FakeResponse(429, headers={"Retry-After": "Wed, 21 Oct 2026 07:28:00 GMT"})) is None
+    assert retry_after(FakeResponse(429)) is None
+    assert retry_after(None) is None
+
+
+def test_fetch_waits_for_retry_after(url, server):
+    start = time.monotonic()
+    resp = pool(failure_threshold=100).fetch(url("/limited"), retries=1, backoff=0)
+    assert resp.status_code == 200
+    assert time.monotonic() - start >= 1      # backoff 0, but the server asked for 1s
+    assert server.hits == {"/limited": 2}
+
+
+def test_fetch_does_not_retry_not_found(url, server):
+    with pytest.raises(FetchError) as e:
+        pool().fetch(url("/missing"), retries=3, backoff=0)
+    assert e.value.kind == NOT_FOUND
+    assert server.hits == {"/missing": 1}
+
+
+def test_retry_goes_out_on_another_session(url):
+    p = pool(n=2, failure_threshold=100)
+    assert p.fetch(url("/flaky"), retries=1, backoff=0).status_code == 200
+    assert [s.requests for s in p.sessions] == [1, 1]
+
+
+def test_retry_on_a_single_session_gets_a_fresh_one(url):
+    p = pool(n=1, failure_threshold=100)
+    first = p.sessions[0].session
+    assert p.fetch(url("/flaky"), retries=1, backoff=0).status_code == 200
+    assert p.sessions[0].session is not first
+
+
+def test_breaker_opens_on_challenges_and_closes_after_trial(url, server):
+    breaker = CircuitBreaker(window=60, threshold=2, cooldown=0.3, max_cooldown=5)
+    p = pool(n=1, failure_threshold=100, breaker=breaker)
+    with pytest.raises(FetchError) as e:
+        p.fetch(url("/challenge"), retries=1, backoff=0)
+    assert e.value.kind == CHALLENGE and e.value.attempts == 2
+    assert breaker.state == CircuitBreaker.OPEN
+
+    start = time.monotonic()
+    assert p.fetch(url("/ok"), retries=0).status_code == 200
+    assert time.monotonic() - start >= 0.25
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert server.hits == {"/challenge": 2, "/ok": 1}
+
+
+def test_breaker_trial_challenged_reopens_longer(url):
+    breaker = CircuitBreaker(window=60, threshold=1, cooldown=0.2, max_cooldown=5)
+    p = pool(n=1, failure_threshold=100, breaker=breaker)
+    with pytest.raises(FetchError):
+        p.fetch(url("/challenge"), retries=0)
+    with pytest.raises(FetchError):
+        p.fetch(url("/challenge"), retries=0)      # the half-open trial
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.trips == 2
+    assert breaker.open_until - time.time() > 0.3
@@ -0,0 +1,78 @@
+import os
+import gzip
+import time
+
+import pytest
+
+from group_commit import GroupCommitWriter, flush_all
+
+
+def read(path):
+    with open(path, "rb") as fp:
+        return fp.read()
+
+
+def test_writes_are_batched_by_size(tmp_path):
+    path = str(tmp_path / "log.jsonl")
+    writer = GroupCommitWriter(path, max_bytes=10, max_delay=60)
+    writer.write("abcd")
+    writer.write(b"efgh")
+    assert read(path) == b""
+    assert writer.tell() == 8
+    writer.write("ij")
+    assert read(path) == b"abcdefghij"
+    assert (writer.writes, writer.commits) == (3, 1)
+    writer.close()
+
+
+def test_background_commit_after_max_delay(tmp_path):
+    path = str(tmp_path / "log.jsonl")
+    writer = GroupCommitWriter(path, max_bytes=1 << 20, max_delay=0.05)
+    writer.write("line\n")
+    deadline = time.monotonic() + 5
+    while read(path) == b"" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert read(path) == b"line\n"
+    writer.close()
+
+
+def test_appends_to_existing_file(tmp_path):
+    path = str(tmp_path / "log.jsonl")
+    with open(path, "wb") as fp:
+        fp.write(b"old\n")
+    with GroupCommitWriter(path) as writer:
+        assert writer.tell() == 4
+        writer.write("new\n")
+    assert read(path) == b"old\nnew\n"
+
+
+def test_flush_all_and_close(tmp_path):
+    path = str(tmp_path / "log.jsonl")
+    writer = GroupCommitWriter(path, max_bytes=1 << 20, max_delay=60, fsync="commit")
+    writer.write("a")
+    flush_all()
+    assert read(path) == b"a"
+    assert writer.syncs == 1
+    writer.close()
+    writer.close()
+    with pytest.raises(ValueError):
+        writer.write("b")
+
+
+def test_drives_a_gzip_stream(tmp_path):
+    path = str(tmp_path / "seg.jsonl.gz")
+    raw = GroupCommitWriter(path, max_delay=60)
+    fp = gzip.GzipFile(filename="seg.jsonl", mode="wb", fileobj=raw)
+    for i in range(100):
+        fp.write(f"{i}\n".encode())
+    fp.close()
+    raw.close()
+    assert raw.commits <= 2
+    with gzip.open(path, "rt") as fp:
+        assert fp.read().split() == [str(i) for i in range(100)]
+
+
+def test_unknown_fsync_policy(tmp_path):
+    with pytest.raises(ValueError):
+        GroupCommitWriter(str(tmp_path / "x"), fsync="always")
+    assert not os.path.exists(tmp_path / "x")
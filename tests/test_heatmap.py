@@ -0,0 +1,85 @@
+import os
+import json
+
+import pytest
+
+from conftest import ROOT
+from capture import RawCapture
+from heatmap import KillHeatmaps
+from live_state import log_entries
+
+
+def test_replayed_kills_counted_once(capture_polls):
+    heatmaps = KillHeatmaps()
+    for frames in capture_polls:
+        for name, data in frames:
+            heatmaps.apply(name, data)
+    unique = {payload["eventId"] for frames in capture_polls for name, data in frames if name == "log"
+              for kind, payload in log_entries(data) if kind == "Kill"}
+    assert heatmaps.kills == len(unique)
+    assert heatmaps.map_name == "de_train"
+
+
+def test_add_kill_ignores_seen_event_id():
+    heatmaps = KillHeatmaps()
+    kill = {"eventId": 1, "weapon": "ak47", "killerSide": "CT", "killerX": 0, "killerY": 0}
+    assert heatmaps.add_kill(kill, "de_train")
+    assert not heatmaps.add_kill(kill, "de_train")
+    assert heatmaps.kills == 1
+    assert heatmaps.total("de_train").sum() == 1
+
+
+def kill(event_id, x=0, y=0, side="CT", weapon="ak47", **extra):
+    return dict(eventId=event_id, weapon=weapon, killerSide=side, killerX=x, killerY=y,
+                victimSide="TERRORIST", victimX=x + 100, victimY=y, **extra)
+
+
+def test_save_load_round_trip(tmp_path):
+    heatmaps = KillHeatmaps(resolution=64)
+    heatmaps.add_kill(kill(1, headShot=True), "de_train")
+    heatmaps.add_kill(kill(2, weapon="awp", side="TERRORIST"), "de_nuke")
+    path = str(tmp_path / "heatmaps.npz")
+    heatmaps.save(path)
+    loaded = KillHeatmaps.load(path)
+    assert (loaded.resolution, loaded.flags, loaded.kills) == (64, ("headShot",), 2)
+    assert sorted(loaded.grids) == sorted(heatmaps.grids)
+    for key, grid in heatmaps.grids.items():
+        assert (loaded.grids[key] == grid).all()
+    assert loaded.total("de_train", layer="killer_headShot").sum() == 1
+    assert os.listdir(tmp_path) == ["heatmaps.npz"]
+
+
+def test_merge_and_merge_files(tmp_path):
+    a, b = KillHeatmaps(), KillHeatmaps()
+    a.add_kill(kill(1), "de_train")
+    b.add_kill(kill(1), "de_train")
+    b.add_kill(kill(2, weapon="awp"), "de_train")
+    paths = [str(tmp_path / "a.npz"), str(tmp_path / "b.npz")]
+    a.save(paths[0])
+    b.save(paths[1])
+
+    merged = KillHeatmaps.merge_files(paths)
+    assert merged.kills == 3
+    assert merged.total("de_train").sum() == 3
+    assert merged.total("de_train", wclass="rifle").max() == 2
+    # merging into a copy leaves the source grids alone
+    assert b.total("de_train", wclass="rifle").sum() == 1
+    with pytest.raises(ValueError):
+        a.merge(KillHeatmaps(resolution=32))
+
+
+def test_from_capture(tmp_path, capture_polls):
+    unique = {payload["eventId"] for frames in capture_polls for name, data in frames if name == "log"
+              for kind, payload in log_entries(data) if kind == "Kill"}
+    from_log = KillHeatmaps.from_capture(os.path.join(ROOT, "socket_json_full.log"))
+    assert from_log.kills == len(unique)
+
+    capture = RawCapture("m", directory=str(tmp_path))
+    for i, frames in enumerate(capture_polls):
+        capture.record([[name, json.dumps(data)] for name, data in frames], timestamp=i)
+    capture.close()
+    segment = os.path.join(str(tmp_path), capture.segments[0]["file"])
+    from_raw = KillHeatmaps.from_capture(segment)
+    assert from_raw.kills == len(unique)
+    for key, grid in from_log.grids.items():
+        assert (from_raw.grids[key] == grid).all()
@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import threading
+
+from daemon import Daemon
+from live_match import LiveMatch
+
+URL = "https://www.hltv.org/matches/2388856/mouz-nxt-vs-algo-urban-riga-open-season-2"
+
+
+class FakeResponse():
+    def __init__(self, text, status_code=200):
+        self.text = text
+        self.status_code = status_code
+
+
+class FakeScraper():
+    """ Serves the given polls, then empty ones """
+    def __init__(self, polls=()):
+        self.polls = list(polls)
+
+    def get(self, url):
+        return FakeResponse(self.polls.pop(0) if self.polls else "")
+
+
+def payload(frames):
+    return "".join(f"42{json.dumps([name, json.dumps(data)])}" for name, data in frames)
+
+
+def tracker(tmp_path, polls=(), **kwargs):
+    kwargs.setdefault("log_path", str(tmp_path / "match-{match_id}.json"))
+    kwargs.setdefault("heatmap_path", str(tmp_path / "match-{match_id}-heatmaps.npz"))
+    lm = LiveMatch(URL, echo=False, **kwargs)
+    lm.sid = "sid"
+    lm.scraper = FakeScraper(polls)
+    return lm
+
+
+def test_stop_wakes_the_poll_wait(tmp_path):
+    scoreboard = {"mapName": "de_train", "currentRound": 1, "counterTerroristScore": 0, "terroristScore": 0}
+    lm = tracker(tmp_path, [payload([("scoreboard", scoreboard)])])
+    thread = threading.Thread(target=lm.listen_loop)
+    thread.start()
+    time.sleep(0.2)
+    start = time.monotonic()
+    lm.stop()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert time.monotonic() - start < 5
+    # closed by the loop itself: the score log is complete on disk
+    with open(tmp_path / "match-2388856.json", encoding="utf-8") as fp:
+        assert json.loads(fp.readline())["mapName"] == "de_train"
+
+
+def test_detach_tracker_waits_for_the_loop(tmp_path):
+    daemon = Daemon(str(tmp_path / "matches.jsonl"), str(tmp_path / "diffs.jsonl"))
+    lm = tracker(tmp_path)
+    thread = threading.Thread(target=lm.listen_loop)
+    thread.start()
+    daemon.trackers["2388856"] = (lm, thread)
+    daemon.shutdown()
+    assert not thread.is_alive()
+    assert daemon.trackers == {}
+
+
+def test_close_leaves_a_shared_bus_open(tmp_path):
+    from event_bus import EventBus
+    bus = EventBus()
+    other = bus.subscribe(events=("scoreboard",))
+    lm = tracker(tmp_path, bus=bus)
+    assert len(bus.subscriptions) == 2
+    lm.close()
+    assert bus.subscriptions == [other]
+    bus.publish("scoreboard", {})
+    assert other.pending() == 1
+
+
+def test_close_closes_its_own_bus(tmp_path):
+    lm = tracker(tmp_path)
+    subscription = lm.bus.subscribe()
+    lm.close()
+    assert lm.bus.subscriptions == []
+    assert subscription.closed
+
+
+def kill_polls(capture_polls):
+    """ The first log frame of the capture with kills, as a poll, and how many distinct kills it has """
+    from live_state import log_entries
+    for frames in capture_polls:
+        for name, data in frames:
+            if name != "log":
+                continue
+            kills = {p["eventId"] for kind, p in log_entries(data) if kind == "Kill"}
+            if kills:
+                return [payload([(name, data)])], len(kills)
+
+
+def test_heatmaps_saved_on_close(tmp_path, capture_polls):
+    from heatmap import KillHeatmaps
+    polls, kills = kill_polls(capture_polls)
+    lm = tracker(tmp_path, polls)
+    thread = threading.Thread(target=lm.listen_loop)
+    thread.start()
+    time.sleep(0.2)
+    lm.stop()
+    thread.join(timeout=5)
+    saved = KillHeatmaps.load(str(tmp_path / "match-2388856-heatmaps.npz"))
+    assert saved.kills == lm.heatmaps.kills == kills
+    assert sorted(saved.grids) == sorted(lm.heatmaps.grids)
+
+
+def test_heatmaps_saved_periodically(tmp_path, capture_polls, monkeypatch):
+    import live_match
+    from heatmap import KillHeatmaps
+    monkeypatch.setattr(live_match, "LIVE_HEATMAP_SAVE_INTERVAL", 0)
+    monkeypatch.setattr(live_match, "LIVE_POLL_INTERVAL", 0.05)
+    polls, kills = kill_polls(capture_polls)
+    lm = tracker(tmp_path, polls)
+    thread = threading.Thread(target=lm.listen_loop)
+    thread.start()
+    path = tmp_path / "match-2388856-heatmaps.npz"
+    deadline = time.monotonic() + 5
+    while not path.exists() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert thread.is_alive()      # written while the loop still runs
+    assert KillHeatmaps.load(str(path)).kills == kills
+    lm.stop()
+    thread.join(timeout=5)
+
+
+def test_no_heatmap_file_without_kills(tmp_path):
+    lm = tracker(tmp_path)
+    lm.close()
+    assert not os.path.exists(tmp_path / "match-2388856-heatmaps.npz")
+
+
+def test_close_waits_for_the_score_log(tmp_path, monkeypatch):
+    lm = tracker(tmp_path)
+    write = lm.log_writer.log_file.write
+
+    def slow_write(line):
+        time.sleep(0.005)
+        write(line)
+
+    monkeypatch.setattr(lm.log_writer.log_file, "write", slow_write)
+    for i in range(100):
+        lm.bus.publish("scoreboard", {"mapName": "de_train", "currentRound": i})
+    lm.close()
+    with open(tmp_path / "match-2388856.json", encoding="utf-8") as fp:
+        assert [json.loads(line)["currentRound"] for line in fp] == list(range(100))
@@ -0,0 +1,107 @@
+import copy
+import logging
+
+import pytest
+
+import live_page
+from conftest import MATCH_PAGES, match_page
+from live_page import LivePageRefresher, split_regions, merge_regions, diff_match
+from match import Match
+from match_schema import MATCH_PAGE
+from streaming import extract
+
+
+def match_json(url, html):
+    return Match(url, None, logging.getLogger(__name__), page=extract(MATCH_PAGE, html)).to_json()
+
+
+@pytest.mark.parametrize("mode", sorted(MATCH_PAGES))
+def test_regions_cover_the_page(mode):
+    _, html = match_page(mode)
+    regions = split_regions(html)
+    assert regions[0][:2] == ("head", 0)
+    assert regions[-1][2] == len(html)
+    for (_, _, end), (_, start, _) in zip(regions, regions[1:]):
+        assert end == start
+    names = [name for name, _, _ in regions]
+    assert {"teams", "maps", "lineups"} <= set(names)
+    assert len(names) == len(set(names))
+
+
+@pytest.mark.parametrize("mode", sorted(MATCH_PAGES))
+def test_merged_regions_match_a_full_extract(mode):
+    _, html = match_page(mode)
+    parts = [extract(MATCH_PAGE, html[start:end]) for _, start, end in split_regions(html)]
+    assert merge_regions(parts) == extract(MATCH_PAGE, html)
+
+
+def test_diff_match():
+    url, html = match_page("past")
+    old = match_json(url, html)
+    new = copy.deepcopy(old)
+    new["maps_info"][0]["team_a"]["score"] = "99"
+    row = new["stats"]["total"][next(iter(new["stats"]["total"]))][0]
+    row["kills"] = "99"
+
+    assert diff_match(old, old) == {"maps": [], "stats": []}
+    diff = diff_match(old, new)
+    assert diff["maps"] == [{"index": 0, "map_name": old["maps_info"][0]["map_name"],
+                             "changes": {"team_a.score": [old["maps_info"][0]["team_a"]["score"], "99"]}}]
+    [stat] = [s for s in diff["stats"] if s["map"] == "total"]
+    assert stat["nickname"] == row["nickname"]
+    assert stat["changes"] == {"kills": [old["stats"]["total"][stat["team"]][0]["kills"], "99"]}
+
+    first = diff_match(None, old)
+    assert first["status"] == [None, old["match_status"]]
+    assert len(first["maps"]) == len(old["maps_info"])
+
+
+class FakeResponse():
+    def __init__(self, text, status_code=200, headers=None):
+        self.text = text
+        self.content = text.encode("utf-8")
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakePool():
+    """ Serves the queued responses, recording the request headers """
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.headers = []
+
+    def fetch(self, url, headers=None):
+        self.headers.append(dict(headers or {}))
+        return self.responses.pop(0)
+
+
+def test_refresh_reextracts_only_changed_regions(monkeypatch):
+    url, html = match_page("live")
+    changed_html = html.replace("94.8", "95.1", 1)
+    pool = FakePool([
+        FakeResponse(html, headers={"ETag": '"v1"'}),
+        FakeResponse("", 304),
+        FakeResponse(html, headers={"ETag": '"v2"'}),
+        FakeResponse(changed_html, headers={"ETag": '"v3"'}),
+    ])
+    monkeypatch.setattr(live_page, "ARCHIVE_PAGES", False)
+    extracted = []
+    monkeypatch.setattr(live_page, "extract", lambda schema, chunk: extracted.append(chunk) or extract(schema, chunk))
+    refresher = LivePageRefresher(url, pool=pool)
+
+    first = refresher.refresh()
+    assert first["regions"] == [name for name, _, _ in split_regions(html)]
+    assert refresher.match_json == match_json(url, html)
+
+    extracted.clear()
+    assert refresher.refresh() is None          # 304
+    assert pool.headers[1] == {"If-None-Match": '"v1"'}
+    assert refresher.refresh() is None          # new ETag, same body
+    assert extracted == []
+
+    diff = refresher.refresh()
+    assert diff["regions"] == ["stats:0"]
+    assert len(extracted) == 1
+    assert diff["maps"] == []
+    assert [s["changes"] for s in diff["stats"]] == [{"adr": ["94.8", "95.1"]}]
+    assert refresher.match_json == match_json(url, changed_html)
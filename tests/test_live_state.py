@@ -0,0 +1,73 @@
+from live_state import LiveMatchState, LogCursor, SeenWindow, log_entries
+
+
+def replay(polls, state=None):
+    state = state or LiveMatchState(1)
+    for frames in polls:
+        for name, data in frames:
+            state.apply(name, data)
+    return state
+
+
+def kill(event_id, killer="a", victim="b"):
+    return {"Kill": {"eventId": event_id, "killerNick": killer, "killerSide": "CT",
+                     "victimNick": victim, "victimSide": "TERRORIST", "headShot": False}}
+
+
+def round_end(ct, t):
+    return {"RoundEnd": {"winner": "CT", "winType": "CTs_Win",
+                         "counterTerroristScore": ct, "terroristScore": t}}
+
+
+def test_seen_window_forgets_oldest():
+    window = SeenWindow(size=2)
+    assert window.add(1) and window.add(2)
+    assert not window.add(2)
+    assert window.add(3)
+    assert not window.add(1)    # forgotten, but older than anything in the window
+    assert window.dump() == [2, 3]
+
+
+def test_cursor_drops_replayed_backlog():
+    state = LiveMatchState(1)
+    # scorebot sends the newest entry first
+    state.apply("log", {"log": [round_end(1, 0), kill(2), kill(1)]})
+    state.apply("log", {"log": [{"RoundStart": {}}]})
+    # reconnect: the whole backlog again plus one new kill
+    state.apply("log", {"log": [kill(3), {"RoundStart": {}}, round_end(1, 0), kill(2), kill(1)]})
+    assert state.events == 5
+    assert len(state.rounds) == 1
+    assert state.players["a"].kills == 3
+
+
+def test_cursor_survives_dump():
+    cursor = LogCursor()
+    for kind, payload in log_entries({"log": [round_end(1, 0), kill(7)]}):
+        cursor.advance(kind, payload)
+    cursor = LogCursor(*cursor.dump())
+    assert cursor.unseen(log_entries({"log": [kill(8), round_end(1, 0), kill(7)]})) == [("Kill", kill(8)["Kill"])]
+
+
+def test_replayed_capture_counts_each_kill_once(capture_polls):
+    state = replay(capture_polls)
+    unique = {payload["eventId"] for frames in capture_polls for name, data in frames if name == "log"
+              for kind, payload in log_entries(data) if kind == "Kill"}
+    kills = [payload for frames in capture_polls for name, data in frames if name == "log"
+             for kind, payload in log_entries(data) if kind == "Kill"]
+    assert len(kills) > len(unique)
+    assert state.map_name == "de_train"
+    assert (state.ct_score, state.t_score) == (3, 2)
+    assert [(r["ct_score"], r["t_score"]) for r in state.rounds] == [(1, 0), (2, 0), (3, 0), (3, 1), (3, 2)]
+    # at most 5 kills per side and round
+    assert all(n <= 5 for r in state.rounds for n in r["kills"].values())
+
+
+def test_adr_is_damage_over_rounds_played(capture_polls):
+    state = replay(capture_polls)
+    restored = LiveMatchState.restore(state.dump())
+    played = state.ct_score + state.t_score
+    for player in state.players.values():
+        assert player.adr(played) == round(player.damage / played, 1)
+        assert restored.players[player.nick if player.player_id is None else player.player_id].damage == player.damage
+    snapshot = state.snapshot()
+    assert {p["adr"] for p in snapshot["players"]} == {p.adr(played) for p in state.players.values()}
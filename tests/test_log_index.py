@@ -0,0 +1,93 @@
+import json
+import time
+
+import pytest
+
+from log_index import LogIndex
+
+
+def scoreboard(timestamp, map_name, rnd):
+    return {"timestamp": timestamp, "mapName": map_name, "currentRound": rnd}
+
+
+def write(path, records, mode="a", tail=""):
+    with open(path, mode, encoding="utf-8") as fp:
+        for record in records:
+            fp.write(json.dumps(record) + "\n")
+        fp.write(tail)
+
+
+def test_rounds_and_maps_carry_forward(tmp_path):
+    path = str(tmp_path / "LOG_FILE.json")
+    write(path, [scoreboard(1, "de_nuke", 1), {"timestamp": 2}, scoreboard(3, "de_nuke", 2),
+                 scoreboard(4, "de_train", 1), {"timestamp": 5}])
+    with LogIndex(path) as index:
+        assert len(index) == 5
+        assert index.maps == ["de_nuke", "de_train"]
+        assert list(index.round_lines("de_nuke", 1)) == [scoreboard(1, "de_nuke", 1), {"timestamp": 2}]
+        assert index.seek_round(2, 1) == 3
+        assert index.seek_round("de_inferno", 1) is None
+        assert [line["timestamp"] for line in index.since(2, until=5)] == [2, 3, 4]
+
+
+def test_double_encoded_frames(tmp_path):
+    path = str(tmp_path / "socket_json.log")
+    frame = ["scoreboard", json.dumps({"mapName": "de_train", "currentRound": 7})]
+    write(path, [[frame]])
+    with LogIndex(path) as index:
+        assert index.maps == ["de_train"]
+        assert index.seek_round("de_train", 7) == 0
+
+
+def test_refresh_is_incremental(tmp_path):
+    path = str(tmp_path / "LOG_FILE.json")
+    write(path, [scoreboard(1, "de_nuke", 1)], tail='{"timestamp": 2, "mapN')
+    index = LogIndex(path)
+    assert len(index) == 1    # the partial line waits for its newline
+    write(path, [], tail='ame": "de_nuke", "currentRound": 2}\n')
+    assert index.refresh() == 1
+    assert index.line(1) == scoreboard(2, "de_nuke", 2)
+    index.close()
+
+    # a new reader loads the saved index and only scans what was appended since
+    write(path, [scoreboard(3, "de_nuke", 3)])
+    with LogIndex(path) as reopened:
+        assert len(reopened) == 3
+        assert reopened.seek_round("de_nuke", 3) == 2
+
+
+def test_truncated_log_is_reindexed(tmp_path):
+    path = str(tmp_path / "LOG_FILE.json")
+    write(path, [scoreboard(i, "de_nuke", i) for i in range(1, 5)])
+    LogIndex(path).close()
+    write(path, [scoreboard(10, "de_train", 1)], mode="w")
+    with LogIndex(path) as index:
+        assert len(index) == 1
+        assert index.maps == ["de_train"]
+
+
+
+def test_time_queries_need_timestamps(tmp_path):
+    path = str(tmp_path / "LOG_FILE.json")
+    write(path, [{"mapName": "de_nuke", "currentRound": 1}, {"mapName": "de_nuke", "currentRound": 2}])
+    with LogIndex(path) as index:
+        assert not index.timed()
+        assert index.seek_round("de_nuke", 2) == 1
+        with pytest.raises(ValueError):
+            index.since(0)
+        with pytest.raises(ValueError):
+            index.seek_time(1)
+
+
+def test_score_log_lines_are_timestamped(tmp_path):
+    from live_match import ScoreLogWriter
+    path = str(tmp_path / "match.json")
+    writer = ScoreLogWriter(path)
+    before = time.time()
+    writer("scoreboard", {"mapName": "de_nuke", "currentRound": 1})
+    writer("scoreboard", {"mapName": "de_nuke", "currentRound": 2})
+    writer.close()
+    with LogIndex(path) as index:
+        assert index.timed()
+        assert [line["currentRound"] for line in index.since(before - 1)] == [1, 2]
+        assert list(index.since(time.time() + 1)) == []
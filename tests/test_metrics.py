@@ -0,0 +1,66 @@
+from urllib.request import urlopen
+
+import pytest
+
+from metrics import Registry, endpoint_of, start_http_server
+
+
+@pytest.fixture
+def registry():
+    return Registry()
+
+
+def test_counter_and_gauge(registry):
+    requests = registry.counter("requests_total", "Requests", ("endpoint", "status"))
+    requests.inc("match", 200)
+    requests.inc("match", 200, amount=2)
+    lag = registry.gauge("lag_seconds", "Lag")
+    lag.set(value=1.5)
+    text = registry.render()
+    assert 'requests_total{endpoint="match",status="200"} 3' in text
+    assert "# TYPE requests_total counter" in text
+    assert "lag_seconds 1.5" in text
+
+
+def test_histogram_buckets_are_cumulative(registry):
+    latency = registry.histogram("latency_seconds", "Latency", ("endpoint",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.observe("match", value=value)
+    lines = registry.render().splitlines()
+    assert 'latency_seconds_bucket{endpoint="match",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{endpoint="match",le="1.0"} 3' in lines
+    assert 'latency_seconds_bucket{endpoint="match",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{endpoint="match"} 4.05' in lines
+    assert 'latency_seconds_count{endpoint="match"} 4' in lines
+
+
+def test_labels_are_checked_and_escaped(registry):
+    counter = registry.counter("events_total", "Events", ("event",))
+    with pytest.raises(ValueError):
+        counter.inc()
+    counter.inc('say "hi"\n')
+    assert 'events_total{event="say \\"hi\\"\\n"} 1' in registry.render()
+
+
+def test_registering_twice_returns_the_same_metric(registry):
+    assert registry.counter("a_total", "A") is registry.counter("a_total", "A")
+
+
+def test_endpoint_of():
+    assert endpoint_of("https://scorebot-lb.hltv.org/socket.io/?EIO=3") == "scorebot"
+    assert endpoint_of("https://www.hltv.org/matches/2388113/furia-vs-g2") == "match"
+    assert endpoint_of("https://www.hltv.org/matches?event=7902") == "matches_event"
+    assert endpoint_of("https://www.hltv.org/matches?selectedDate=2025-01-01") == "matches_day"
+    assert endpoint_of("https://www.hltv.org/player/7998/s1mple") == "player"
+    assert endpoint_of("https://example.com/") == "other"
+
+
+def test_http_endpoint(registry):
+    registry.counter("up_total", "Up").inc()
+    server = start_http_server(0, registry=registry)
+    try:
+        with urlopen(f"http://127.0.0.1:{server.server_port}/metrics", timeout=5) as resp:
+            assert resp.headers["Content-Type"].startswith("text/plain")
+            assert "up_total 1" in resp.read().decode()
+    finally:
+        server.shutdown()
@@ -0,0 +1,163 @@
+import copy
+import json
+import time
+import threading
+
+import pytest
+
+import player_profiles
+from player_profiles import ProfileCache, ProfileEnricher, parse_profile, player_url
+from sessions import FetchError, NOT_FOUND
+
+PLAYER_HTML = """
+<div class="playerProfile">
+  <h1 class="playerNickname">s1mple</h1>
+  <div class="playerRealname"><img class="flag" title="Ukraine"> Oleksandr Kostyliev </div>
+  <div class="playerAge"><span class="listLeft">Age</span><span class="listRight">28 years</span></div>
+  <div class="playerTeam"><span class="listRight"><a href="/team/4608/natus-vincere">Natus Vincere</a></span></div>
+  <table class="team-breakdown">
+    <tr class="team">
+      <td class="time-period-cell"><span data-unix="1533081600000">Aug 2018</span> - Present</td>
+      <td class="team-name-cell"><a href="/team/4608/natus-vincere"><span class="team-name">Natus Vincere</span></a></td>
+    </tr>
+    <tr class="team">
+      <td class="time-period-cell"><span data-unix="1451606400000">Jan 2016</span> - <span data-unix="1472688000000">Sep 2016</span></td>
+      <td class="team-name-cell"><a href="/team/6667/flipsid3"><span class="team-name">FlipSid3</span></a></td>
+    </tr>
+  </table>
+</div>
+"""
+
+MATCHES = [
+    {"team_a_players": [{"nickname": "s1mple", "player_id": "7998"}, {"nickname": "b1t", "player_id": "18987"}],
+     "team_b_players": [{"nickname": "ghost", "player_id": None}]},
+    {"team_a_players": [{"nickname": "s1mple", "player_id": "7998"}], "team_b_players": []},
+]
+
+
+class FakeResponse():
+    def __init__(self, text):
+        self.text = text
+        self.content = text.encode("utf-8")
+
+
+class FakePool():
+    """ Player pages by id; unknown ids are 404s. Slow, so concurrent asks overlap """
+    def __init__(self, pages, delay=0.05):
+        self.pages = pages
+        self.delay = delay
+        self.urls = []
+        self.lock = threading.Lock()
+
+    def fetch(self, url):
+        with self.lock:
+            self.urls.append(url)
+        time.sleep(self.delay)
+        player_id = url.split("/")[4]
+        if player_id not in self.pages:
+            raise FetchError(url, NOT_FOUND, 404)
+        return FakeResponse(self.pages[player_id])
+
+
+class FakeArchive():
+    def __init__(self):
+        self.pages = {}
+
+    def put(self, url, content):
+        self.pages[url] = content
+
+
+@pytest.fixture
+def enricher(tmp_path):
+    pool = FakePool({"7998": PLAYER_HTML})
+    return ProfileEnricher(ProfileCache(str(tmp_path / "profiles.jsonl")), pool=pool,
+                           archive=FakeArchive(), workers=4, delay=0)
+
+
+@pytest.mark.parametrize("engine", ["stream", "soup"])
+def test_parse_profile(engine):
+    profile = parse_profile("7998", PLAYER_HTML, engine=engine)
+    assert profile == {
+        "player_id": 7998, "nickname": "s1mple", "real_name": "Oleksandr Kostyliev", "nationality": "Ukraine",
+        "age": 28, "team": "Natus Vincere", "team_id": 4608,
+        "team_history": [
+            {"team": "Natus Vincere", "team_id": 4608, "start": "2018-08-01", "end": None},
+            {"team": "FlipSid3", "team_id": 6667, "start": "2016-01-01", "end": "2016-09-01"},
+        ],
+    }
+
+
+def test_player_url():
+    assert player_url(7998, "s1mple") == "https://www.hltv.org/player/7998/s1mple"
+    assert player_url(1, "Jame Time!") == "https://www.hltv.org/player/1/jametime"
+
+
+def test_cache_ttl_and_reload(tmp_path):
+    path = str(tmp_path / "profiles.jsonl")
+    cache = ProfileCache(path, ttl=100)
+    cache.put(1, {"nickname": "a"}, fetched_at=time.time() - 200)
+    cache.put(2, {"nickname": "b"})
+    assert cache.fresh(1) is None
+    assert cache.fresh("2")["profile"] == {"nickname": "b"}
+    assert ProfileCache(path, ttl=100).fresh(2)["profile"] == {"nickname": "b"}
+
+
+def test_cache_compacts_superseded_lines(tmp_path):
+    path = str(tmp_path / "profiles.jsonl")
+    cache = ProfileCache(path)
+    for i in range(5):
+        cache.put(1, {"version": i})
+    with open(path, "a", encoding="utf-8") as fp:
+        fp.write('{"player_id": "2", "fetch')     # cut short by a crash
+    cache = ProfileCache(path)
+    assert cache.fresh(1)["profile"] == {"version": 4}
+    with open(path, encoding="utf-8") as fp:
+        assert [json.loads(line)["player_id"] for line in fp] == ["1"]
+
+
+def test_concurrent_asks_share_one_fetch(enricher):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(enricher.get("7998", "s1mple"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(enricher.pool.urls) == 1
+    assert [r["nickname"] for r in results] == ["s1mple"] * 8
+    assert enricher.get("7998")["age"] == 28     # cached now
+    assert len(enricher.pool.urls) == 1
+
+
+def test_enrich_fetches_each_player_once(enricher, monkeypatch):
+    monkeypatch.setattr(player_profiles, "ARCHIVE_PAGES", True)
+    matches = copy.deepcopy(MATCHES)
+    profiles = enricher.enrich(matches)
+    assert sorted(enricher.pool.urls) == [player_url("18987", "b1t"), player_url("7998", "s1mple")]
+    assert profiles == {"7998": parse_profile("7998", PLAYER_HTML), "18987": None}
+    assert matches[1]["team_a_players"][0]["profile"]["team"] == "Natus Vincere"
+    assert "profile" not in matches[0]["team_a_players"][1]
+    assert list(enricher.archive.pages) == [player_url("7998", "s1mple")]
+
+    # the 404 is cached as well: a second crawl fetches nothing
+    enricher.enrich(matches)
+    assert len(enricher.pool.urls) == 2
+
+
+def test_reparse_skips_archived_profiles(tmp_path, monkeypatch):
+    import archive
+    import cli
+    from conftest import match_page
+    pages = archive.PageArchive(str(tmp_path / "archive"))
+    monkeypatch.setattr(archive, "_default_archive", pages)
+    monkeypatch.setattr(player_profiles, "ARCHIVE_PAGES", True)
+    url, html = match_page("past")
+    pages.put(url, html)
+    enricher = ProfileEnricher(ProfileCache(str(tmp_path / "profiles.jsonl")), pool=FakePool({"7998": PLAYER_HTML}),
+                               archive=pages, delay=0)
+    enricher.get("7998", "s1mple")
+    assert player_url("7998", "s1mple") in pages.by_url
+
+    output = tmp_path / "reparsed.json"
+    cli.main(["reparse", "--archive", "-q", "--output", str(output)])
+    with open(output, encoding="utf-8") as fp:
+        assert json.load(fp)["match_id"] == "2388113"
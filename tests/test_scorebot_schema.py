@@ -0,0 +1,51 @@
+from scorebot_schema import (SCOREBOARD, PayloadValidator, MISSING, WRONG_TYPE, WRONG_ITEM, NOT_OBJECT)
+
+GOOD = {"mapName": "de_train", "terroristTeamName": "SPARTA", "ctTeamName": "FORZE Reload", "currentRound": 6,
+        "counterTerroristScore": 3, "terroristScore": 2, "ctTeamId": 12857, "tTeamId": 13214, "frozen": False,
+        "live": True, "ctTeamScore": 3, "tTeamScore": 2, "startingCt": 12857, "startingT": 13214,
+        "regulationHalfLength": 12, "overtimeHalfLength": 3}
+
+
+def test_real_capture_frames_pass(capture_polls):
+    validator = PayloadValidator()
+    for frames in capture_polls:
+        for name, data in frames:
+            assert validator.check(name, data)
+    assert validator.violations == {} and validator.dropped == {}
+
+
+def test_missing_required_key_drops_the_frame():
+    validator = PayloadValidator("1")
+    assert not validator.check("scoreboard", dict(GOOD, mapName=None, live="yes"))
+    # only why it was dropped is counted
+    assert validator.violations == {("scoreboard", "mapName", MISSING): 1}
+    assert validator.dropped == {"scoreboard": 1}
+
+
+def test_optional_violations_keep_the_frame():
+    validator = PayloadValidator()
+    data = dict(GOOD, currentRound="6", frozen=1)
+    del data["tTeamId"]
+    assert validator.check("scoreboard", data)
+    assert validator.violations == {("scoreboard", "currentRound", WRONG_TYPE): 1,
+                                    ("scoreboard", "frozen", WRONG_TYPE): 1,
+                                    ("scoreboard", "tTeamId", MISSING): 1}
+    assert validator.partial == 1
+
+
+def test_log_items_and_non_objects():
+    validator = PayloadValidator()
+    assert not validator.check("log", {"log": [{"Kill": {}}, "oops"]})
+    assert not validator.check("log", ["not", "an", "object"])
+    assert validator.check("other_event", "anything")
+    assert validator.violations == {("log", "log", WRONG_ITEM): 1, ("log", "*", NOT_OBJECT): 1}
+    assert validator.stats()["dropped"] == {"log": 2}
+
+
+def test_project_uses_typed_defaults():
+    projected = SCOREBOARD.project({"mapName": "de_train", "currentRound": "6", "live": None},
+                                   ["mapName", "currentRound", "live", "ctTeamName"])
+    assert projected == {"mapName": "de_train", "currentRound": 0, "live": False, "ctTeamName": None}
+    assert SCOREBOARD.project("garbage", ["currentRound"]) == {"currentRound": 0}
+    # bools are not ints
+    assert SCOREBOARD.project({"currentRound": True}, ["currentRound"]) == {"currentRound": 0}
@@ -0,0 +1,58 @@
+import time
+
+import pytest
+
+import sessions
+from conftest import session_pool as pool
+
+
+@pytest.fixture(autouse=True)
+def short_cooldowns(monkeypatch):
+    monkeypatch.setattr(sessions, "SESSION_COOLDOWN", 0.3)
+    monkeypatch.setattr(sessions, "SESSION_MAX_COOLDOWN", 1)
+
+
+@pytest.mark.parametrize("path", ["/error", "/blocked", "/challenge"])
+def test_failed_responses_bench_and_rotate_the_session(url, path):
+    p = pool()
+    pooled = p.sessions[0]
+    first = pooled.session
+    p.get(url(path))
+    p.get(url(path))
+    assert pooled.blocked == 2
+    assert pooled.session is not first
+    assert not pooled.available(time.time())
+
+
+def test_not_found_is_not_a_session_failure(url):
+    p = pool()
+    p.get(url("/missing"))
+    p.get(url("/missing"))
+    assert p.sessions[0].blocked == 0
+
+
+def test_exceptions_count_as_failures():
+    p = pool()
+    with pytest.raises(Exception):
+        p.get("http://127.0.0.1:1/")     # nothing listens there
+    assert p.sessions[0].failures == 1
+
+
+def test_requests_move_to_the_other_session_while_benched(url):
+    p = pool(n=2, failure_threshold=1)
+    p.get(url("/error"))
+    failing = next(s for s in p.sessions if s.blocked)
+    for _ in range(3):
+        p.get(url("/ok"))
+    assert failing.requests == 1
+    assert sum(s.requests for s in p.sessions) == 4
+
+
+def test_benched_session_comes_back_after_cooldown(url):
+    p = pool()
+    p.get(url("/error"))
+    p.get(url("/error"))
+    start = time.monotonic()
+    resp = p.get(url("/ok"))
+    assert resp.status_code == 200
+    assert time.monotonic() - start >= 0.2     # waited for the cool-down (0.3s +-20%)
@@ -0,0 +1,48 @@
+import json
+
+from live_match import extract_json_arrays_from_socketio
+from socketio_frames import FrameDecoder, iter_frames, skip_value
+
+
+def poll_body(frames):
+    return "".join("42" + json.dumps(frame) for frame in frames)
+
+
+def test_skip_value():
+    text = '{"a": [1, "]}", {"b": "\\"x"}], "c": null} tail'
+    assert text[:skip_value(text, 0)] == text[:-5]
+    assert skip_value('"unterminated', 0) == -1
+    assert skip_value("123, 4", 0) == 3
+
+
+def test_lazy_frames_match_the_full_decoder(capture_polls):
+    for frames in capture_polls:
+        body = "0" + poll_body([[name, json.dumps(data)] for name, data in frames])
+        assert [frame.array() for frame in iter_frames(body)] == extract_json_arrays_from_socketio(body)
+
+
+def test_unsubscribed_payloads_are_not_parsed():
+    body = poll_body([["log", "not json at all {"], ["scoreboard", json.dumps({"mapName": "de_train"})]])
+    decoder = FrameDecoder(events=("scoreboard",))
+    frames, decoded = decoder.decode(body)
+    assert [frame.name for frame in frames] == ["log", "scoreboard"]
+    assert decoded == [("scoreboard", {"mapName": "de_train"})]
+    assert decoder.skipped == 1
+
+
+def test_field_projection():
+    body = poll_body([["scoreboard", json.dumps({"mapName": "de_train", "TERRORIST": [{"nick": "a"}], "live": True})]])
+    decoder = FrameDecoder(events=(), fields={"scoreboard": ["mapName", "live", "missing"]})
+    assert decoder.decode(body)[1] == [("scoreboard", {"mapName": "de_train", "live": True})]
+
+
+def test_malformed_messages_are_skipped():
+    body = '42["scoreboard", {"a": 1}' + '42"nope"' + '42["log"]' + poll_body([["log", {"log": []}]])
+    assert [frame.array() for frame in iter_frames(body)] == [["log", {"log": []}]]
+    # a subscribed payload that isn't valid JSON is dropped, not raised
+    assert FrameDecoder().decode('42["log", {bad}]')[1] == []
+
+
+def test_extra_arguments_and_escaped_names():
+    body = '42["sc\\u006freboard", {"x": 1}, "ack", [2]]'
+    assert [frame.array() for frame in iter_frames(body)] == [["scoreboard", {"x": 1}]]
@@ -0,0 +1,74 @@
+import logging
+
+import pytest
+from bs4 import BeautifulSoup
+
+from conftest import MATCH_PAGES, match_page
+from extraction import Schema, Field, raw_text, classes, strings
+from match import MatchFactory
+from match_schema import MATCH_PAGE
+from streaming import extract
+
+
+def both(schema, html):
+    return extract(schema, html), schema.extract(BeautifulSoup(html, "html.parser"))
+
+
+@pytest.mark.parametrize("mode", sorted(MATCH_PAGES))
+def test_match_page_schema_agrees_with_soup(mode):
+    _, html = match_page(mode)
+    stream, soup = both(MATCH_PAGE, html)
+    assert stream == soup
+
+
+@pytest.mark.parametrize("mode", sorted(MATCH_PAGES))
+def test_match_json_agrees_with_soup(mode):
+    url, html = match_page(mode)
+    logger = logging.getLogger(__name__)
+    assert (MatchFactory(url, html, logger, engine="stream").get_match().to_json() ==
+            MatchFactory(url, html, logger, engine="soup").get_match().to_json())
+
+
+ROW = Schema(
+    classes=Field(convert=classes),
+    name=Field("span.name", required=True),
+    link=Field("a", attr="href"),
+    flag=Field("img.flag", attr="title", default="?"),
+)
+
+PAGE = Schema(
+    title=Field("div#top h1"),
+    rows=Field("table.stats tr", many=True, schema=ROW),
+    first_two=Field("li", many=True, limit=2),
+    notes=Field("div.notes", convert=strings),
+    raw=Field("div.raw", convert=raw_text),
+    missing=Field("div.nope", default="none"),
+)
+
+HTML = """
+<div id="top"><h1> Match <b>page</b> </h1></div>
+<table class="stats">
+  <tr class="row first"><td><span class="name">a</span><img class="flag" title="Denmark"><a href="/a">x</a></td></tr>
+  <tr class="row"><td>no name: skipped</td></tr>
+  <tr><td><span class="name">b &amp; c</span><br></td></tr>
+</table>
+<ul><li>1</li><li>2</li><li>3</li></ul>
+<div class="notes"> one <script>var x = 1;</script><p> two </p></div>
+<div class="raw">  a <i>b</i> </div>
+"""
+
+
+def test_small_schema_agrees_with_soup():
+    stream, soup = both(PAGE, HTML)
+    assert stream == soup
+    assert stream["rows"] == [
+        {"classes": ["row", "first"], "name": "a", "link": "/a", "flag": "Denmark"},
+        {"classes": [], "name": "b & c", "link": None, "flag": "?"},
+    ]
+    assert stream["first_two"] == ["1", "2"]
+    assert stream["missing"] == "none"
+
+
+def test_unsupported_selector_is_rejected():
+    with pytest.raises(ValueError):
+        extract(Schema(x=Field("ul > li")), "<ul><li>1</li></ul>")
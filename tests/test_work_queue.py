@@ -0,0 +1,136 @@
+import time
+
+import pytest
+
+from work_queue import WorkQueue, Worker, RemoteQueue, serve_queue, PENDING, LEASED, DONE, FAILED
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return WorkQueue(str(tmp_path / "queue.db"), lease_seconds=60, max_attempts=2, retry_delay=0)
+
+
+def test_enqueue_ignores_known_urls(queue):
+    assert queue.enqueue(["a", "b"]) == 2
+    assert queue.enqueue(["b", "c"]) == 1
+    assert queue.stats()[PENDING] == 3
+
+
+def test_lease_is_exclusive_until_it_expires(queue):
+    queue.enqueue(["a"])
+    lease = queue.lease("w1")[0]
+    assert queue.lease("w2") == []
+    queue.lease_seconds = -1
+    assert queue.extend("a", lease["token"])    # now already expired
+    again = queue.lease("w2")[0]
+    assert again["attempts"] == 2
+    # the first worker lost its lease: it can't extend or fail it any more
+    assert not queue.extend("a", lease["token"])
+    assert not queue.fail("a", lease["token"], "late")
+
+
+def test_complete_is_idempotent(queue):
+    queue.enqueue(["a"])
+    lease = queue.lease("w1")[0]
+    assert queue.complete("a", lease["token"], {"id": 1}, "w1")
+    assert not queue.complete("a", lease["token"], {"id": 2}, "w2")
+    assert queue.results() == [{"id": 1}]
+
+
+def test_fail_retries_then_gives_up(queue):
+    queue.enqueue(["a"])
+    queue.fail("a", queue.lease("w")[0]["token"], "boom")
+    assert queue.stats()[PENDING] == 1
+    queue.fail("a", queue.lease("w")[0]["token"], "boom")
+    assert queue.stats()[FAILED] == 1
+    assert queue.lease("w") == []
+    assert queue.retry_failed() == 1
+
+
+def test_expired_leases_fail_after_max_attempts(queue):
+    queue.enqueue(["crashes-its-worker"])
+    queue.lease_seconds = -1    # every lease expires at once, as if the worker died
+    assert len(queue.lease("w1")) == 1
+    assert len(queue.lease("w2")) == 1
+    assert queue.lease("w3") == []
+    stats = queue.stats()
+    assert (stats[FAILED], stats[LEASED], stats[PENDING]) == (1, 0, 0)
+
+
+def test_worker_drains_queue_over_http(queue):
+    queue.enqueue(["ok", "bad"])
+    server = serve_queue(queue, port=0)
+    try:
+        assert server.server_address[0] == "127.0.0.1"
+        remote = RemoteQueue(f"http://127.0.0.1:{server.server_port}")
+
+        def scrape(url):
+            if url == "bad":
+                raise ValueError(url)
+            return {"url": url}
+
+        worker = Worker(remote, batch=2, delay=0, poll_interval=0.01, scrape=scrape)
+        start = time.monotonic()
+        worker.run(exit_when_empty=True)
+        assert time.monotonic() - start < 10
+    finally:
+        server.shutdown()
+    stats = queue.stats()
+    assert (stats[DONE], stats[FAILED]) == (1, 1)
+    assert (worker.done, worker.failed) == (1, 2)
+    assert queue.results() == [{"url": "ok"}]
+
+
+def test_not_found_fails_on_the_first_attempt(queue):
+    from sessions import FetchError, NOT_FOUND, ERROR
+    queue.enqueue(["gone", "flaky"])
+
+    def scrape(url):
+        raise FetchError(url, NOT_FOUND if url == "gone" else ERROR, 404 if url == "gone" else 502)
+
+    worker = Worker(queue, batch=2, delay=0, scrape=scrape)
+    worker.process(queue.lease("w", 1)[0])
+    worker.process(queue.lease("w", 1)[0])
+    with queue.connect() as conn:
+        rows = dict(conn.execute("SELECT url, status || ':' || attempts FROM items").fetchall())
+    assert rows == {"gone": "failed:1", "flaky": "pending:1"}
+
+
+def test_slow_scrape_keeps_its_lease_over_http(queue):
+    queue.lease_seconds = 0.3
+    queue.enqueue(["slow"])
+    server = serve_queue(queue, port=0)
+    try:
+        remote = RemoteQueue(f"http://127.0.0.1:{server.server_port}")
+        stolen = []
+
+        def scrape(url):
+            # outlasts the lease several times over while another worker keeps asking for work
+            deadline = time.monotonic() + 1.2
+            while time.monotonic() < deadline:
+                stolen.extend(remote.lease("w2"))
+                time.sleep(0.05)
+            return {"url": url}
+
+        worker = Worker(remote, delay=0, poll_interval=0.01, scrape=scrape, extend_interval=0.1)
+        worker.run(exit_when_empty=True)
+    finally:
+        server.shutdown()
+    assert stolen == []
+    assert worker.done == 1
+    assert queue.results() == [{"url": "slow"}]
+
+
+def test_unextended_lease_is_taken_over(queue):
+    queue.lease_seconds = 0.3
+    queue.enqueue(["slow"])
+    taken = []
+
+    def scrape(url):
+        time.sleep(0.5)
+        taken.extend(queue.lease("w2"))
+        return {"url": url, "by": "w1"}
+
+    # extends too rarely: the lease runs out mid-scrape and w2 gets the URL
+    Worker(queue, delay=0, scrape=scrape, extend_interval=10).process(queue.lease("w1")[0])
+    assert [lease["attempts"] for lease in taken] == [2]
@@ -0,0 +1,313 @@
+""" Leased work queue for crawling match pages from several processes or hosts """
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import logging
+import threading
+
+from configs import (QUEUE_PATH, QUEUE_LEASE_SECONDS, QUEUE_MAX_ATTEMPTS, QUEUE_RETRY_DELAY,
+                     QUEUE_POLL_INTERVAL, QUEUE_EXTEND_INTERVAL, DELAY_BETWEEN_REQUESTS)
+
+logger = logging.getLogger(__name__)
+
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    url TEXT PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL DEFAULT 0,
+    lease_token TEXT,
+    lease_owner TEXT,
+    lease_expires REAL,
+    enqueued_at REAL NOT NULL,
+    completed_at REAL,
+    completed_by TEXT,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS items_ready ON items (status, available_at);
+"""
+
+
+class WorkQueue():
+    def __init__(self, path=QUEUE_PATH, lease_seconds=QUEUE_LEASE_SECONDS,
+                 max_attempts=QUEUE_MAX_ATTEMPTS, retry_delay=QUEUE_RETRY_DELAY):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        with self.connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def connect(self):
+        # one short-lived connection per call: safe across threads and processes
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout=30000")
+        return _Connection(conn)
+
+    # ------------------ Coordinator ------------------ #
+    def enqueue(self, urls):
+        """ Adds URLs not seen before, returns how many were new """
+        now = time.time()
+        with self.connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO items (url, enqueued_at) VALUES (?, ?)",
+                             [(url, now) for url in urls])
+            added = conn.total_changes - before
+            conn.execute("COMMIT")
+        return added
+
+    # ------------------ Workers ------------------ #
+    def lease(self, owner, n=1):
+        """ Up to n [{"url", "token", "attempts"}]; expired leases are handed out again """
+        now = time.time()
+        leases = []
+        with self.connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # a lease that keeps expiring (e.g. the URL crashes its worker) fails like any other error
+            conn.execute(
+                "UPDATE items SET status = ?, error = COALESCE(error, 'lease expired'), lease_token = NULL, "
+                "lease_expires = NULL WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+                (FAILED, LEASED, now, self.max_attempts))
+            rows = conn.execute(
+                "SELECT url, attempts FROM items "
+                "WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_expires < ?) "
+                "ORDER BY enqueued_at LIMIT ?",
+                (PENDING, now, LEASED, now, n)).fetchall()
+            for url, attempts in rows:
+                token = uuid.uuid4().hex
+                conn.execute(
+                    "UPDATE items SET status = ?, attempts = attempts + 1, lease_token = ?, "
+                    "lease_owner = ?, lease_expires = ? WHERE url = ?",
+                    (LEASED, token, owner, now + self.lease_seconds, url))
+                leases.append({"url": url, "token": token, "attempts": attempts + 1})
+            conn.execute("COMMIT")
+        return leases
+
+    def extend(self, url, token):
+        """ Pushes the lease expiry out again; False if the lease is no longer ours """
+        with self.connect() as conn:
+            cur = conn.execute("UPDATE items SET lease_expires = ? WHERE url = ? AND status = ? AND lease_token = ?",
+                               (time.time() + self.lease_seconds, url, LEASED, token))
+            return cur.rowcount == 1
+
+    def complete(self, url, token, result, owner=None):
+        """ Stores the result; the first completion wins whichever lease it came from, later ones return False """
+        with self.connect() as conn:
+            cur = conn.execute(
+                "UPDATE items SET status = ?, result = ?, completed_at = ?, completed_by = ?, "
+                "lease_token = NULL, lease_expires = NULL, error = NULL WHERE url = ? AND status != ?",
+                (DONE, json.dumps(result, ensure_ascii=False), time.time(), owner, url, DONE))
+            return cur.rowcount == 1
+
+    def fail(self, url, token, error, permanent=False):
+        """ Requeues with a delay, or marks the item failed after max_attempts (or if permanent); ignored if the lease moved on """
+        now = time.time()
+        with self.connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT attempts FROM items WHERE url = ? AND status = ? AND lease_token = ?",
+                               (url, LEASED, token)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return False
+            attempts = row[0]
+            status = FAILED if permanent or attempts >= self.max_attempts else PENDING
+            delay = self.retry_delay * 2 ** (attempts - 1)
+            conn.execute(
+                "UPDATE items SET status = ?, error = ?, available_at = ?, lease_token = NULL, "
+                "lease_expires = NULL WHERE url = ?",
+                (status, str(error), now + delay, url))
+            conn.execute("COMMIT")
+        return True
+
+    # ------------------ Inspection ------------------ #
+    def stats(self):
+        now = time.time()
+        with self.connect() as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM items GROUP BY status").fetchall())
+            expired = conn.execute("SELECT COUNT(*) FROM items WHERE status = ? AND lease_expires < ?",
+                                   (LEASED, now)).fetchone()[0]
+        counts = {status: counts.get(status, 0) for status in (PENDING, LEASED, DONE, FAILED)}
+        counts["expired_leases"] = expired
+        return counts
+
+    def results(self):
+        """ Match dicts of every completed item, in completion order """
+        with self.connect() as conn:
+            rows = conn.execute("SELECT result FROM items WHERE status = ? ORDER BY completed_at", (DONE,)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def retry_failed(self):
+        with self.connect() as conn:
+            cur = conn.execute("UPDATE items SET status = ?, attempts = 0, available_at = 0 WHERE status = ?",
+                               (PENDING, FAILED))
+            return cur.rowcount
+
+
+class _Connection():
+    """ sqlite3 connection that is closed (not just committed) when the with-block ends """
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and self.conn.in_transaction:
+            self.conn.execute("ROLLBACK")
+        self.conn.close()
+
+
+# ------------------ Worker ------------------ #
+def scrape_match(url, ensure_pt=False):
+    from match import MatchFactory
+    return MatchFactory(url, None, logger, ensure_pt).get_match().to_json()
+
+
+class Worker():
+    """ Leases batches from a WorkQueue (or RemoteQueue), scrapes each URL and reports back """
+    def __init__(self, queue, owner=None, batch=1, delay=DELAY_BETWEEN_REQUESTS,
+                 poll_interval=QUEUE_POLL_INTERVAL, scrape=scrape_match, extend_interval=QUEUE_EXTEND_INTERVAL):
+        self.queue = queue
+        self.owner = owner or f"{socket.gethostname()}-{uuid.uuid4().hex[:6]}"
+        self.batch = batch
+        self.delay = delay
+        self.poll_interval = poll_interval
+        self.scrape = scrape
+        self.extend_interval = extend_interval
+        self.stop_event = threading.Event()
+        self.done = 0
+        self.failed = 0
+
+    def stop(self, *args):
+        self.stop_event.set()
+
+    def run(self, exit_when_empty=False):
+        logger.info(f"Worker {self.owner} started")
+        while not self.stop_event.is_set():
+            leases = self.queue.lease(self.owner, self.batch)
+            if not leases:
+                if exit_when_empty:
+                    stats = self.queue.stats()
+                    if not stats[PENDING] and not stats[LEASED]:
+                        break
+                self.stop_event.wait(self.poll_interval)
+                continue
+            for lease in leases:
+                if self.stop_event.is_set():
+                    break  # unfinished leases expire and are picked up by someone else
+                self.process(lease)
+                self.stop_event.wait(self.delay)
+        logger.info(f"Worker {self.owner} stopped: {self.done} done, {self.failed} failed")
+
+    def process(self, lease):
+        url, token = lease["url"], lease["token"]
+        # fetch backoff and breaker pauses can outlast the lease: keep it ours while the scrape runs
+        scraped = threading.Event()
+        heartbeat = threading.Thread(target=self.keep_lease, args=(url, token, scraped),
+                                     name=f"lease-{self.owner}", daemon=True)
+        heartbeat.start()
+        try:
+            result = self.scrape(url)
+        except Exception as e:
+            from sessions import FetchError, NOT_FOUND
+            # a missing page stays missing: no point retrying it
+            permanent = isinstance(e, FetchError) and e.kind == NOT_FOUND
+            logger.warning(f"{url}: attempt {lease['attempts']} failed{' for good' if permanent else ''}: {e}")
+            self.queue.fail(url, token, repr(e), permanent=permanent)
+            self.failed += 1
+            return
+        finally:
+            scraped.set()
+            heartbeat.join()
+        if self.queue.complete(url, token, result, self.owner):
+            self.done += 1
+        else:
+            logger.info(f"{url}: already completed by another worker")
+
+    def keep_lease(self, url, token, scraped):
+        while not scraped.wait(self.extend_interval):
+            try:
+                if not self.queue.extend(url, token):
+                    logger.warning(f"{url}: lease lost to another worker")
+                    return
+            except Exception as e:
+                logger.warning(f"{url}: lease not extended: {e!r}")
+
+
+# ------------------ HTTP transport ------------------ #
+def serve_queue(queue, host="127.0.0.1", port=None):
+    """ Serves POST /<method> with a JSON body of keyword arguments, from a daemon thread; unauthenticated """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from configs import QUEUE_PORT
+    methods = {"enqueue", "lease", "extend", "complete", "fail", "stats"}
+
+    class QueueHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            method = self.path.strip("/")
+            if method not in methods:
+                self.send_error(404)
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                kwargs = json.loads(self.rfile.read(length) or b"{}")
+                body = json.dumps(getattr(queue, method)(**kwargs)).encode("utf-8")
+            except (TypeError, ValueError) as e:
+                self.send_error(400, str(e))
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port if port is not None else QUEUE_PORT), QueueHandler)
+    thread = threading.Thread(target=server.serve_forever, name="queue-http", daemon=True)
+    thread.start()
+    logger.info(f"Work queue served on http://{host}:{server.server_port}/")
+    return server
+
+
+class RemoteQueue():
+    """ WorkQueue methods over serve_queue()'s HTTP API """
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _call(self, method, **kwargs):
+        from urllib.request import Request, urlopen
+        req = Request(f"{self.base_url}/{method}", data=json.dumps(kwargs).encode("utf-8"),
+                      headers={"Content-Type": "application/json"})
+        with urlopen(req, timeout=self.timeout) as resp:
+            return json.loads(resp.read())
+
+    def enqueue(self, urls):
+        return self._call("enqueue", urls=list(urls))
+
+    def lease(self, owner, n=1):
+        return self._call("lease", owner=owner, n=n)
+
+    def extend(self, url, token):
+        return self._call("extend", url=url, token=token)
+
+    def complete(self, url, token, result, owner=None):
+        return self._call("complete", url=url, token=token, result=result, owner=owner)
+
+    def fail(self, url, token, error, permanent=False):
+        return self._call("fail", url=url, token=token, error=error, permanent=permanent)
+
+    def stats(self):
+        return self._call("stats")